@@ -1,68 +1,134 @@
 #
 # File used for syntax-highlighting code sections in the documentation.
 #
+# The lexer itself lives in kslexer.py, which doesn't need Sphinx; this
+# is the extension that registers it with Sphinx, and that keeps it
+# in step with the manual:
+#
+# - Once all documents are read, the names of the documented ks:global,
+#   ks:function and ks:structure objects are rendered into a names table
+#   (see kslexgen.render_names), which the lexer is switched over to.
+#   It is kept as kslexer_names.py in the doctrees directory, and loaded
+#   from there when the next build starts.  The checked-in
+#   kslexer_names.py next to this file, which is what the lexer uses
+#   outside the build, is never written by it; `python kslexgen.py
+#   --names` updates it from a build on purpose.  Every page is written
+#   again when the table differs from the one the pages were last
+#   written with.
+#
+# - A documented name in a highlighted Kerboscript block links to where
+#   it is documented.  The links are added to the finished page, so the
+#   highlighted blocks stay the same on every page and can be cached
+#   (kshighlightcache.py) without them.
+#
+# Settings in conf.py:
+#
+#     ks_highlight_links   link documented names in code (default: True)
+#
 
+import os
 import re
+import types
 
-from pygments.lexer import RegexLexer, words
-from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
-    Number, Punctuation
+from pygments.token import Name, STANDARD_TYPES
 from sphinx.highlighting import lexers
+from sphinx.util import logging
 
-class KerboscriptLexer(RegexLexer):
-   
-    name = 'Kerboscript'
-    aliases = ['kerboscript']
-    filenames = ['*.ks']
-    # mimetypes = ['text/somethinghere'] # We don't have a kerboscript mime type (yet?)
- 
-    flags = re.MULTILINE | re.DOTALL | re.IGNORECASE
+import kslexer
+import kslexgen
+from kslexer import KerboscriptLexer, tokenize
 
-    __all__ = ['KerboscriptLexer']
+__all__ = ['KerboscriptLexer', 'tokenize']
 
-    tokens = {
-        #
-        # See http://pygments.org/docs/tokens/ for a list of parts of speech 
-        # to assign things to in this list
-        #
-        'root': [
-            #
-            # Note: Precedence in a tie is to pick the one that
-            # came earlier in this list.
-            #
-            # Warning: In my experimentation I found that if a rule is
-            # present in the list below where a string of zero length 
-            # matches the regex, this causes Pygment to just get stuck
-            # in an infinite loop.
-            #     For example, if the whitespace regex was:
-            #         [\t\s\r\n]*
-            #     Instead of :
-            #         [\t\s\r\n]+
-            #     Then zero chars would be a valid match.  So
-            #     Pygment matches the rule without advancing
-            #     any further into the input, and just gets
-            #     stuck doing that forever.
-            #
-            (r'//[^\r\n]*[\r\n]', Comment.Single),
-            (r'"[^"]*"', String),
-            (r'[\t\s\r\n]+', Text), #whitespace
-            (r'[*/+|?<>=#^\-]', Operator),
-            (r'\b(to|is|not|and|or|all)\b', Operator.Word),
-            (r'[()\[\]\.,:\{\}@]', Punctuation),
-            (words(( 'set', 'if', 'else', 'until', 'step', 'do',
-                'lock', 'unlock', 'print', 'at', 'toggle', 'wait',
-                'when', 'then', 'stage', 'clearscreen', 'add', 'remove',
-                'log', 'break', 'preserve', 'declare', 'defined', 'local',
-                'global', 'return', 'switch', 'copy', 'from', 'rename',
-                'volume', 'file', 'delete', 'edit', 'run', 'once', 'compile',
-                'list', 'reboot', 'shutdown', 'for', 'unset'), suffix=r'\b'), Keyword),
-            (r'\b(declare|local|global|parameter|function)\b', Keyword.Declaration),
-            (r'\b(true|false|on|off)\b', Name.Builtin),
-            (r'\b[a-z_][a-z_\d]*\b', Name.Variable), # TODO - we could differentiate type of name: i.e. built-in vs user.
-            (r'\b(\d+\.\d*|\.\d+|\d+)[eE][+-]?\d+\b', Number.Float),
-            (r'\b(\d+)+\b', Number.Float), # markup ints just like floats
-        ]
-    }
+logger = logging.getLogger(__name__)
+
+# A highlighted Kerboscript block in a page's body, and a documented
+# name in one: the css classes of Name.Class, Name.Function and
+# Name.Variable.Global.
+_block_re = re.compile(r'<div class="highlight-kerboscript[ "].*?</pre>',
+                       re.DOTALL)
+_name_re = re.compile(r'<span class="(%s)">([A-Za-z_][A-Za-z_\d]*)</span>'
+                      % '|'.join(STANDARD_TYPES[token] for token in
+                                 (Name.Class, Name.Function,
+                                  Name.Variable.Global)))
+
+def _names_module(source, path):
+    names = types.ModuleType('kslexer_names')
+    exec(compile(source, path, 'exec'), names.__dict__)
+    return names
+
+def load_names(app):
+    # The names of the last build, until this one has read its documents.
+    path = os.path.join(app.doctreedir, kslexgen.NAMES_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            names = _names_module(f.read(), path)
+    except (OSError, SyntaxError):
+        return
+    if names.NAMES_SHA256 != kslexer.names_digest():
+        kslexer.use_names(names)
+
+def update_names(app, env):
+    domain = env.get_domain('ks')
+    source = kslexgen.render_names(
+        (objtype, name, docname, objtype + ':' + name)
+        for objtype, name, docname, entry in domain.iter_objects())
+    path = os.path.join(app.doctreedir, kslexgen.NAMES_FILE)
+    try:
+        with open(path, encoding='utf-8') as f:
+            unchanged = f.read() == source
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        os.makedirs(app.doctreedir, exist_ok=True)
+        kslexgen.write_file(path, source)
+    names = _names_module(source, path)
+    if names.NAMES_SHA256 != kslexer.names_digest():
+        kslexer.use_names(names)
+    written_with = getattr(env, 'ks_lexer_names', None)
+    env.ks_lexer_names = names.NAMES_SHA256
+    if written_with == names.NAMES_SHA256:
+        return []
+    if written_with is not None:
+        # (Without, the environment is new and all pages are written.)
+        logger.info('kerboscript names: the documented names changed, '
+                    '%d now; writing all pages', len(names.NAME_TOKENS))
+    return sorted(env.found_docs)
+
+def link_names(app, pagename, templatename, context, doctree):
+    body = context.get('body')
+    if not app.config.ks_highlight_links or not body or \
+            'highlight-kerboscript' not in body:
+        return
+    builder = app.builder
+    uris = {}
+
+    def link(m):
+        word = m.group(2)
+        if word not in uris:
+            found = kslexer.name_anchor(word)
+            uris[word] = found and '%s#%s' % (
+                builder.get_relative_uri(pagename, found[0]), found[1])
+        if not uris[word]:
+            return m.group()
+        return '<a class="reference internal" href="%s">%s</a>' % (
+            uris[word], m.group())
+
+    context['body'] = _block_re.sub(
+        lambda block: _name_re.sub(link, block.group()), body)
 
 def setup(app):
     lexers['kerboscript'] = KerboscriptLexer()
+    app.add_config_value('ks_highlight_links', True, '')
+    app.connect('builder-inited', load_names)
+    app.connect('env-updated', update_names)
+    app.connect('html-page-context', link_names)
+    # The lexer's only per-build state is the names table, which is
+    # switched in the main process before any writer process is forked,
+    # so reader and writer processes in a parallel (-j N) build can each
+    # use their own copy.
+    return {
+        'version': '1.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
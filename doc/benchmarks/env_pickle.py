@@ -0,0 +1,134 @@
+#
+# Size and load time of the ks domain's part of the pickled environment,
+# in its compact layout and in the one it had before (env_version 5).
+#
+# Usage, from the doc/ directory, after a build:
+#
+#     python benchmarks/env_pickle.py [--doctrees build/doctrees]
+#                                     [-r REPEAT]
+#
+# Loads environment.pickle, converts the ks domain data back to the old
+# layout, with (objtype, FULLNAME) keys, docnames spelled out in every
+# value, a docobjects table and a dict of fields per object, and pickles
+# both.  Strings the compact layout interns are copied apart again, as
+# the old code kept a string of its own for every reference and field.
+# Load time is the best of REPEAT pickle.loads() runs.
+#
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOC_DIR)
+
+import ksdomain
+
+
+def _own(value):
+    # An equal string that is not the same object, which pickle would
+    # otherwise store only once.
+    return (value + '.')[:-1] if isinstance(value, str) else value
+
+
+def legacy_data(data):
+    # data, as env_version 5 kept it.
+    docnames = data['docnames']
+    objects = {}
+    docobjects = {}
+    fields = {}
+    for objtype, table in zip(ksdomain.OBJTYPES, data['objects']):
+        for name, entry in table.items():
+            key = (objtype, name)
+            objects[key] = docnames[entry.doc]
+            docobjects.setdefault(docnames[entry.doc], set()).add(key)
+            info = {}
+            for slot in entry.__slots__[1:]:
+                value = getattr(entry, slot)
+                if slot == 'parameter' and value is not None:
+                    info[slot] = [tuple(_own(part) for part in param)
+                                  for param in value]
+                elif value is not None:
+                    info[slot] = _own(value)
+            fields[key] = info
+    return {
+        'objects': objects,
+        'docobjects': docobjects,
+        'refs': dict((docnames[doc], [(_own(role), _own(target), lineno)
+                                      for role, target, lineno in refs])
+                     for doc, refs in data['refs'].items()),
+        'fields': fields,
+        'suffixtables': dict((docnames[doc], entries) for doc, entries
+                             in data['suffixtables'].items()),
+        'inherits': dict((struct, (docnames[doc], lineno, parents))
+                         for struct, (doc, lineno, parents)
+                         in data['inherits'].items()),
+        'inherited_cache': data['inherited_cache'],
+        'suffixtable_cache': data['suffixtable_cache'],
+        'version': 5,
+    }
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(data, repeat):
+    # (bytes, load seconds, {key: bytes}) of data pickled as Sphinx does.
+    blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    keys = dict((key, len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+                for key, value in data.items())
+    return len(blob), best_of(repeat, lambda: pickle.loads(blob)), keys
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the pickled ks domain data with its old layout.")
+    parser.add_argument('--doctrees',
+                        default=os.path.join(DOC_DIR, 'build', 'doctrees'),
+                        help="doctrees directory of a build "
+                        "(default: build/doctrees)")
+    parser.add_argument('-r', '--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(args.doctrees, 'environment.pickle')
+    if not os.path.exists(path):
+        print(f"no environment.pickle in {args.doctrees}; build first")
+        sys.exit(1)
+    with open(path, 'rb') as f:
+        blob = f.read()
+    env = pickle.loads(blob)
+    data = env.domaindata['ks']
+    if 'docnames' not in data:
+        print(f"{path} is from before the compact layout; rebuild it")
+        sys.exit(1)
+    env_time = best_of(max(1, args.repeat // 4), lambda: pickle.loads(blob))
+    print(f"environment.pickle: {len(blob):,} bytes, "
+          f"loads in {env_time * 1000:.1f} ms")
+    print(f"{sum(len(table) for table in data['objects'])} objects, "
+          f"{len(data['docnames'])} documents")
+
+    compact = measure(data, args.repeat)
+    legacy = measure(legacy_data(data), args.repeat)
+    print(f"{'ks domain data':<22}{'bytes':>10}{'load':>12}")
+    for label, (size, seconds, keys) in (('env_version 5', legacy),
+                                         ('compact', compact)):
+        print(f"{label:<22}{size:>10,}{seconds * 1000:>9.2f} ms")
+    print(f"{'':<22}{legacy[0] / compact[0]:>9.1f}x"
+          f"{legacy[1] / compact[1]:>10.1f}x smaller / faster")
+    print("by key (bytes, pickled alone):")
+    for key in sorted(set(legacy[2]) | set(compact[2])):
+        print(f"  {key:<20}{legacy[2].get(key, 0):>10,}"
+              f"{compact[2].get(key, 0):>10,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#
+# Times an incremental docs build after a single page is edited.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/incremental_build.py [page.rst]
+#
+# A full build is done first into a temporary directory, then the given
+# page (structures/vessels/vessel.rst by default) is touched and the same
+# build is run again.  Only the second build is reported.
+#
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+
+
+def build(tmp, builder):
+    cmd = [sys.executable, '-m', 'sphinx', '-q', '-b', builder,
+           '-d', os.path.join(tmp, 'doctrees'),
+           SOURCE_DIR, os.path.join(tmp, builder)]
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, cwd=DOC_DIR)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time a docs rebuild after touching one page.")
+    parser.add_argument('page', nargs='?',
+                        default='structures/vessels/vessel.rst',
+                        help='page to touch, relative to doc/source')
+    parser.add_argument('-b', '--builder', default='html')
+    args = parser.parse_args()
+
+    page = os.path.join(SOURCE_DIR, args.page)
+    with tempfile.TemporaryDirectory(prefix='kos-doc-bench-') as tmp:
+        full = build(tmp, args.builder)
+        print(f"full build:        {full:7.2f}s")
+        os.utime(page)
+        incremental = build(tmp, args.builder)
+        print(f"after editing {args.page}: {incremental:7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
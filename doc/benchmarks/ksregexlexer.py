@@ -0,0 +1,100 @@
+#
+# The original, rule-list based Kerboscript lexer.  Sphinx doesn't use it
+# (kslexer.KerboscriptLexer is what highlights the manual); it is only
+# kept as the reference that lexer is checked against, by
+# lexer_throughput.py.  Both take their word lists from the same
+# generated tables, so only a change to the rules themselves needs to be
+# made in both.
+#
+
+import os
+import re
+import sys
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOC_DIR)
+
+from pygments.lexer import RegexLexer, default, words
+from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
+    Number, Punctuation, Error
+
+import kslexer
+import kslexer_names
+
+__all__ = ['KerboscriptRegexLexer']
+
+
+def _names_of(tokentype):
+    return sorted(word for word, token in kslexer_names.NAME_TOKENS.items()
+                  if token is tokentype)
+
+
+class KerboscriptRegexLexer(RegexLexer):
+
+    name = 'Kerboscript (regex reference)'
+    aliases = ['kerboscript-regex']
+    filenames = []
+    # mimetypes = ['text/somethinghere'] # We don't have a kerboscript mime type (yet?)
+
+    flags = re.MULTILINE | re.DOTALL | re.IGNORECASE
+
+    tokens = {
+        #
+        # See http://pygments.org/docs/tokens/ for a list of parts of speech
+        # to assign things to in this list
+        #
+        'root': [
+            #
+            # Note: Precedence in a tie is to pick the one that
+            # came earlier in this list.
+            #
+            # Warning: In my experimentation I found that if a rule is
+            # present in the list below where a string of zero length
+            # matches the regex, this causes Pygment to just get stuck
+            # in an infinite loop.
+            #     For example, if the whitespace regex was:
+            #         [\t\s\r\n]*
+            #     Instead of :
+            #         [\t\s\r\n]+
+            #     Then zero chars would be a valid match.  So
+            #     Pygment matches the rule without advancing
+            #     any further into the input, and just gets
+            #     stuck doing that forever.
+            #
+            #
+            # Every rule must also run in linear time, as this lexer (and
+            # the fast one mirroring it) is used on text from anywhere:
+            # no nested quantifiers, and nothing that may scan to the end
+            # of the text more than once.  benchmarks/lexer_pathological.py
+            # holds KerboscriptLexer to that.
+            #
+            (r'//[^\r\n]*[\r\n]?', Comment.Single),
+            (r'"[^"]*"', String),
+            # A quote with no closing quote anywhere after it: flag the
+            # quote and take the rest of its line as the string, then go
+            # on with the next line as code.
+            (r'"', Error, 'unterminated-string'),
+            (r'[\t\s\r\n]+', Text), #whitespace
+            (r'[*/+|?<>=#^\-]', Operator),
+            (words(sorted(kslexer.OPERATOR_WORDS), prefix=r'\b', suffix=r'\b'), Operator.Word),
+            (r'[()\[\]\.,:\{\}@]', Punctuation),
+            (words(sorted(kslexer.KEYWORDS), suffix=r'\b'), Keyword),
+            (words(sorted(kslexer.DECLARATION_WORDS), prefix=r'\b', suffix=r'\b'), Keyword.Declaration),
+            (words(sorted(kslexer.BUILTIN_WORDS), prefix=r'\b', suffix=r'\b'), Name.Builtin),
+            # A suffix, even one called like a documented name (the
+            # BODY in SHIP:BODY).
+            (r'(?<=:)\b[a-z_][a-z_\d]*\b', Name.Variable),
+            # The names in the checked-in kslexer_names.py, which is what
+            # KerboscriptLexer uses too until kslexer.use_names() is called.
+            (words(_names_of(Name.Variable.Global), prefix=r'\b', suffix=r'\b'), Name.Variable.Global),
+            (words(_names_of(Name.Function), prefix=r'\b', suffix=r'\b'), Name.Function),
+            (words(_names_of(Name.Class), prefix=r'\b', suffix=r'\b'), Name.Class),
+            (r'\b[a-z_][a-z_\d]*\b', Name.Variable),
+            (r'\b(\d+\.\d*|\.\d+|\d+)[eE][+-]?\d+\b', Number.Float),
+            (r'\b\d+\b', Number.Float), # markup ints just like floats
+        ],
+        'unterminated-string': [
+            (r'[^\r\n]+', String, '#pop'),
+            default('#pop'),
+        ],
+    }
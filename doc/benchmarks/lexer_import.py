@@ -0,0 +1,122 @@
+#
+# Import-time and memory benchmark for the standalone Kerboscript lexer.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/lexer_import.py [--size-mb 20]
+#
+# Import time: starts a fresh interpreter per run and compares importing
+# kslexer (pygments only) with importing the KerboscriptLexer Sphinx
+# extension (which pulls in Sphinx).
+#
+# Memory: writes a large .ks file made of the kerboscript_tests corpus
+# repeated, then counts its tokens once by reading it whole into
+# get_tokens_unprocessed() and once by streaming it through tokenize()
+# in 64 KiB chunks, reporting the tracemalloc peak of each.  The two
+# token streams are compared as they go.
+#
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(DOC_DIR)
+sys.path.insert(0, DOC_DIR)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def import_time(module, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import ' + module],
+                       check=True, cwd=DOC_DIR)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def write_big_file(path, size):
+    pattern = os.path.join(REPO_DIR, 'kerboscript_tests', '**', '*.ks')
+    corpus = ''
+    for name in sorted(glob.glob(pattern, recursive=True)):
+        with open(name, encoding='utf-8', errors='replace') as f:
+            corpus += f.read() + '\n'
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < size:
+            f.write(corpus)
+            written += len(corpus)
+    return written
+
+
+def read_chunks(path):
+    with open(path, encoding='utf-8') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time importing the lexer and measure tokenize() memory.")
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--size-mb', type=float, default=20)
+    args = parser.parse_args()
+
+    for module in ('kslexer', 'KerboscriptLexer'):
+        print(f"import {module + ':':<18}"
+              f"{import_time(module, args.repeat) * 1000:8.1f} ms "
+              f"(fresh interpreter, best of {args.repeat})")
+
+    from kslexer import KerboscriptLexer, tokenize
+
+    with tempfile.TemporaryDirectory(prefix='kos-lexer-bench-') as tmp:
+        path = os.path.join(tmp, 'big.ks')
+        size = write_big_file(path, int(args.size_mb * 1024 * 1024))
+        print(f"input: {size / 1024 / 1024:.1f} MiB")
+
+        def whole():
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            return sum(1 for _ in KerboscriptLexer()
+                       .get_tokens_unprocessed(text))
+
+        def streamed():
+            return sum(1 for _ in tokenize(read_chunks(path)))
+
+        for label, func in (('whole file', whole), ('tokenize()', streamed)):
+            count, elapsed, peak = measure(func)
+            print(f"{label + ':':<12}{count} tokens in {elapsed:6.2f} s, "
+                  f"peak {peak / 1024 / 1024:8.2f} MiB")
+
+        with open(path, encoding='utf-8') as f:
+            expected = KerboscriptLexer().get_tokens_unprocessed(f.read())
+            for want, got in zip(expected, tokenize(read_chunks(path))):
+                if want != got:
+                    print(f"MISMATCH: expected {want} got {got}")
+                    sys.exit(1)
+        print("tokenize() output matches get_tokens_unprocessed()")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#
+# Latency benchmark for kslexer.IncrementalLexer.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/lexer_incremental.py [--lines N] [--edits N]
+#
+# Builds a file of --lines lines (default 10000) out of the scripts in
+# kerboscript_tests/, then makes --edits (default 2000) random
+# single-char edits to it: inserting, deleting or replacing one char,
+# with quotes and newlines among the chars typed.  Prints the median,
+# 95th percentile and worst time edit() takes, next to the time of a
+# full re-lex of the file, and checks after every --check-every edits
+# (default 50) and after the last one that the tokens are exactly those
+# of a full re-lex.  Exits with status 1 if they ever aren't.
+#
+
+import argparse
+import glob
+import os
+import random
+import statistics
+import sys
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(DOC_DIR)
+sys.path.insert(0, DOC_DIR)
+
+import kslexer
+
+# What gets typed: mostly code chars, but also the ones that change the
+# most tokens at once.
+TYPED = 'abcdefghijklmnopqrstuvwxyz0123456789 .,:()[]{}+-*/"\n\t_#'
+
+
+def build_text(lines):
+    pattern = os.path.join(REPO_DIR, 'kerboscript_tests', '**', '*.ks')
+    corpus = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            corpus.extend(f.read().splitlines())
+    return '\n'.join(corpus[i % len(corpus)] for i in range(lines)) + '\n'
+
+
+def full_lex(text):
+    return list(kslexer.KerboscriptLexer().get_tokens_unprocessed(text))
+
+
+def random_edit(rng, text):
+    pos = rng.randrange(len(text) + 1)
+    kind = rng.choice(('insert', 'delete', 'replace'))
+    if kind == 'insert' or pos == len(text):
+        return pos, pos, rng.choice(TYPED)
+    if kind == 'delete':
+        return pos, pos + 1, ''
+    return pos, pos + 1, rng.choice(TYPED)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time single-char edits with the incremental lexer.")
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--edits', type=int, default=2000)
+    parser.add_argument('--check-every', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    text = build_text(args.lines)
+    start = time.perf_counter()
+    full_lex(text)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    lexer = kslexer.IncrementalLexer(text)
+    initial = time.perf_counter() - start
+    print(f"{args.lines} lines, {len(text):,} chars")
+    print(f"full re-lex:      {full * 1000:8.2f} ms")
+    print(f"initial state:    {initial * 1000:8.2f} ms")
+
+    times = []
+    relexed = []
+    for i in range(args.edits):
+        edit_start, edit_end, typed = random_edit(rng, lexer.text)
+        start = time.perf_counter()
+        restart, old_stop, new_stop, tokens = lexer.edit(edit_start,
+                                                         edit_end, typed)
+        times.append(time.perf_counter() - start)
+        relexed.append(new_stop - restart)
+        if (i + 1) % args.check_every == 0 or i + 1 == args.edits:
+            if list(lexer.tokens()) != full_lex(lexer.text):
+                print(f"edit {i + 1}: tokens differ from a full re-lex")
+                sys.exit(1)
+
+    median = statistics.median(times)
+    print(f"{args.edits} single-char edits:")
+    print(f"  median:         {median * 1000:8.3f} ms"
+          f"  ({full / median:,.0f}x faster than a full re-lex)")
+    print(f"  95th percentile:{percentile(times, 0.95) * 1000:8.3f} ms")
+    print(f"  worst:          {max(times) * 1000:8.3f} ms")
+    print(f"  chars re-lexed: {statistics.median(relexed):8.0f} median, "
+          f"{max(relexed):,} worst")
+    print("tokens match a full re-lex")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#
+# Pathological-input benchmark for the Kerboscript lexer.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/lexer_pathological.py [--size BYTES] [--limit SECONDS]
+#
+# Lexes a set of inputs built to trip up regex-based lexers (long digit
+# runs, unterminated strings and comments, megabyte-long lines, runs of
+# word chars with no word boundary in them, ...) with KerboscriptLexer
+# and with the streaming tokenize(), each in a child process that is
+# killed once it runs past --limit seconds (default 5).  Every input is
+# lexed at a quarter of --size (default 1 MiB) and at full size, and the
+# time must grow no more than linearly, within a generous margin for
+# timer noise.  Exits with status 1 if any case times out, grows faster
+# than linearly or fails to cover its input with tokens.
+#
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DOC_DIR)
+
+import kslexer
+
+# Each case is a function of the wanted size in chars.
+CASES = [
+    ('digit run', lambda n: '1' * n),
+    ('digit run, then a letter', lambda n: '1' * n + 'a'),
+    ('digits glued to letters', lambda n: '1e' * (n // 2)),
+    ('word run, then an accented letter', lambda n: 'a' * n + '\xe9'),
+    ('word after a digit', lambda n: '1' + 'x' * n),
+    ('unterminated string', lambda n: '"' + 'x' * n),
+    ('unterminated string, many lines',
+     lambda n: '"' + 'print x.\n' * (n // 9)),
+    ('unterminated comment', lambda n: '//' + 'x' * n),
+    ('slashes', lambda n: '/' * n),
+    ('quotes', lambda n: '"' * n),
+    ('dots', lambda n: '.' * n),
+    ('numbers and dots', lambda n: '1.' * (n // 2)),
+    ('one long line of code', lambda n: 'set x to 1 + 2. ' * (n // 16)),
+    ('whitespace', lambda n: ' \t' * (n // 2) + 'x'),
+]
+
+# Allowed growth of the time taken from size n/4 to n.  Linear is 4,
+# quadratic 16; the slack is for timer noise on the short runs.
+MAX_GROWTH = 8.0
+# Below this many seconds at full size a case is too quick for its
+# growth to be measured reliably, and only has to finish.
+MIN_MEASURABLE = 0.05
+
+
+def _lex(kind, text):
+    if kind == 'lexer':
+        tokens = kslexer.KerboscriptLexer().get_tokens_unprocessed(text)
+    else:
+        chunks = (text[i:i + 4096] for i in range(0, len(text), 4096))
+        tokens = kslexer.tokenize(chunks)
+    covered = 0
+    for pos, tokentype, value in tokens:
+        if pos != covered:
+            raise ValueError('token at %d, expected %d' % (pos, covered))
+        covered += len(value)
+    if covered != len(text):
+        raise ValueError('tokens cover %d of %d chars'
+                         % (covered, len(text)))
+
+
+def _child(kind, case, size, queue):
+    text = dict(CASES)[case](size)
+    start = time.perf_counter()
+    try:
+        _lex(kind, text)
+    except Exception as e:
+        queue.put(('error', str(e)))
+        return
+    queue.put(('ok', time.perf_counter() - start))
+
+
+def timed(kind, case, size, limit):
+    # (status, seconds or message), with status 'timeout' if the child
+    # had to be killed.
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_child,
+                                    args=(kind, case, size, queue))
+    child.start()
+    child.join(limit)
+    if child.is_alive():
+        child.terminate()
+        child.join()
+        return 'timeout', limit
+    return queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Lex pathological inputs under a hard time limit.")
+    parser.add_argument('--size', type=int, default=1024 * 1024)
+    parser.add_argument('--limit', type=float, default=5.0)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'case':<36}{'kind':<10}{'n/4':>10}{'n':>10}{'growth':>8}")
+    for case, make in CASES:
+        for kind in ('lexer', 'tokenize'):
+            results = [timed(kind, case, size, args.limit)
+                       for size in (args.size // 4, args.size)]
+            problem = None
+            for status, value in results:
+                if status == 'timeout':
+                    problem = f'took over {args.limit:.1f} s'
+                elif status == 'error':
+                    problem = value
+            if problem is None:
+                small, large = results[0][1], results[1][1]
+                growth = large / small if small else float('inf')
+                if large >= MIN_MEASURABLE and growth > MAX_GROWTH:
+                    problem = f'grows {growth:.1f}x for 4x the input'
+                print(f"{case:<36}{kind:<10}{small * 1000:8.1f}ms"
+                      f"{large * 1000:8.1f}ms{growth:7.1f}x")
+            if problem is not None:
+                print(f"{case:<36}{kind:<10}FAILED: {problem}")
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
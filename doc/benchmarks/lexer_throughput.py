@@ -0,0 +1,100 @@
+#
+# Checks that KerboscriptLexer produces exactly the same tokens as the
+# reference KerboscriptRegexLexer (in ksregexlexer.py), then measures
+# tokens per second for both.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/lexer_throughput.py [--min-speedup 2.0]
+#
+# The corpus is every .ks file under kerboscript_tests/.  The script
+# exits non-zero if any file lexes differently, or if the fast lexer is
+# not at least --min-speedup times faster than the reference one.
+#
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(DOC_DIR)
+sys.path.insert(0, DOC_DIR)
+
+from kslexer import KerboscriptLexer
+from ksregexlexer import KerboscriptRegexLexer
+
+
+def load_corpus():
+    pattern = os.path.join(REPO_DIR, 'kerboscript_tests', '**', '*.ks')
+    corpus = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            corpus.append((os.path.relpath(path, REPO_DIR), f.read()))
+    return corpus
+
+
+def check_equivalence(corpus, fast, reference):
+    mismatches = 0
+    for path, text in corpus:
+        expected = list(reference.get_tokens(text))
+        actual = list(fast.get_tokens(text))
+        if actual != expected:
+            mismatches += 1
+            for i, (want, got) in enumerate(zip(expected, actual)):
+                if want != got:
+                    break
+            else:
+                i = min(len(expected), len(actual))
+            print(f"MISMATCH {path}: token {i}: expected "
+                  f"{expected[i:i + 1]} got {actual[i:i + 1]}")
+    return mismatches
+
+
+def time_lexers(lexers, corpus, repeat):
+    # Runs are interleaved and the best of each kept, so background load
+    # on the machine hits every lexer about equally.
+    best = [None] * len(lexers)
+    count = 0
+    for _ in range(repeat):
+        for i, lexer in enumerate(lexers):
+            count = 0
+            start = time.perf_counter()
+            for _, text in corpus:
+                for _ in lexer.get_tokens(text):
+                    count += 1
+            elapsed = time.perf_counter() - start
+            if best[i] is None or elapsed < best[i]:
+                best[i] = elapsed
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check and time KerboscriptLexer against the reference.")
+    parser.add_argument('-r', '--repeat', type=int, default=10)
+    parser.add_argument('--min-speedup', type=float, default=2.0)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    fast = KerboscriptLexer()
+    reference = KerboscriptRegexLexer()
+
+    mismatches = check_equivalence(corpus, fast, reference)
+    print(f"{len(corpus)} files, {mismatches} with differing tokens")
+
+    count, (regex_time, fast_time) = time_lexers(
+        (reference, fast), corpus, args.repeat)
+    for label, elapsed in (('regex', regex_time), ('fast', fast_time)):
+        print(f"{label:>6}: {count} tokens in {elapsed * 1000:8.1f} ms "
+              f"= {count / elapsed:12,.0f} tokens/s")
+    speedup = regex_time / fast_time
+    print(f"speedup: {speedup:.2f}x (target {args.min_speedup:.2f}x)")
+
+    if mismatches or speedup < args.min_speedup:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
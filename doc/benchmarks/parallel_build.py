@@ -0,0 +1,56 @@
+#
+# Compares a serial (-j 1) docs build against a parallel (-j N) one.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/parallel_build.py [-j N] [--builder html]
+#
+# Each run builds doc/source from scratch into its own temporary
+# directory, so the numbers include the full read and write phases.
+#
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+
+
+def time_build(builder, jobs):
+    with tempfile.TemporaryDirectory(prefix='kos-doc-bench-') as tmp:
+        cmd = [sys.executable, '-m', 'sphinx', '-q', '-b', builder,
+               '-j', str(jobs),
+               '-d', os.path.join(tmp, 'doctrees'),
+               SOURCE_DIR, os.path.join(tmp, builder)]
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, cwd=DOC_DIR)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a -j 1 docs build against a -j N one.")
+    parser.add_argument('-j', '--jobs', default=str(os.cpu_count() or 1),
+                        help='worker count for the parallel run '
+                             '(default: number of CPUs)')
+    parser.add_argument('-b', '--builder', default='html')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+                        help='keep the best of this many runs per mode')
+    args = parser.parse_args()
+
+    results = []
+    for jobs in ('1', args.jobs):
+        best = min(time_build(args.builder, jobs) for _ in range(args.repeat))
+        results.append((jobs, best))
+        print(f"-j {jobs:>4}: {best:7.2f}s")
+
+    serial = results[0][1]
+    parallel = results[1][1]
+    print(f"speedup: {serial / parallel:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
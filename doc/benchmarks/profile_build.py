@@ -0,0 +1,190 @@
+#
+# Profiles a full docs build with ksprofile and compares it against the
+# checked-in baseline, benchmarks/profile_baseline.json.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/profile_build.py [--report ks-profile.json]
+#                                        [--tolerance 1.5] [--update]
+#
+# Without --report a from-scratch serial html build of source/ is done
+# into a temporary directory with KS_PROFILE set.  The phases, event
+# handler time per extension, ks directives, reference resolving and
+# highlighting are then printed next to the baseline.
+#
+# Times in seconds only hold for the machine they were taken on, so the
+# baseline doesn't keep them: it keeps the share of the whole build's
+# time each of these took, and those are what is compared.  A part that
+# takes more than --tolerance times its share in the baseline (ignoring
+# anything under --min-share there) makes it exit with status 1, so a
+# change that slows one part of the build down shows up on any machine;
+# a build that is slower all over, as on a busy machine, doesn't.  Counts
+# that differ are printed but don't fail, since they change with the
+# docs.  --update writes the new shares to the baseline instead, to be
+# committed along with a change that is meant to move them.
+#
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+BASELINE_PATH = os.path.join(DOC_DIR, 'benchmarks', 'profile_baseline.json')
+TOP_DOCUMENTS = 20
+
+
+def profiled_build():
+    with tempfile.TemporaryDirectory(prefix='kos-doc-profile-') as tmp:
+        env = dict(os.environ, KS_PROFILE='ks-profile.json')
+        subprocess.run([sys.executable, '-m', 'sphinx', '-q', '-E',
+                        '-b', 'html', '-d', os.path.join(tmp, 'doctrees'),
+                        SOURCE_DIR, os.path.join(tmp, 'html')],
+                       check=True, cwd=DOC_DIR, env=env,
+                       stderr=subprocess.DEVNULL)
+        with open(os.path.join(tmp, 'html', 'ks-profile.json'),
+                  encoding='utf-8') as f:
+            return json.load(f)
+
+
+def summarize(report):
+    #
+    # The part of a report that goes into the baseline: everything but
+    # the per-document numbers, of which only the slowest are kept, with
+    # each time given as its share of the whole build's.
+    #
+    total = report['phases']['total']
+
+    def share(seconds):
+        return round(seconds / total, 5) if total else 0.0
+
+    extensions = {}
+    for module, events in report['extensions'].items():
+        extensions[module] = [
+            sum(count for count, seconds in events.values()),
+            share(sum(seconds for count, seconds in events.values()))]
+    documents = sorted(report['documents'].items(),
+                       key=lambda item: -item[1]['total'])
+    return {
+        'format': report['format'],
+        'machine': {
+            'python': platform.python_version(),
+            'sphinx': report['sphinx'],
+            'cpus': os.cpu_count(),
+        },
+        # Only for reading: nothing is compared with it.
+        'seconds': round(total, 3),
+        'phases': dict((phase, share(seconds))
+                       for phase, seconds in report['phases'].items()
+                       if phase != 'total'),
+        'extensions': extensions,
+        'directives': dict((name, [count, share(seconds)])
+                           for name, (count, seconds)
+                           in report['directives'].items()),
+        'xrefs': dict((name, [count, share(seconds)])
+                      for name, (count, seconds) in report['xrefs'].items()),
+        'highlight': dict((lang, [count, share(seconds)])
+                          for lang, (count, seconds)
+                          in report['highlight'].items()),
+        'documents': len(report['documents']),
+        'slowest_documents': dict(
+            (docname, share(doc['total']))
+            for docname, doc in documents[:TOP_DOCUMENTS]),
+    }
+
+
+def compare(current, baseline, tolerance, min_share):
+    # Prints current against baseline, as percentages of the build's
+    # time; returns the regressions found.
+    regressions = []
+
+    def row(section, name, now, then):
+        now_count, now_share = now if isinstance(now, list) \
+            else (None, now)
+        then_count, then_share = then if isinstance(then, list) \
+            else (None, then)
+        ratio = now_share / then_share if then_share else float('inf')
+        flag = ''
+        if then_share >= min_share and ratio > tolerance:
+            flag = '  SLOWER'
+            regressions.append(f'{section} {name}: {then_share:.1%} '
+                               f'-> {now_share:.1%} of the build')
+        if now_count is not None and now_count != then_count:
+            flag += f'  count {then_count} -> {now_count}'
+        print(f"  {name:<44}{then_share:9.2%}{now_share:9.2%}"
+              f"{ratio:7.2f}x{flag}")
+
+    for section in ('phases', 'extensions', 'directives', 'xrefs',
+                    'highlight'):
+        print(f"{section:<46}{'baseline':>9}{'now':>9}")
+        names = list(baseline.get(section, {}))
+        names += [name for name in current[section] if name not in names]
+        for name in names:
+            now = current[section].get(name, 0.0)
+            then = baseline.get(section, {}).get(name, 0.0)
+            if isinstance(now, list) and not isinstance(then, list):
+                then = [0, then]
+            if isinstance(then, list) and not isinstance(now, list):
+                now = [0, now]
+            row(section, name, now, then)
+    print(f"build: {baseline.get('seconds')} s -> {current['seconds']} s "
+          f"(not compared)")
+    print(f"documents: {baseline.get('documents')} -> "
+          f"{current['documents']}")
+    print("slowest documents now:")
+    for docname, share in list(current['slowest_documents'].items())[:10]:
+        then = baseline.get('slowest_documents', {}).get(docname)
+        then = f'{then:9.2%}' if then is not None else f"{'-':>9}"
+        print(f"  {docname:<44}{then}{share:9.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profile a docs build and compare it to the baseline.")
+    parser.add_argument('--report',
+                        help="use this ksprofile report instead of building")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--min-share', type=float, default=0.01,
+                        help="ignore parts that took less than this "
+                             "fraction of the build in the baseline")
+    parser.add_argument('--update', action='store_true',
+                        help="write the numbers to the baseline")
+    args = parser.parse_args()
+
+    if args.report:
+        with open(args.report, encoding='utf-8') as f:
+            report = json.load(f)
+    else:
+        report = profiled_build()
+    current = summarize(report)
+
+    if args.update:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=1)
+            f.write('\n')
+        print(f"baseline written to {os.path.relpath(BASELINE_PATH)}")
+        return
+    try:
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except OSError:
+        print("no baseline yet; run with --update to make one")
+        sys.exit(1)
+    print(f"baseline made with {baseline.get('machine')}")
+    regressions = compare(current, baseline, args.tolerance,
+                          args.min_share)
+    if regressions:
+        print(f"more than {args.tolerance:.2f}x their share of the build "
+              f"in the baseline:")
+        for regression in regressions:
+            print('  ' + regression)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
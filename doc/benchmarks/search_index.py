@@ -0,0 +1,170 @@
+#
+# Compares what an object lookup costs with the sharded ks search index
+# (kssearch.py) and with Sphinx's own searchindex.js.
+#
+# Usage, from the doc/ directory, after an html build:
+#
+#     python benchmarks/search_index.py [--html gh-pages] [--kbps 1600]
+#                                       [--rtt 150] [QUERY ...]
+#
+# For each query (default: a few typical lookups) it lists the files a
+# browser with an empty cache has to fetch before the first result can
+# be shown, and their size as served and gzipped:
+#
+#     default  the scripts search.html loads on top of what every page
+#              has, and searchindex.js.
+#     ks       index.js and the shards the query needs (kssearch.js
+#              itself comes with every page, like doctools.js).
+#
+# Time to first result is then estimated for a link of --kbps kbit/s
+# with --rtt ms round trips: one round trip per wave of requests that
+# depend on each other (the manifest before the shards), the gzipped
+# bytes at the link's speed, and the time to parse what was fetched,
+# measured here with Python's json module as a stand-in for the
+# browser's.  The estimate is a model, not a measurement in a browser.
+#
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = ['VESSEL:', 'vessel:alt', 'engine:mass', ':mass', 'lock',
+           'print', 'list']
+
+_src_re = re.compile(r'<script[^>]* src="([^"?]+)')
+_call_re = re.compile(r'^[\w.]+\((.*)\);?\s*$', re.S)
+
+
+def served(html_dir, rel):
+    with open(os.path.join(html_dir, rel), 'rb') as f:
+        data = f.read()
+    return data, len(gzip.compress(data, 6))
+
+
+def parse_seconds(data):
+    # Time to parse the JSON arguments of a Foo.bar(...) script.
+    text = data.decode('utf-8')
+    match = _call_re.match(text)
+    if match is None:
+        return 0.0
+    payload = '[' + match.group(1) + ']'
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        json.loads(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scripts(html_dir, page):
+    with open(os.path.join(html_dir, page), encoding='utf-8') as f:
+        return _src_re.findall(f.read())
+
+
+def default_cost(html_dir):
+    # [(file, bytes, gzipped, parse seconds)], round trips.
+    on_every_page = set(scripts(html_dir, 'index.html'))
+    files = [src for src in scripts(html_dir, 'search.html')
+             if src not in on_every_page] + ['searchindex.js']
+    cost = []
+    for rel in files:
+        data, gzipped = served(html_dir, rel)
+        seconds = parse_seconds(data) if rel == 'searchindex.js' else 0.0
+        cost.append((rel, len(data), gzipped, seconds))
+    # The scripts and the index are requested together.
+    return cost, 1
+
+
+def ks_cost(html_dir, manifest, query):
+    keys = shard_keys(query)
+    files = ['_static/kssearch/index.js']
+    files += ['_static/kssearch/' + manifest['shards'][key]
+              for key in keys if key in manifest['shards']]
+    cost = []
+    for rel in files:
+        data, gzipped = served(html_dir, rel)
+        cost.append((rel, len(data), gzipped, parse_seconds(data)))
+    # The manifest, then the shards it names.
+    return cost, 2 if len(files) > 1 else 1
+
+
+def shard_keys(text):
+    # The shards kssearch.js fetches for text; see its parse().
+    query = text.strip().upper()
+    prefix = lambda name: re.sub('[^a-z0-9]', '_', name[:1].lower()) or '_'
+    if ':' in query[1:]:
+        return ['suffixes-' + prefix(query)]
+    if query.startswith(':'):
+        return ['members-' + prefix(query[1:])] if query[1:] else []
+    return [kind + '-' + prefix(query) for kind in
+            ('structures', 'functions', 'globals', 'keywords', 'members')]
+
+
+def first_result(cost, round_trips, kbps, rtt):
+    gzipped = sum(entry[2] for entry in cost)
+    parse = sum(entry[3] for entry in cost)
+    return round_trips * rtt / 1000 + gzipped * 8 / (kbps * 1000) + parse
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare object lookups in the ks search index "
+        "and in searchindex.js.")
+    parser.add_argument('queries', nargs='*', metavar='QUERY')
+    parser.add_argument('--html', default=os.path.join(DOC_DIR, 'gh-pages'),
+                        help="html output directory (default: gh-pages)")
+    parser.add_argument('--kbps', type=float, default=1600,
+                        help="link speed in kbit/s (default: 1600)")
+    parser.add_argument('--rtt', type=float, default=150,
+                        help="round trip time in ms (default: 150)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="list the files of each lookup")
+    args = parser.parse_args()
+    queries = args.queries or QUERIES
+
+    index_path = os.path.join(args.html, '_static', 'kssearch', 'index.js')
+    if not os.path.exists(index_path):
+        print(f"no ks search index in {args.html}; build the html first")
+        sys.exit(1)
+    with open(index_path, encoding='utf-8') as f:
+        manifest = json.loads(_call_re.match(f.read()).group(1))
+
+    default, default_trips = default_cost(args.html)
+    default_bytes = sum(entry[1] for entry in default)
+    default_gzipped = sum(entry[2] for entry in default)
+    default_time = first_result(default, default_trips, args.kbps, args.rtt)
+    print(f"link: {args.kbps:.0f} kbit/s, {args.rtt:.0f} ms round trips")
+    print(f"{'query':<16}{'files':>6}{'bytes':>10}{'gzipped':>10}"
+          f"{'first result':>14}")
+    print(f"{'(default)':<16}{len(default):>6}{default_bytes:>10,}"
+          f"{default_gzipped:>10,}{default_time * 1000:>11.0f} ms")
+    if args.verbose:
+        for rel, size, gzipped, seconds in default:
+            print(f"  {rel:<46}{size:>10,}{gzipped:>10,}")
+    for query in queries:
+        cost, trips = ks_cost(args.html, manifest, query)
+        size = sum(entry[1] for entry in cost)
+        gzipped = sum(entry[2] for entry in cost)
+        seconds = first_result(cost, trips, args.kbps, args.rtt)
+        print(f"{query:<16}{len(cost):>6}{size:>10,}{gzipped:>10,}"
+              f"{seconds * 1000:>11.0f} ms"
+              f"   {default_gzipped / gzipped:5.1f}x fewer bytes")
+        if args.verbose:
+            for rel, size, gzipped, seconds in cost:
+                print(f"  {rel:<46}{size:>10,}{gzipped:>10,}")
+    shards = manifest['shards'].values()
+    sizes = [os.path.getsize(os.path.join(args.html, '_static', 'kssearch',
+                                          name)) for name in shards]
+    print(f"{len(sizes)} shards, {sum(sizes):,} bytes in all, "
+          f"largest {max(sizes):,}; manifest "
+          f"{os.path.getsize(index_path):,} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#
+# Times how long a page edit takes to reach the browser with ksserve.py.
+#
+# Usage, from the doc/ directory, after a `make html`:
+#
+#     python benchmarks/serve_reload.py [--limit 2] [PAGE ...]
+#
+# Starts ksserve.py on the output of `make html` (gh-pages and
+# build/doctrees, or --outdir/--doctrees), listens on its event stream
+# like a page open in a browser would, then touches each page in turn
+# (structures/vessels/vessel.rst and a couple of smaller ones by default)
+# and reports the time from the touch to the reload event naming the
+# page.  Exits with status 1 if any of them took longer than --limit
+# seconds.
+#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+
+PAGES = ['structures/vessels/vessel.rst', 'math/basic.rst',
+         'commands/flight/cooked.rst']
+
+
+def connect(url, timeout):
+    # The event stream at url, once the server is up.
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return urllib.request.urlopen(url)
+        except (urllib.error.URLError, ConnectionError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time page edits reaching the browser with ksserve.py.")
+    parser.add_argument('pages', nargs='*', metavar='PAGE',
+                        help="pages to touch, relative to doc/source")
+    parser.add_argument('-o', '--outdir',
+                        default=os.path.join(DOC_DIR, 'gh-pages'))
+    parser.add_argument('-d', '--doctrees',
+                        default=os.path.join(DOC_DIR, 'build', 'doctrees'))
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--limit', type=float, default=2.0,
+                        help="seconds an edit may take (default: 2)")
+    args = parser.parse_args()
+    pages = args.pages or PAGES
+
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(DOC_DIR, 'ksserve.py'),
+         '--port', str(args.port), '-o', args.outdir, '-d', args.doctrees],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=DOC_DIR)
+    slow = 0
+    try:
+        # Generous: with no build to start from, this is a full one.
+        events = connect('http://127.0.0.1:%d/_ksserve/events' % args.port,
+                         timeout=600)
+        print(f"{'page':<40}{'pages written':>14}{'seconds':>9}")
+        for page in pages:
+            time.sleep(0.5)
+            uri = os.path.splitext(page)[0] + '.html'
+            os.utime(os.path.join(SOURCE_DIR, page))
+            start = time.perf_counter()
+            while True:
+                line = events.readline().decode('utf-8')
+                if not line:
+                    print("ksserve.py went away")
+                    sys.exit(1)
+                if line.startswith('data:'):
+                    written = json.loads(line[5:])
+                    if uri in written:
+                        break
+            seconds = time.perf_counter() - start
+            slow += seconds > args.limit
+            print(f"{page:<40}{len(written):>14}{seconds:>9.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+    if slow:
+        print(f"{slow} of {len(pages)} edits took over {args.limit:g} s")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#
+# Benchmark of the kerboscript syntax check (ksparser / kssyntaxcheck).
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/syntax_check.py [--workers N] [--max-seconds S]
+#
+# Times parsing every .ks file under kerboscript_tests/ (which should
+# all parse cleanly; any that don't are listed), then reads the whole
+# manual once into a temporary environment, pulls out its Kerboscript
+# code blocks the same way the build does, and times checking all of
+# them, in the build process and with N worker processes.  Exits with
+# status 1 if checking the manual takes longer than --max-seconds
+# (default 0.5), so the check stays cheap enough to run on every build.
+#
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(DOC_DIR)
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+sys.path.insert(0, DOC_DIR)
+
+from sphinx.application import Sphinx
+
+import ksparser
+import kssyntaxcheck
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def read_corpus():
+    pattern = os.path.join(REPO_DIR, 'kerboscript_tests', '**', '*.ks')
+    corpus = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            corpus.append((path, f.read()))
+    return corpus
+
+
+def read_manual():
+    with tempfile.TemporaryDirectory(prefix='kos-doc-bench-') as tmp:
+        app = Sphinx(SOURCE_DIR, SOURCE_DIR, os.path.join(tmp, 'html'),
+                     os.path.join(tmp, 'doctrees'), 'html',
+                     status=None, warning=None, freshenv=True,
+                     confoverrides={'ks_syntax_check': False})
+        app.builder.read()
+        snippets = []
+        for docname in sorted(app.env.found_docs):
+            doctree = app.env.get_doctree(docname)
+            for lineno, text in kssyntaxcheck.code_blocks(app, doctree):
+                snippets.append(text)
+        return snippets
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the kerboscript syntax check.")
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-seconds', type=float, default=0.5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ksparser.parse('')
+    print(f"grammar load:  {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    corpus = read_corpus()
+    lines = sum(text.count('\n') + 1 for path, text in corpus)
+    for path, text in corpus:
+        error = ksparser.check(text)
+        if error is not None:
+            print(f"{os.path.relpath(path, REPO_DIR)}:{error}")
+    elapsed = best_of(args.repeat,
+                      lambda: [ksparser.check(text) for path, text in corpus])
+    print(f"corpus: {len(corpus)} files, {lines} lines in "
+          f"{elapsed * 1000:.1f} ms = {lines / elapsed:,.0f} lines/s")
+
+    snippets = read_manual()
+    lines = sum(text.count('\n') + 1 for text in snippets)
+    errors = kssyntaxcheck.check_snippets(snippets)
+    print(f"manual: {len(snippets)} code blocks, {lines} lines, "
+          f"{len(errors)} with syntax errors")
+    serial = best_of(args.repeat,
+                     lambda: kssyntaxcheck.check_snippets(snippets))
+    print(f"  in-process:  {serial * 1000:8.1f} ms")
+    pooled = best_of(args.repeat,
+                     lambda: kssyntaxcheck.check_snippets(snippets,
+                                                          args.workers))
+    print(f"  {args.workers} workers:   {pooled * 1000:8.1f} ms")
+
+    if min(serial, pooled) > args.max_seconds:
+        print(f"slower than the {args.max_seconds:.2f} s target")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
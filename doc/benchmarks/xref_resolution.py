@@ -0,0 +1,129 @@
+#
+# Micro-benchmark of the ks cross-reference resolve phase.
+#
+# Usage, from the doc/ directory:
+#
+#     python benchmarks/xref_resolution.py
+#
+# Reads the whole manual once into a temporary environment, collects
+# every ks pending_xref node, then times resolving all of them with
+# KOSDomain.resolve_xref against the per-call objtypes_for_role() scan it
+# replaced, and :any: lookups through resolve_any_xref against Sphinx's
+# fallback of trying resolve_xref once per role.
+#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+sys.path.insert(0, DOC_DIR)
+
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.application import Sphinx
+from sphinx.util.nodes import make_refnode
+
+
+def legacy_resolve_xref(domain, builder, fromdocname, typ, target, contnode):
+    # KOSDomain.resolve_xref as it was before the prebuilt index.
+    for objtype in domain.objtypes_for_role(typ):
+        docname = domain.find_object(objtype, target.upper())[0]
+        if docname is not None:
+            return make_refnode(builder, fromdocname, docname,
+                                objtype + ':' + target.upper(),
+                                contnode, target + ' ' + objtype)
+
+
+def legacy_resolve_any_xref(domain, builder, fromdocname, target, contnode):
+    # What Sphinx falls back to when a domain has no resolve_any_xref.
+    results = []
+    for role in domain.roles:
+        res = legacy_resolve_xref(domain, builder, fromdocname, role,
+                                  target, contnode)
+        if res is not None:
+            results.append(('ks:' + role, res))
+    return results
+
+
+def collect_refs(env):
+    refs = []
+    for docname in sorted(env.found_docs):
+        doctree = env.get_doctree(docname)
+        for node in doctree.findall(addnodes.pending_xref):
+            if node.get('refdomain') == 'ks':
+                contnode = node[0].deepcopy() if node.children \
+                    else nodes.literal()
+                refs.append((docname, node['reftype'], node['reftarget'],
+                             node, contnode))
+    return refs
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time ks cross-reference resolution on the manual.")
+    parser.add_argument('-r', '--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='kos-doc-bench-') as tmp:
+        app = Sphinx(SOURCE_DIR, SOURCE_DIR, os.path.join(tmp, 'html'),
+                     os.path.join(tmp, 'doctrees'), 'html',
+                     status=None, warning=None, freshenv=True)
+        app.builder.read()
+        env = app.env
+        builder = app.builder
+        domain = env.get_domain('ks')
+        refs = collect_refs(env)
+
+        def run_legacy():
+            for docname, typ, target, node, contnode in refs:
+                legacy_resolve_xref(domain, builder, docname, typ, target,
+                                    contnode)
+
+        def run_indexed():
+            for docname, typ, target, node, contnode in refs:
+                domain.resolve_xref(env, docname, builder, typ, target, node,
+                                    contnode)
+
+        def run_any_legacy():
+            for docname, typ, target, node, contnode in refs:
+                legacy_resolve_any_xref(domain, builder, docname, target,
+                                        contnode)
+
+        def run_any_indexed():
+            for docname, typ, target, node, contnode in refs:
+                domain.resolve_any_xref(env, docname, builder, target, node,
+                                        contnode)
+
+        start = time.perf_counter()
+        domain.build_xref_index()
+        index_time = time.perf_counter() - start
+
+        print(f"{len(refs)} ks references, "
+              f"{domain.object_count()} objects")
+        print(f"index build:            {index_time * 1000:8.2f} ms")
+        for label, legacy, indexed in (
+                ('resolve_xref', run_legacy, run_indexed),
+                ('resolve_any_xref', run_any_legacy, run_any_indexed)):
+            old = best_of(args.repeat, legacy)
+            new = best_of(args.repeat, indexed)
+            print(f"{label + ' before:':<24}{old * 1000:8.2f} ms")
+            print(f"{label + ' after:':<24}{new * 1000:8.2f} ms "
+                  f"({old / new:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
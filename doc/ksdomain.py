@@ -1,13 +1,24 @@
 # -*- coding: utf-8 -*-
 
+import difflib
+import functools
+import hashlib
+import json
+import os
 import sys
 import re
+import sqlite3
 
+from docutils import nodes
+from docutils.parsers.rst import directives
 from sphinx import addnodes, version_info
 from sphinx.roles import XRefRole
 from sphinx.locale import _
 from sphinx.domains import Domain, ObjType
 from sphinx.directives import ObjectDescription
+from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util import logging
+from sphinx.util.docutils import SphinxDirective
 from sphinx.util.nodes import make_refnode
 # ### Next line is deprecated, and it seems to work without it, as per kOS PR #2339 ###
 # from sphinx.util.compat import Directive
@@ -31,9 +42,216 @@ ks_sig_re = re.compile(r'''
         \)
     )?
 ''', re.VERBOSE)
+
+class KOSSignature(object):
+    # What parse_signature() returns.  Instances are shared between
+    # every caller that parses the same string, so treat them as
+    # read-only.
+    __slots__ = ('prefix', 'object', 'args')
+
+    def __init__(self, prefix, object, args):
+        self.prefix = prefix
+        self.object = object
+        self.args = args
+
+    def __repr__(self):
+        return 'KOSSignature(%r, %r, %r)' % (self.prefix, self.object,
+                                             self.args)
+
+@functools.lru_cache(maxsize=4096)
+def parse_signature(sig):
+    #
+    # Splits a signature or reference target like "VESSEL:PARTSTAGGED(tag)"
+    # into prefix, object and args, or returns None if it doesn't start
+    # like one.  The same few thousand strings get parsed over and over
+    # by every directive and role, so results are memoized; see
+    # parse_signature.cache_info() for the hit counts.
+    #
+    m = ks_sig_re.match(sig)
+    if m is None:
+        return None
+    args = m.group('args')
+    if args is not None:
+        # ks_sig_re's greedy (.*) runs to the last ')' on the line, so
+        # "F(a) // note (b)" would give "a) // note (b" as the args.
+        # Cut them at the parenthesis that balances the opening one,
+        # which still keeps nested ones like "F(a(b), c)" whole.
+        depth = 1
+        for i, char in enumerate(args):
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth == 0:
+                    args = args[:i]
+                    break
+    return KOSSignature(m.group('prefix'), m.group('object'), args)
+
 ks_keyword_sig_re = re.compile(r'''(?P<object>[a-zA-Z][\w]*)(?:(?:\s+)(?P<params>(?:.+\((?P<args>.+)\))|(?:.+)))?\.?''', re.VERBOSE)
 
+logger = logging.getLogger(__name__)
+
+# Absolute path of the JSON-lines diagnostics report, or None when
+# ks_diagnostics_report is unset.  Set once in the main process at
+# builder-inited; forked reader and writer processes inherit it.
+_report_path = None
+
+def report_diagnostic(env, kind, message, docname, lineno=None, **fields):
+    #
+    # Every ks domain diagnostic goes through here.  It is logged as a
+    # Sphinx warning of type 'ks' and subtype kind, so it shows up with
+    # a proper file:line location, is turned into an error by -W, and
+    # can be silenced with e.g. suppress_warnings = ['ks.duplicate'].
+    # It is also appended to the ks_diagnostics_report file, if any.
+    #
+    location = (docname, lineno) if lineno is not None else docname
+    logger.warning(message, location=location, type='ks', subtype=kind)
+    if _report_path is None:
+        return
+    record = {
+        'kind': kind,
+        'docname': docname,
+        'source': str(env.doc2path(docname)),
+        'line': lineno,
+        'message': message,
+    }
+    record.update(fields)
+    # One short write in append mode per record, so lines written by
+    # parallel processes don't interleave.
+    with open(_report_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, sort_keys=True) + '\n')
+
+def report_duplicate(env, docname, lineno, objtype, name, otherdocname):
+    # Shared by add_target_and_index and KOSDomain.merge_domaindata so a
+    # parallel build reports a duplicate the same way a serial one does,
+    # at the line of the directive documenting it again.
+    report_diagnostic(env, 'duplicate',
+                      'duplicate description of %s %s, other instance in %s'
+                      % (objtype, name, env.doc2path(otherdocname)),
+                      docname, lineno, objtype=objtype, name=name,
+                      other_docname=otherdocname)
+
+_sentence_end_re = re.compile(r'(?<=[.!?])\s+(?=[A-Z(])')
+
+def first_sentence(text):
+    # The first sentence of a paragraph, on one line, as a summary for
+    # the suffix tables.
+    text = ' '.join(text.split())
+    return _sentence_end_re.split(text, 1)[0]
+
+# The object types, in the order KOSDomain.data['objects'] keeps a table
+# for each of them.
+OBJTYPES = ('global', 'function', 'keyword', 'structure', 'attribute',
+            'method')
+_objtype_index = dict((objtype, i) for i, objtype in enumerate(OBJTYPES))
+
+class KOSEntry(object):
+    #
+    # One documented object, as the domain keeps it in the environment:
+    # doc is the number of its document in data['docnames'], the rest
+    # what transform_content() found in its description (None where it
+    # says nothing).  There are over a thousand of these in every pickled
+    # environment, so they have slots, and pickle as a bare tuple of
+    # their values instead of a dict of field names.
+    #
+    __slots__ = ('doc', 'line', 'summary', 'access', 'type', 'parameter',
+                 'returnvalue', 'returntype', 'args')
+
+    def __init__(self, doc, line=None, summary=None, access=None, type=None,
+                 parameter=None, returnvalue=None, returntype=None,
+                 args=None):
+        self.doc = doc
+        self.line = line
+        self.summary = summary
+        self.access = access
+        self.type = type
+        self.parameter = parameter
+        self.returnvalue = returnvalue
+        self.returntype = returntype
+        self.args = args
+
+    def __reduce__(self):
+        return (KOSEntry, tuple(getattr(self, slot)
+                                for slot in self.__slots__))
+
+    def get(self, field, default=None):
+        # Like the dict of fields this used to be.
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+    def __repr__(self):
+        return 'KOSEntry(%s)' % ', '.join(repr(getattr(self, slot))
+                                          for slot in self.__slots__)
+
+# Field values short and repeated enough ("Scalar", "Get only") to be
+# worth interning, so every entry saying the same shares one string and
+# the pickle stores it once.
+_interned_fields = ('access', 'type', 'returntype')
+
 class KOSObject(ObjectDescription):
+    def run(self):
+        # Entries of the objects this directive registered, for
+        # transform_content.
+        self._entries = []
+        return super(KOSObject, self).run()
+
+    def transform_content(self, contentnode):
+        #
+        # Record this object's doc fields (:access:, :type:, :parameter:,
+        # :return: ...) in its domain entry, for the API index and the
+        # suffix tables.  This runs before Sphinx turns the
+        # raw field lists into their rendered form, so the field names
+        # are still as written.  Only the field lists directly in this
+        # directive count; a structure's nested attributes have their own.
+        #
+        fields = {'line': self.lineno}
+        params = []
+        for child in contentnode.children:
+            if isinstance(child, nodes.paragraph) and 'summary' not in fields:
+                fields['summary'] = first_sentence(child.astext())
+            if not isinstance(child, nodes.field_list):
+                continue
+            for field in child:
+                parts = field[0].astext().split(None, 1)
+                if not parts:
+                    continue
+                fieldtype = parts[0]
+                arg = parts[1].strip() if len(parts) > 1 else None
+                body = ' '.join(field[1].astext().split())
+                for field_type in self.doc_field_types:
+                    if arg is None:
+                        # A Field's own name counts too: 'access' and
+                        # 'type' are declared with no extra names.
+                        if not field_type.has_arg and (
+                                fieldtype == field_type.name or
+                                fieldtype in field_type.names):
+                            fields[field_type.name] = body
+                            break
+                    elif field_type.is_typed and (
+                            fieldtype in field_type.names or
+                            fieldtype in field_type.typenames):
+                        for param in params:
+                            if param[0] == arg:
+                                break
+                        else:
+                            param = [arg, '', '']
+                            params.append(param)
+                        if fieldtype in field_type.names:
+                            param[2] = body
+                        else:
+                            param[1] = body
+                        break
+        if params:
+            fields['parameter'] = tuple(tuple(param) for param in params)
+        if getattr(self, '_args', None):
+            fields['args'] = self._args
+        for field in _interned_fields:
+            if field in fields:
+                fields[field] = sys.intern(fields[field])
+        for entry in self._entries:
+            for field, value in fields.items():
+                setattr(entry, field, value)
+
     def add_target_and_index(self, name, sig, signode):
         targetname = self.objtype + ':' + name.upper()
         if targetname not in self.state.document.ids:
@@ -42,38 +260,13 @@ class KOSObject(ObjectDescription):
             signode['first'] = (not self.names)
             self.state.document.note_explicit_target(signode)
 
-            objects = self.env.domaindata['ks']['objects']
-            key = (self.objtype, name.upper())
-            if key in objects:
-                # this previously used:
-                #     self.env.warn()
-                # But that apparently doesn't exist anymore in
-                # Sphinx and I couldn't find with Google any
-                # examples of what you're supposed to update it to
-                # use instead from Sphinx.
-                # So I just replced it with a few dumb print
-                # statements so at least it won't crash and will
-                # show the actual message on screen:
-                #
-                # If anyone else can figure out what sphinx changed
-                # self.app.warn() to that should be used here
-                # instead, great - go ahead and fix this kludge:
-                print(".------ WARNING ----------")
-                print("| Warning in " + self.env.docname + " line", end=" ")
-                print(f"line {self.lineno}")
-                print("|   duplicate description of ")
-                print("|     " + self.objtype + " " + name.upper())
-                print("|   other instance in ")
-                print("|     " +  self.env.doc2path(objects[key]))
-                print("`-------------------------")
-                #self.app.warn(self.env.docname,
-                #              'duplicate description of %s %s, ' %
-                #              (self.objtype, name.upper()) +
-                #              'other instance in ' +
-                #              self.env.doc2path(objects[key]),
-                #              self.lineno)
-
-            objects[key] = self.env.docname
+            domain = self.env.get_domain('ks')
+            entry, other = domain.note_object(self.objtype, name.upper(),
+                                              self.env.docname)
+            if other is not None:
+                report_duplicate(self.env, self.env.docname, self.lineno,
+                                 self.objtype, name.upper(), other)
+            self._entries.append(entry)
         indextext = self.get_index_text(self.objtype, name)
         if indextext:
             # sphinx 1.4.0+ requires 5 elements
@@ -115,11 +308,13 @@ class KOSFunction(KOSObject):
     ]
 
     def handle_signature(self, sig, signode):
-        m = ks_sig_re.match(sig)
-        name = m.group('object')
+        m = parse_signature(sig)
+        if m is None:
+            raise ValueError(sig)
+        name = m.object
         signode += addnodes.desc_name(name,name)
 
-        args = m.group('args')
+        args = m.args
         if args:
             signode += addnodes.desc_parameterlist(args,args)
         else:
@@ -147,9 +342,18 @@ class KOSKeyword(KOSObject):
         return _('{}'.format(name))
 
 class KOSStructure(KOSObject):
+    # :inherits: names the structures this one inherits suffixes from,
+    # separated by commas or spaces.  References to their suffixes then
+    # also resolve through this structure (VESSEL:NAME finds
+    # ORBITABLE:NAME), and the page lists what is inherited.
+    option_spec = dict(KOSObject.option_spec)
+    option_spec['inherits'] = directives.unchanged
+
     def handle_signature(self, sig, signode):
-        m = ks_sig_re.match(sig)
-        name = m.group('object')
+        m = parse_signature(sig)
+        if m is None:
+            raise ValueError(sig)
+        name = m.object
         signode += addnodes.desc_annotation('structure ','structure ')
         signode += addnodes.desc_name(name,name)
         return name
@@ -159,6 +363,19 @@ class KOSStructure(KOSObject):
 
     def before_content(self):
         self.env.temp_data['ks:structure'] = self.names[0]
+        parents = self.options.get('inherits')
+        if parents and self.names:
+            domain = self.env.get_domain('ks')
+            domain.data['inherits'][self.names[0].upper()] = (
+                domain.doc_id(self.env.docname), self.lineno,
+                tuple(parents.replace(',', ' ').split()))
+
+    def transform_content(self, contentnode):
+        super(KOSStructure, self).transform_content(contentnode)
+        if self.options.get('inherits') and self.names:
+            node = inheritedsuffixes(structure=self.names[0].upper())
+            self.set_source_info(node)
+            contentnode += node
 
     def after_content(self):
         self.env.temp_data['ks:structure'] = None
@@ -171,23 +388,29 @@ class KOSAttribute(KOSObject):
     ]
 
     def handle_signature(self, sig, signode):
-        m = ks_sig_re.match(sig)
-        name = m.group('object')
+        m = parse_signature(sig)
+        if m is None:
+            raise ValueError(sig)
+        name = m.object
         struct = None  #might override further down
 
         current_struct = self.env.temp_data.get('ks:structure')
-        if m.group('prefix') is None:
+        if m.prefix is None:
             if current_struct is not None:
                 struct = current_struct
                 fullname = current_struct + ':' + name
             else:
-                raise Exception("Attribute name lacks a prefix and isn't " +
-                    "indented inside a structure section.  Problem " +
-                    "occurred at " + self.env.docname + ", line " +
-                     str(self.lineno) +
-                     ".")
+                report_diagnostic(self.env, 'unprefixed',
+                    "Attribute name %s lacks a prefix and isn't indented "
+                    "inside a structure section" % name,
+                    self.env.docname, self.lineno,
+                    objtype=self.objtype, name=name)
+                # ObjectDescription catches this and shows the signature
+                # as plain text, without a target, like Sphinx's own
+                # domains do for a signature they can't parse.
+                raise ValueError(sig)
         else:
-            struct = m.group('prefix').split(':')[-1]
+            struct = m.prefix.split(':')[-1]
             fullname = struct + ':' + name
 
         if struct is not None:
@@ -214,23 +437,29 @@ class KOSMethod(KOSObject):
     ]
 
     def handle_signature(self, sig, signode):
-        m = ks_sig_re.match(sig)
-        name = m.group('object')
+        m = parse_signature(sig)
+        if m is None:
+            raise ValueError(sig)
+        name = m.object
         struct = None  #might override further down
 
         current_struct = self.env.temp_data.get('ks:structure')
-        if m.group('prefix') is None:
+        if m.prefix is None:
             if current_struct is not None:
                 struct = current_struct
                 fullname = current_struct + ':' + name
             else:
-                raise Exception("Method name lacks a prefix and isn't " +
-                    "indented inside a structure section.  Problem " +
-                    "occurred at " + self.env.docname + ", line " +
-                     str(self.lineno) +
-                     ".")
+                report_diagnostic(self.env, 'unprefixed',
+                    "Method name %s lacks a prefix and isn't indented "
+                    "inside a structure section" % name,
+                    self.env.docname, self.lineno,
+                    objtype=self.objtype, name=name)
+                # ObjectDescription catches this and shows the signature
+                # as plain text, without a target, like Sphinx's own
+                # domains do for a signature they can't parse.
+                raise ValueError(sig)
         else:
-            struct = m.group('prefix').split(':')[-1]
+            struct = m.prefix.split(':')[-1]
             fullname = struct + ':' + name
 
         if struct is not None:
@@ -239,26 +468,72 @@ class KOSMethod(KOSObject):
 
         signode += addnodes.desc_name(fullname, name)
 
-        args = m.group('args')
+        args = m.args
         if args:
             signode += addnodes.desc_parameterlist(args,args)
         else:
             signode += addnodes.desc_parameterlist()
-
+        # For the suffix tables, via transform_content.
+        self._args = args
 
         return fullname
 
     def get_index_text(self, objectname, name):
         return _('{}()'.format(name))
 
+class inheritedsuffixes(nodes.General, nodes.Element):
+    # Where InheritedSuffixesTransform lists the suffixes a structure
+    # with :inherits: gets from its ancestors.  Attribute 'structure'.
+    pass
+
+class suffixtable(nodes.General, nodes.Element):
+    # Stands in for a ks:suffixtable until SuffixTableTransform puts the
+    # rendered table in its place.  Attribute 'structure': STRUCT.
+    pass
+
+class KOSSuffixTable(SphinxDirective):
+    #
+    # .. ks:suffixtable:: [Structure]
+    #
+    # The summary table of a structure's suffixes (name, type and the
+    # first sentence of the description), made from the ks:attribute and
+    # ks:method entries documented for it, wherever they are.  Inside a
+    # ks:structure the argument can be left out.
+    #
+    required_arguments = 0
+    optional_arguments = 1
+    has_content = False
+
+    def run(self):
+        if self.arguments:
+            m = parse_signature(self.arguments[0])
+            struct = m.object if m is not None else None
+        else:
+            struct = self.env.temp_data.get('ks:structure')
+        if not struct:
+            report_diagnostic(self.env, 'suffixtable',
+                              'ks:suffixtable needs a structure name when '
+                              'not inside a structure section',
+                              self.env.docname, self.lineno)
+            return []
+        struct = struct.upper()
+        domain = self.env.get_domain('ks')
+        domain.data['suffixtables'].setdefault(
+            domain.doc_id(self.env.docname), []).append((struct, self.lineno))
+        node = suffixtable(structure=struct)
+        self.set_source_info(node)
+        return [node]
+
 class KOSXRefRole(XRefRole):
 
     def process_link(self, *args):
         title, target =  super(KOSXRefRole,self).process_link(*args)
-        m = ks_sig_re.match(target)
-        target = m.group('object')
-        if m.group('prefix') is not None:
-            struct = m.group('prefix').split(':')[-1]
+        m = parse_signature(target)
+        if m is None:
+            return title, target.upper()
+        target = m.object
+        if m.prefix is not None:
+            struct = m.prefix.split(':')[-1]
             target = ':'.join([struct,target])
         return title, target.upper()
 
@@ -266,23 +541,55 @@ class KOSAttrXRefRole(XRefRole):
 
     def process_link(self, env, *args):
         title, target =  super(KOSAttrXRefRole,self).process_link(env, *args)
-        m = ks_sig_re.match(target)
-        target = m.group('object')
-        if m.group('prefix') is None:
+        m = parse_signature(target)
+        if m is None:
+            return title, target.upper()
+        target = m.object
+        if m.prefix is None:
             current_struct = env.temp_data.get('ks:structure')
             if current_struct is not None:
                 target = ':'.join([current_struct,target])
         else:
-            struct = m.group('prefix').split(':')[-1]
+            struct = m.prefix.split(':')[-1]
             target = ':'.join([struct,target])
         return title, target.upper()
 
+# Splits a type field like "List of Orbits" into words and the rest.
+_type_part_re = re.compile(r'([A-Za-z_]\w*)')
+
 class KOSDomain(Domain):
     name = 'ks'
     label = 'KerboScript'
+    #
+    # All of this is pickled into environment.pickle and loaded again by
+    # every incremental build, so it is kept compact: documents are
+    # numbered (a doc id is an index into 'docnames'), object types are
+    # the position of their table in 'objects', every object is one
+    # slotted KOSEntry, and names, reference targets and roles are
+    # interned so the pickle stores each only once.  Use the methods
+    # below (note_object, iter_objects, find_object, doc_id, docname)
+    # rather than the tables themselves.
+    #
     initial_data = {
-        'objects': {},  # fullname -> docname, objtype
+        'docnames': [],    # doc id -> docname
+        # One table per OBJTYPES entry: FULLNAME -> KOSEntry
+        'objects': [{} for objtype in OBJTYPES],
+        'refs': {},        # doc id -> tuple of (role, TARGET, lineno)
+        'suffixtables': {},  # doc id -> list of (STRUCT, lineno)
+        'inherits': {},    # STRUCT -> (doc id, lineno, (Parent, ...))
+        # doc id -> set of (OBJTYPES index, FULLNAME) it describes again
+        # after another document, as reported when it was read.
+        'duplicates': {},
+        # STRUCT -> digest of its inherited suffixes, as last written.
+        'inherited_cache': {},
+        # STRUCT -> (digest of its rows, rendered table node), kept from
+        # build to build; see update_suffix_tables().
+        'suffixtable_cache': {},
     }
+    # Bump whenever the layout of initial_data changes, so Sphinx throws
+    # away a pickled environment written by an older ksdomain.py instead
+    # of loading it.
+    data_version = 7
 
     object_types = {
         'global'   : ObjType(_('global'   ), 'global'),
@@ -299,35 +606,785 @@ class KOSDomain(Domain):
         'structure': KOSStructure,
         'attribute': KOSAttribute,
         'method'   : KOSMethod,
+        'suffixtable': KOSSuffixTable,
     }
     roles = {
-        'global': KOSXRefRole(),
-        'func'  : KOSXRefRole(),
-        'key'   : KOSXRefRole(),
-        'struct': KOSXRefRole(),
-        'attr'  : KOSAttrXRefRole(),
-        'meth'  : KOSAttrXRefRole(),
+        'global': KOSXRefRole(warn_dangling=True),
+        'func'  : KOSXRefRole(warn_dangling=True),
+        'key'   : KOSXRefRole(warn_dangling=True),
+        'struct': KOSXRefRole(warn_dangling=True),
+        'attr'  : KOSAttrXRefRole(warn_dangling=True),
+        'meth'  : KOSAttrXRefRole(warn_dangling=True),
     }
 
+    def __init__(self, env):
+        super(KOSDomain, self).__init__(env)
+        # role -> {NAME -> (objtype, docname, DEFINED_NAME)}, and for
+        # :any: references NAME -> [(role, objtype, docname, DEFINED_NAME)],
+        # and for suggesting near matches SUFFIX -> [(role, STRUCT:SUFFIX)].
+        # DEFINED_NAME is NAME itself, or for a suffix a structure
+        # inherits, ANCESTOR:SUFFIX.  Derived from self.data['objects'] and
+        # self.data['inherits'] by build_xref_index() once reading is done,
+        # so resolving a reference is one dict lookup.  Not part of
+        # self.data, so it is never pickled into the environment.
+        self._xref_index = None
+        self._any_index = None
+        self._suffix_index = None
+        # STRUCT -> [(Ancestor, [(objtype, SUFFIX), ...]), ...], nearest
+        # ancestor first and named as in :inherits:, and STRUCT -> [problem, ...] for :inherits:
+        # naming unknown structures or going round in a circle.
+        self._inherited = None
+        self._inherit_problems = None
+        # docname -> doc id, and doc id -> set of (objtype index, FULLNAME)
+        # it documents, for clear_doc().  Both follow from self.data, and
+        # are rebuilt from it when first needed.
+        self._doc_ids = None
+        self._doc_objects = None
+        # The xref index as it was before clear_doc() started on the
+        # documents being re-read, for changed_references().
+        self._previous_index = None
+        # (role, TARGET, limit) -> suggest_targets() result.  Only names
+        # go into those, so the results stay good for as long as the
+        # names under each role do; _suggested_from is the xref index
+        # they were made from.  Saves redoing difflib for every
+        # unresolved reference on each rebuild of a long-running process
+        # like ksserve.py.
+        self._suggestions = {}
+        self._suggested_from = None
+
+    def doc_id(self, docname):
+        # The number docname is stored under, given one if it has none.
+        if self._doc_ids is None:
+            self._doc_ids = dict((name, i) for i, name
+                                 in enumerate(self.data['docnames']))
+        doc = self._doc_ids.get(docname)
+        if doc is None:
+            doc = self._doc_ids[docname] = len(self.data['docnames'])
+            self.data['docnames'].append(docname)
+        return doc
+
+    def docname(self, doc):
+        return self.data['docnames'][doc]
+
+    def _objects_of(self, doc):
+        if self._doc_objects is None:
+            self._doc_objects = {}
+            for index, table in enumerate(self.data['objects']):
+                for name, entry in table.items():
+                    self._doc_objects.setdefault(entry.doc, set()).add(
+                        (index, name))
+        return self._doc_objects.setdefault(doc, set())
+
+    def note_object(self, objtype, name, docname):
+        #
+        # Registers FULLNAME name of type objtype as documented in
+        # docname.  Returns its new entry, for the directive to fill in,
+        # and the docname of the description it replaces, if there was
+        # one (a duplicate, for the caller to report).
+        #
+        index = _objtype_index[objtype]
+        table = self.data['objects'][index]
+        name = sys.intern(name)
+        other = table.get(name)
+        entry = table[name] = KOSEntry(self.doc_id(docname))
+        self._objects_of(entry.doc).add((index, name))
+        if other is not None:
+            self.data['duplicates'].setdefault(entry.doc, set()).add(
+                (index, name))
+        return entry, (self.docname(other.doc) if other is not None
+                       else None)
+
+    def iter_objects(self):
+        # (objtype, FULLNAME, docname, KOSEntry) for every object.
+        docnames = self.data['docnames']
+        for objtype, table in zip(OBJTYPES, self.data['objects']):
+            for name, entry in table.items():
+                yield objtype, name, docnames[entry.doc], entry
+
+    def find_object(self, objtype, name):
+        # (docname, KOSEntry) of FULLNAME name, or (None, None).
+        entry = self.data['objects'][_objtype_index[objtype]].get(name)
+        if entry is None:
+            return None, None
+        return self.docname(entry.doc), entry
+
+    def object_count(self):
+        return sum(len(table) for table in self.data['objects'])
+
+    def build_xref_index(self):
+        xref_index = dict((role, {}) for role in self.roles)
+        any_index = {}
+        suffix_index = {}
+        # Walk object types in declaration order so, should a role ever
+        # cover several of them, the first one wins like it used to.
+        by_type = dict((objtype, []) for objtype in self.object_types)
+        for objtype, name, docname, entry in self.iter_objects():
+            by_type.setdefault(objtype, []).append((name, docname))
+        for objtype, entries in by_type.items():
+            roles = self.object_types[objtype].roles
+            for name, docname in entries:
+                for role in roles:
+                    xref_index[role].setdefault(name,
+                                                (objtype, docname, name))
+                    any_index.setdefault(name, []).append(
+                        (role, objtype, docname, name))
+                    if ':' in name:
+                        suffix_index.setdefault(name.split(':')[-1], []) \
+                            .append((role, name))
+        self._build_inheritance(by_type, xref_index, any_index)
+        self._xref_index = xref_index
+        self._any_index = any_index
+        self._suffix_index = suffix_index
+        previous = self._suggested_from
+        if previous is None or any(
+                previous.get(role, {}).keys() != names.keys()
+                for role, names in xref_index.items()):
+            self._suggestions = {}
+        self._suggested_from = xref_index
+
+    def _build_inheritance(self, by_type, xref_index, any_index):
+        #
+        # Adds STRUCT:SUFFIX to the indexes for every suffix STRUCT
+        # inherits and doesn't document itself, pointing at the nearest
+        # ancestor's entry, so inherited suffixes cost nothing extra to
+        # resolve.
+        #
+        inherits = self.data['inherits']
+        own = {}  # STRUCT -> [(objtype, SUFFIX, docname)]
+        for objtype in ('attribute', 'method'):
+            for name, docname in by_type.get(objtype, ()):
+                if ':' in name:
+                    struct, suffix = name.rsplit(':', 1)
+                    own.setdefault(struct, []).append(
+                        (objtype, suffix, docname))
+        structures = set(name for name, docname
+                         in by_type.get('structure', ()))
+        inherited = {}
+        problems = {}
+        for struct, (docname, lineno, parents) in inherits.items():
+            # Breadth first, so the nearest definition of a suffix wins.
+            ancestors = []
+            seen = set([struct])
+            queue = list(parents)
+            while queue:
+                written = queue.pop(0)
+                parent = written.upper()
+                if parent == struct:
+                    problems.setdefault(struct, []).append(
+                        '%s inherits from itself, through a circle of '
+                        ':inherits: options' % struct)
+                if parent in seen:
+                    continue
+                seen.add(parent)
+                if parent not in structures:
+                    problems.setdefault(struct, []).append(
+                        '%s inherits from unknown structure %s'
+                        % (struct, written))
+                    continue
+                ancestors.append((parent, written))
+                queue.extend(inherits.get(parent, (None, None, ()))[2])
+            defined = set(suffix for objtype, suffix, d
+                          in own.get(struct, ()))
+            inherited[struct] = []
+            for ancestor, written in ancestors:
+                suffixes = []
+                for objtype, suffix, owner in own.get(ancestor, ()):
+                    if suffix in defined:
+                        continue
+                    defined.add(suffix)
+                    suffixes.append((objtype, suffix))
+                    name = struct + ':' + suffix
+                    target = (objtype, owner, ancestor + ':' + suffix)
+                    for role in self.object_types[objtype].roles:
+                        xref_index[role].setdefault(name, target)
+                        any_index.setdefault(name, []).append(
+                            (role,) + target)
+                if suffixes:
+                    inherited[struct].append((written, sorted(suffixes,
+                        key=lambda entry: entry[1])))
+        self._inherited = inherited
+        self._inherit_problems = problems
+
+    def inherited_suffixes(self, struct):
+        # [(Ancestor, [(objtype, SUFFIX), ...]), ...] for struct.
+        if self._inherited is None:
+            self.build_xref_index()
+        return self._inherited.get(struct, [])
+
+    def inheritance_problems(self, struct):
+        if self._inherited is None:
+            self.build_xref_index()
+        return self._inherit_problems.get(struct, [])
+
+    def suggest_targets(self, role, target, limit=3):
+        #
+        # Near matches for a reference that didn't resolve, as role
+        # markup ready to paste: the same target under another role
+        # (:attr: for what is really a :meth:), the same suffix on other
+        # structures, or else names of the same kind spelled similarly.
+        #
+        if self._xref_index is None:
+            self.build_xref_index()
+        target = target.upper()
+        key = (role, target, limit)
+        if key in self._suggestions:
+            return self._suggestions[key]
+        suggestions = []
+        for other_role, objtype, docname, name in \
+                self._any_index.get(target, ()):
+            if other_role != role:
+                suggestions.append(':%s:`%s`' % (other_role, target))
+        if ':' in target or role in ('attr', 'meth'):
+            suffix = target.split(':')[-1]
+            for other_role, name in sorted(self._suffix_index.get(suffix, ())):
+                if name != target:
+                    suggestions.append(':%s:`%s`' % (other_role, name))
+        if not suggestions:
+            names = self._xref_index.get(role, {})
+            for name in difflib.get_close_matches(target, names, n=limit):
+                suggestions.append(':%s:`%s`' % (role, name))
+        suggestions = self._suggestions[key] = suggestions[:limit]
+        return suggestions
+
+    def unresolved_references(self):
+        # (role, TARGET) -> list of (docname, lineno) for every ks
+        # reference in the whole project that doesn't resolve.
+        if self._xref_index is None:
+            self.build_xref_index()
+        missing = {}
+        for doc, refs in self.data['refs'].items():
+            docname = self.docname(doc)
+            for role, target, lineno in refs:
+                if target not in self._xref_index.get(role, {}):
+                    missing.setdefault((role, target), []).append(
+                        (docname, lineno))
+        return missing
+
+    def changed_references(self):
+        #
+        # Docnames of the documents with a ks reference that resolves
+        # differently now than before the documents just read were
+        # cleared: its target was added, removed or moved to another
+        # page.  Sphinx only rewrites the pages it re-read, so without
+        # this their links would go stale.
+        #
+        previous, self._previous_index = self._previous_index, None
+        if previous is None:
+            return set()
+        if self._xref_index is None:
+            self.build_xref_index()
+        changed = set()
+        for doc, refs in self.data['refs'].items():
+            for role, target, lineno in refs:
+                if previous.get(role, {}).get(target) != \
+                        self._xref_index[role].get(target):
+                    changed.add(self.docname(doc))
+                    break
+        return changed
+
     def resolve_xref(self, env, fromdocname, builder, typ, target, node,
                      contnode):
-        objects = self.data['objects']
-        objtypes = self.objtypes_for_role(typ)
-        for objtype in objtypes:
-            if (objtype, target.upper()) in objects:
-                return make_refnode(builder, fromdocname,
-                                    objects[objtype, target],
-                                    objtype + ':' + target.upper(),
-                                    contnode, target + ' ' + objtype)
+        if self._xref_index is None:
+            self.build_xref_index()
+        target = target.upper()
+        found = self._xref_index.get(typ, {}).get(target)
+        if found is not None:
+            objtype, docname, name = found
+            return make_refnode(builder, fromdocname, docname,
+                                objtype + ':' + name,
+                                contnode, name + ' ' + objtype)
+
+    def resolve_any_xref(self, env, fromdocname, builder, target, node,
+                         contnode):
+        if self._any_index is None:
+            self.build_xref_index()
+        # :any: targets don't go through our XRefRole.process_link.  Try
+        # the target as written first (some names, like "AG1 ... AG10",
+        # aren't plain identifiers), then with the same STRUCT:NAME
+        # normalization process_link would have applied.
+        target = target.upper()
+        if target not in self._any_index:
+            m = parse_signature(target)
+            if m is None:
+                return []
+            target = m.object
+            if m.prefix is not None:
+                target = m.prefix.split(':')[-1] + ':' + target
+        results = []
+        for role, objtype, docname, name in self._any_index.get(target, ()):
+            results.append(('ks:' + role,
+                            make_refnode(builder, fromdocname, docname,
+                                         objtype + ':' + name,
+                                         contnode, name + ' ' + objtype)))
+        return results
+
+    def clear_doc(self, docname):
+        # Called by Sphinx before a changed or removed document is re-read.
+        # _objects_of() lets this touch only that document's own objects
+        # instead of scanning the whole objects tables.
+        if self._previous_index is None:
+            if self._xref_index is None:
+                self.build_xref_index()
+            self._previous_index = self._xref_index
+        self._xref_index = self._any_index = self._suffix_index = None
+        self._inherited = None
+        doc = self.doc_id(docname)
+        self.data['refs'].pop(doc, None)
+        self.data['suffixtables'].pop(doc, None)
+        self.data['duplicates'].pop(doc, None)
+        inherits = self.data['inherits']
+        for struct in [struct for struct, entry in inherits.items()
+                       if entry[0] == doc]:
+            del inherits[struct]
+        tables = self.data['objects']
+        for index, name in self._objects_of(doc):
+            # A later duplicate in another document may have taken the
+            # name over; that document still owns it.
+            entry = tables[index].get(name)
+            if entry is not None and entry.doc == doc:
+                del tables[index][name]
+        self._doc_objects.pop(doc, None)
+
+    def merge_domaindata(self, docnames, otherdata):
+        # Called once per reader process in a parallel (-j N) build, with
+        # the objects that process registered while reading docnames.
+        # Its doc ids are its own, and are mapped to ours by name.
+        self._xref_index = self._any_index = self._suffix_index = None
+        self._inherited = None
+        other_docnames = otherdata['docnames']
+        docs = {}  # other doc id -> ours, for the docs in docnames
+        for docname in docnames:
+            try:
+                docs[other_docnames.index(docname)] = self.doc_id(docname)
+            except ValueError:
+                pass
+        for other, doc in docs.items():
+            if other in otherdata['refs']:
+                self.data['refs'][doc] = otherdata['refs'][other]
+            if other in otherdata['suffixtables']:
+                self.data['suffixtables'][doc] = \
+                    otherdata['suffixtables'][other]
+            if other in otherdata['duplicates']:
+                self.data['duplicates'][doc] = \
+                    otherdata['duplicates'][other]
+        # The other tables only hold the entries that won over any
+        # duplicates in that process, which were reported there.  The
+        # process may have been started after the entry it clashes with
+        # here was merged (then it saw and reported it already), or
+        # before.
+        for index, (table, other_table) in enumerate(
+                zip(self.data['objects'], otherdata['objects'])):
+            for name, entry in other_table.items():
+                doc = docs.get(entry.doc)
+                if doc is None:
+                    continue
+                name = sys.intern(name)
+                reported = otherdata['duplicates'].get(entry.doc, ())
+                if name in table and table[name].doc != doc and \
+                        (index, name) not in reported:
+                    report_duplicate(self.env, self.docname(doc), entry.line,
+                                     OBJTYPES[index], name,
+                                     self.docname(table[name].doc))
+                    self.data['duplicates'].setdefault(doc, set()).add(
+                        (index, name))
+                entry.doc = doc
+                table[name] = entry
+                self._objects_of(doc).add((index, name))
+        for struct, (other, lineno, parents) in otherdata['inherits'].items():
+            if other in docs:
+                self.data['inherits'][struct] = (docs[other], lineno, parents)
+
+    def suffix_tables(self):
+        #
+        # STRUCT -> the rows of its suffix table, in the order they are
+        # documented: (objtype, SUFFIX, args, type, summary) for each
+        # attribute and method, with type split into a tuple of
+        # (text, is a structure name) parts so the table can link them.
+        #
+        structures = self.data['objects'][_objtype_index['structure']]
+        found = {}
+        for objtype, name, docname, info in self.iter_objects():
+            if objtype not in ('attribute', 'method') or ':' not in name:
+                continue
+            struct, suffix = name.rsplit(':', 1)
+            found.setdefault(struct, []).append(
+                ((docname, info.line or 0, suffix), objtype, suffix, info))
+        tables = {}
+        for struct, entries in found.items():
+            entries.sort(key=lambda entry: entry[0])
+            rows = tables[struct] = []
+            for order, objtype, suffix, info in entries:
+                # Methods mostly give their type as :return:.
+                typ = info.get('type') if objtype == 'attribute' \
+                    else info.get('returntype') or info.get('returnvalue')
+                parts = tuple((part, part.upper() in structures)
+                              for part in _type_part_re.split(typ or '')
+                              if part)
+                rows.append((objtype, suffix, info.get('args'), parts,
+                             info.get('summary', '')))
+        return tables
 
     def get_objects(self):
-        # iteritems() was renamed to items() in python 3
-        if sys.version_info[0] < 3:
-            for (typ, name), docname in self.data['objects'].iteritems():
-                yield name, name, typ, docname, name, 1
-        else:
-            for (typ, name), docname in self.data['objects'].items():
-                yield name, name, typ, docname, name, 1
+        # The anchor is the id add_target_and_index gave the signature.
+        for objtype, name, docname, entry in self.iter_objects():
+            yield name, name, objtype, docname, objtype + ':' + name, 1
+
+def open_diagnostics_report(app):
+    global _report_path
+    if not app.config.ks_diagnostics_report:
+        _report_path = None
+        return
+    _report_path = os.path.join(app.outdir, app.config.ks_diagnostics_report)
+    os.makedirs(os.path.dirname(_report_path), exist_ok=True)
+    # Start each build with an empty report.
+    open(_report_path, 'w').close()
+
+def warn_missing_reference(app, domain, node):
+    # Sphinx only fires this for references it is about to warn about
+    # (nitpicky mode, or a role with warn_dangling).  Returning True
+    # replaces its generic warning with ours.
+    if domain is None or domain.name != 'ks':
+        return None
+    role = node['reftype']
+    target = node['reftarget']
+    suggestions = domain.suggest_targets(role, target)
+    message = 'ks:%s reference target not found: %s' % (role, target)
+    if suggestions:
+        message += ' (did you mean %s?)' % ', '.join(suggestions)
+    report_diagnostic(app.env, 'unresolved', message,
+                      node.get('refdoc', app.env.docname), _node_line(node),
+                      role=role, target=target, suggestions=suggestions)
+    return True
+
+def _node_line(node):
+    # References made by doc fields (:type:, :rtype:, ...) often have no
+    # line of their own; use the nearest enclosing node that does.
+    while node is not None:
+        if node.line is not None:
+            return node.line
+        node = node.parent
+    return None
+
+def note_references(app, doctree):
+    # Remember every ks reference in this document, so the end-of-build
+    # summary covers the whole project, even in incremental and parallel
+    # builds where this process doesn't write every page.
+    refs = []
+    for node in doctree.findall(addnodes.pending_xref):
+        if node.get('refdomain') == 'ks':
+            # Interned, as the same few roles and targets come up
+            # thousands of times in the pickled environment.
+            refs.append((sys.intern(node['reftype']),
+                         sys.intern(node['reftarget'].upper()),
+                         _node_line(node)))
+    domain = app.env.get_domain('ks')
+    doc = domain.doc_id(app.env.docname)
+    if refs:
+        domain.data['refs'][doc] = tuple(refs)
+    else:
+        domain.data['refs'].pop(doc, None)
+
+def print_missing_reference_summary(app, exception):
+    if exception is not None or not app.config.ks_missing_reference_summary:
+        return
+    domain = app.env.get_domain('ks')
+    missing = domain.unresolved_references()
+    if not missing:
+        return
+    rows = []
+    total = 0
+    for (role, target), places in missing.items():
+        total += len(places)
+        docname, lineno = min(places, key=lambda p: (p[0], p[1] or 0))
+        where = str(app.env.doc2path(docname, False))
+        if lineno is not None:
+            where += ':%d' % lineno
+        rows.append((len(places), ':%s:`%s`' % (role, target), where,
+                     ', '.join(domain.suggest_targets(role, target))))
+    # Most frequent first, then alphabetically.
+    rows.sort(key=lambda row: (-row[0], row[1]))
+
+    headers = ('count', 'reference', 'first seen at', 'did you mean')
+    table = [headers] + [(str(n), ref, where, hint)
+                         for n, ref, where, hint in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(3)]
+    logger.info('')
+    logger.info('unresolved ks references: %d distinct, %d in total',
+                len(rows), total)
+    for count, ref, where, hint in table:
+        logger.info('  %s  %s  %s  %s', count.rjust(widths[0]),
+                    ref.ljust(widths[1]), where.ljust(widths[2]), hint)
+
+def log_signature_cache_stats(app, exception):
+    info = parse_signature.cache_info()
+    logger.verbose('ks signature cache: %d hits, %d misses, %d/%d entries',
+                   info.hits, info.misses, info.currsize, info.maxsize)
+
+# Bump when the layout of the ks_api_index file changes.
+API_INDEX_FORMAT = 1
+
+def api_index_entries(app):
+    #
+    # One dict per documented object, sorted, for write_api_index().
+    # Anything not given in the docs is left out of the dict.
+    #
+    domain = app.env.get_domain('ks')
+    entries = []
+    for name, dispname, objtype, docname, anchor, prio \
+            in domain.get_objects():
+        entry = {'name': name, 'kind': objtype}
+        if objtype in ('attribute', 'method'):
+            entry['structure'], entry['name'] = name.rsplit(':', 1)
+        info = domain.find_object(objtype, name)[1]
+        for field, key in (('access', 'access'),
+                           ('type', 'type'),
+                           ('returnvalue', 'returns'),
+                           ('returntype', 'return_type')):
+            if info.get(field):
+                entry[key] = info.get(field)
+        if info.get('parameter'):
+            entry['params'] = [
+                dict((k, v) for k, v in zip(('name', 'type', 'description'),
+                                             param) if v)
+                for param in info.get('parameter')]
+        entry['url'] = app.builder.get_target_uri(docname) + '#' + anchor
+        entries.append(entry)
+    entries.sort(key=lambda e: (e['kind'], e.get('structure', ''),
+                                e['name']))
+    return entries
+
+def write_api_index(app, exception):
+    #
+    # Writes every documented global, function, keyword, structure and
+    # suffix to ks_api_index in the output directory, so editor plugins
+    # and script linters can load the API without scraping the HTML.
+    # A name ending in .sqlite or .db gets an SQLite database with an
+    # 'objects' table and a 'meta' table; anything else gets JSON.
+    #
+    if exception is not None or not app.config.ks_api_index:
+        return
+    if app.builder.format != 'html':
+        return
+    entries = api_index_entries(app)
+    path = os.path.join(app.outdir, app.config.ks_api_index)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    meta = {
+        'format': API_INDEX_FORMAT,
+        'project': app.config.project,
+        'version': app.config.version,
+    }
+    if path.endswith(('.sqlite', '.db')):
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value)')
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', meta.items())
+            conn.execute('CREATE TABLE objects ('
+                         ' name TEXT NOT NULL, kind TEXT NOT NULL,'
+                         ' structure TEXT, access TEXT, type TEXT,'
+                         ' params TEXT, returns TEXT, return_type TEXT,'
+                         ' url TEXT NOT NULL)')
+            conn.execute('CREATE INDEX objects_name ON objects (name)')
+            conn.executemany(
+                'INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(e['name'], e['kind'], e.get('structure'), e.get('access'),
+                  e.get('type'),
+                  json.dumps(e['params']) if 'params' in e else None,
+                  e.get('returns'), e.get('return_type'), e['url'])
+                 for e in entries])
+        conn.close()
+    else:
+        meta['objects'] = entries
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, separators=(',', ':'), sort_keys=True)
+    logger.info('ks API index: %d objects written to %s',
+                len(entries), app.config.ks_api_index)
+
+def render_suffix_table(struct, rows):
+    # The table node for a ks:suffixtable; its references are still
+    # pending_xrefs, resolved like any others when the page is written.
+    def xref(role, target, text):
+        return addnodes.pending_xref(
+            '', nodes.literal(text, text, classes=['xref', 'ks', 'ks-' + role]),
+            refdomain='ks', reftype=role, reftarget=target,
+            refexplicit=True, refwarn=True)
+
+    tbody = nodes.tbody()
+    for objtype, suffix, args, parts, summary in rows:
+        role = 'attr' if objtype == 'attribute' else 'meth'
+        text = suffix + ('(%s)' % args if args else '')
+        typ = nodes.paragraph()
+        for part, is_struct in parts:
+            if is_struct:
+                typ += xref('struct', part.upper(), part)
+            else:
+                typ += nodes.Text(part)
+        tbody += nodes.row('',
+            nodes.entry('', nodes.paragraph('', '',
+                                            xref(role, struct + ':' + suffix,
+                                                 text))),
+            nodes.entry('', typ),
+            nodes.entry('', nodes.paragraph(summary, summary)))
+    thead = nodes.thead('', nodes.row('', *[
+        nodes.entry('', nodes.paragraph(title, title))
+        for title in (_('Suffix'), _('Type'), _('Description'))]))
+    tgroup = nodes.tgroup(cols=3)
+    for width in (2, 1, 4):
+        tgroup += nodes.colspec(colwidth=width)
+    tgroup += thead
+    tgroup += tbody
+    return nodes.table('', tgroup, classes=['ks-suffixtable'])
+
+def update_suffix_tables(app, env):
+    #
+    # Renders the suffix table of every structure some ks:suffixtable
+    # asks for, once all documents have been read.  Tables are kept in
+    # the environment with a digest of their rows, and only re-rendered
+    # when a structure's suffixes, types or summaries changed; the pages
+    # showing a re-rendered table are returned, so they get rewritten
+    # even if they weren't re-read themselves.
+    #
+    domain = env.get_domain('ks')
+    cache = domain.data['suffixtable_cache']
+    wanted = {}
+    for doc, entries in domain.data['suffixtables'].items():
+        for struct, lineno in entries:
+            wanted.setdefault(struct, set()).add(domain.docname(doc))
+    tables = domain.suffix_tables()
+    rewrite = set()
+    for struct, docnames in wanted.items():
+        rows = tables.get(struct, [])
+        digest = hashlib.sha256(repr(rows).encode('utf-8')).hexdigest()
+        if struct in cache and cache[struct][0] == digest:
+            continue
+        cache[struct] = (digest,
+                         render_suffix_table(struct, rows) if rows else None)
+        rewrite.update(docnames)
+    for struct in list(cache):
+        if struct not in wanted:
+            del cache[struct]
+    logger.verbose('ks suffix tables: %d in use, %d pages to rewrite',
+                   len(wanted), len(rewrite))
+    return sorted(rewrite)
+
+class SuffixTableTransform(SphinxPostTransform):
+    # Before ReferencesResolver (priority 10), so the links in the table
+    # get resolved along with the rest of the page.
+    default_priority = 5
+
+    def run(self, **kwargs):
+        cache = self.env.get_domain('ks').data['suffixtable_cache']
+        for node in list(self.document.findall(suffixtable)):
+            struct = node['structure']
+            table = cache.get(struct, (None, None))[1]
+            if table is None:
+                report_diagnostic(self.env, 'suffixtable',
+                                  'no suffixes documented for structure %s'
+                                  % struct, self.env.docname, node.line,
+                                  structure=struct)
+                node.replace_self([])
+            else:
+                node.replace_self(table.deepcopy())
+
+def render_inherited_suffixes(struct, inherited):
+    # A rubric, then one paragraph per ancestor: "From Ancestor: A, B".
+    def xref(role, target, text):
+        return addnodes.pending_xref(
+            '', nodes.literal(text, text, classes=['xref', 'ks', 'ks-' + role]),
+            refdomain='ks', reftype=role, reftarget=target,
+            refexplicit=True, refwarn=True)
+
+    container = nodes.container(classes=['ks-inherited-suffixes'])
+    container += nodes.rubric(_('Inherited suffixes'), _('Inherited suffixes'))
+    for ancestor, suffixes in inherited:
+        para = nodes.paragraph()
+        para += nodes.Text(_('From '))
+        para += xref('struct', ancestor.upper(), ancestor)
+        para += nodes.Text(': ')
+        for i, (objtype, suffix) in enumerate(suffixes):
+            if i:
+                para += nodes.Text(', ')
+            para += xref('attr' if objtype == 'attribute' else 'meth',
+                         ancestor.upper() + ':' + suffix, suffix)
+        container += para
+    return container
+
+def update_inherited_suffixes(app, env):
+    # Like update_suffix_tables: the pages of structures whose list of
+    # inherited suffixes changed are returned to be rewritten.
+    domain = env.get_domain('ks')
+    cache = domain.data['inherited_cache']
+    rewrite = set()
+    inherits = domain.data['inherits']
+    for struct, (doc, lineno, parents) in inherits.items():
+        digest = hashlib.sha256(repr(
+            (domain.inherited_suffixes(struct),
+             domain.inheritance_problems(struct))).encode('utf-8')).hexdigest()
+        if cache.get(struct) != digest:
+            cache[struct] = digest
+            rewrite.add(domain.docname(doc))
+    for struct in list(cache):
+        if struct not in inherits:
+            del cache[struct]
+    return sorted(rewrite)
+
+class InheritedSuffixesTransform(SphinxPostTransform):
+    default_priority = 5
+
+    def run(self, **kwargs):
+        domain = self.env.get_domain('ks')
+        for node in list(self.document.findall(inheritedsuffixes)):
+            struct = node['structure']
+            for problem in domain.inheritance_problems(struct):
+                report_diagnostic(self.env, 'inherits', problem,
+                                  self.env.docname, node.line,
+                                  structure=struct)
+            inherited = domain.inherited_suffixes(struct)
+            if inherited:
+                node.replace_self(render_inherited_suffixes(struct,
+                                                            inherited))
+            else:
+                node.replace_self([])
+
+def build_xref_index(app, env):
+    # Runs in the main process once all documents have been read (and,
+    # in a parallel build, merged), before any writer process is forked.
+    # The pages whose references now lead somewhere else are returned to
+    # be rewritten.
+    domain = env.get_domain('ks')
+    domain.build_xref_index()
+    rewrite = domain.changed_references()
+    logger.verbose('ks references: %d pages with changed targets',
+                   len(rewrite))
+    return sorted(rewrite)
 
 def setup(app):
     app.add_domain(KOSDomain)
+    # JSON-lines file, relative to the output directory, that every ks
+    # diagnostic is also written to; e.g. 'ks-diagnostics.jsonl'.
+    app.add_config_value('ks_diagnostics_report', '', '')
+    # Print a table of every unresolved ks reference, with near matches,
+    # when the build finishes.
+    app.add_config_value('ks_missing_reference_summary', True, '')
+    app.connect('builder-inited', open_diagnostics_report)
+    app.connect('doctree-read', note_references)
+    app.connect('warn-missing-reference', warn_missing_reference)
+    app.connect('env-updated', build_xref_index)
+    app.connect('env-updated', update_suffix_tables)
+    app.add_post_transform(SuffixTableTransform)
+    app.connect('env-updated', update_inherited_suffixes)
+    app.add_post_transform(InheritedSuffixesTransform)
+    app.connect('build-finished', print_missing_reference_summary)
+    app.connect('build-finished', log_signature_cache_stats)
+    # File name, relative to the output directory, of the machine-readable
+    # API index (.json, or .sqlite/.db); '' turns it off.
+    app.add_config_value('ks_api_index', 'ks-api.json', '')
+    app.connect('build-finished', write_api_index)
+    return {
+        'version': '1.1',
+        # Bumped along with KOSDomain.data_version, for the same reason.
+        'env_version': 7,
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
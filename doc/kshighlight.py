@@ -0,0 +1,266 @@
+#
+# Highlights whole Kerboscript files (a script library, kerboscript_tests/,
+# ...) with the docs' lexer, for publishing them next to the manual:
+#
+#     python kshighlight.py [-f html|ansi|json ...] [-o OUTDIR] [-j N]
+#                           PATH_OR_GLOB ...
+#
+# A directory stands for all the *.ks files under it, and a glob for the
+# files it matches (** included).  Each file is written to OUTDIR under
+# its path relative to the common directory of the inputs (or --root),
+# with .html, .ansi or .json added, for each format asked for (default:
+# html):
+#
+#     html  a standalone page, with the --style colours inlined.
+#     ansi  the text with 256-colour terminal escapes, for `less -R`.
+#     json  {"source": ..., "tokens": [[index, tokentype, value], ...]},
+#           the tokens of the file as it is, without pygments' newline
+#           normalization, so the indexes point into the file.
+#
+# Files are lexed and formatted in a pool of -j worker processes (default:
+# one per CPU).  OUTDIR/.kshighlight.json records a hash of every file
+# written together with the lexer and the settings it was written with,
+# and a file is only redone when that hash changes or its output has gone
+# missing; --force redoes everything.  Throughput is printed at the end.
+# Needs pygments, but not Sphinx.
+#
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+import pygments
+from pygments.formatters import HtmlFormatter, Terminal256Formatter
+
+import kslexer
+
+MANIFEST = '.kshighlight.json'
+FORMATS = ('html', 'ansi', 'json')
+
+
+def find_files(patterns):
+    #
+    # The .ks files named by patterns (files, directories or globs), in
+    # order and without duplicates.  Patterns that match nothing are
+    # returned separately.
+    #
+    found = {}
+    missing = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = sorted(glob.glob(os.path.join(pattern, '**', '*.ks'),
+                                     recursive=True))
+        elif os.path.isfile(pattern):
+            paths = [pattern]
+        else:
+            paths = sorted(path for path in glob.glob(pattern, recursive=True)
+                           if os.path.isfile(path))
+        if not paths:
+            missing.append(pattern)
+        for path in paths:
+            found.setdefault(os.path.abspath(path), None)
+    return list(found), missing
+
+
+def settings_key(fmt, style, linenos):
+    # Everything besides the file itself that the output depends on.
+    return '\0'.join((kslexer.fingerprint(), pygments.__version__, fmt,
+                      style, repr(linenos)))
+
+
+def file_hash(path, keys):
+    # {fmt: hash} of the file's content under each format's settings.
+    with open(path, 'rb') as f:
+        content = hashlib.sha256(f.read()).hexdigest()
+    return {fmt: hashlib.sha256((key + '\0' + content).encode('utf-8'))
+            .hexdigest() for fmt, key in keys.items()}
+
+
+def load_manifest(outdir):
+    try:
+        with open(os.path.join(outdir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(outdir, manifest):
+    path = os.path.join(outdir, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+_formatters = {}
+
+def _formatter(fmt, style, linenos):
+    # One formatter per process and settings: building the HTML one
+    # renders the whole style sheet.
+    key = (fmt, style, linenos)
+    if key not in _formatters:
+        if fmt == 'html':
+            _formatters[key] = HtmlFormatter(
+                full=True, style=style, linenos='table' if linenos else False,
+                noclasses=False, encoding='utf-8')
+        else:
+            _formatters[key] = Terminal256Formatter(
+                style=style, linenos=linenos, encoding='utf-8')
+    return _formatters[key]
+
+
+def highlight_file(job):
+    #
+    # Lexes the file job describes and writes it in each of its formats.
+    # Runs in the worker processes.  Returns (path, chars, lines, tokens,
+    # seconds, error).
+    #
+    path, rel, outputs, style, linenos = job
+    start = time.perf_counter()
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        lexer = kslexer.KerboscriptLexer()
+        tokens = None
+        count = 0
+        for fmt, outpath in outputs:
+            os.makedirs(os.path.dirname(outpath), exist_ok=True)
+            if fmt == 'json':
+                raw = [[pos, str(tokentype), value] for pos, tokentype, value
+                       in lexer.get_tokens_unprocessed(text)]
+                count = len(raw)
+                with open(outpath, 'w', encoding='utf-8') as f:
+                    json.dump({'source': rel, 'tokens': raw}, f,
+                              ensure_ascii=False)
+                continue
+            if tokens is None:
+                tokens = list(lexer.get_tokens(text))
+                count = count or len(tokens)
+            formatter = _formatter(fmt, style, linenos)
+            if fmt == 'html':
+                formatter.title = rel
+            with open(outpath, 'wb') as f:
+                pygments.format(tokens, formatter, f)
+    except OSError as e:
+        return path, 0, 0, 0, time.perf_counter() - start, str(e)
+    return (path, len(text), text.count('\n') + 1, count,
+            time.perf_counter() - start, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Highlight Kerboscript files as HTML, ANSI or JSON.")
+    parser.add_argument('paths', nargs='+', metavar='PATH_OR_GLOB')
+    parser.add_argument('-f', '--format', action='append', choices=FORMATS,
+                        help="output format; may be repeated "
+                        "(default: html)")
+    parser.add_argument('-o', '--outdir', default='highlighted')
+    parser.add_argument('--root',
+                        help="directory the output paths are relative to "
+                        "(default: the common directory of the inputs)")
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--style', default='default',
+                        help="pygments style for html and ansi")
+    parser.add_argument('--linenos', action='store_true')
+    parser.add_argument('--force', action='store_true',
+                        help="redo every file, changed or not")
+    args = parser.parse_args()
+    formats = sorted(set(args.format or ['html']))
+    workers = args.jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    paths, missing = find_files(args.paths)
+    for pattern in missing:
+        print(f"kshighlight: no .ks files match {pattern}", file=sys.stderr)
+    if not paths:
+        sys.exit(1)
+    if args.root:
+        root = os.path.abspath(args.root)
+    elif len(paths) == 1:
+        root = os.path.dirname(paths[0])
+    else:
+        root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    outdir = os.path.abspath(args.outdir)
+
+    keys = {fmt: settings_key(fmt, args.style, args.linenos)
+            for fmt in formats}
+    manifest = {} if args.force else load_manifest(outdir)
+    jobs = []
+    hashes = {}
+    for path in paths:
+        rel = os.path.relpath(path, root).replace(os.sep, '/')
+        try:
+            hashes[path] = file_hash(path, keys)
+        except OSError as e:
+            print(f"kshighlight: {e}", file=sys.stderr)
+            continue
+        outputs = []
+        for fmt in formats:
+            outrel = f'{rel}.{fmt}'
+            outpath = os.path.join(outdir, outrel)
+            if manifest.get(outrel) != hashes[path][fmt] or \
+                    not os.path.exists(outpath):
+                outputs.append((fmt, outpath))
+        if outputs:
+            jobs.append((path, rel, outputs, args.style, args.linenos))
+    scanned = time.perf_counter()
+
+    if workers <= 1 or len(jobs) < 2:
+        results = map(highlight_file, jobs)
+        executor = None
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+        # Small chunks still keep every worker busy to the end, and save
+        # most of the per-file pickling round trips.
+        chunksize = max(1, len(jobs) // (workers * 8))
+        results = executor.map(highlight_file, jobs, chunksize=chunksize)
+
+    chars = lines = tokens = 0
+    busy = 0.0
+    failed = 0
+    outputs = dict((job[0], job) for job in jobs)
+    try:
+        for path, n_chars, n_lines, n_tokens, seconds, error in results:
+            busy += seconds
+            if error is not None:
+                print(f"kshighlight: {error}", file=sys.stderr)
+                failed += 1
+                continue
+            chars += n_chars
+            lines += n_lines
+            tokens += n_tokens
+            rel = outputs[path][1]
+            for fmt, outpath in outputs[path][2]:
+                manifest[f'{rel}.{fmt}'] = hashes[path][fmt]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if jobs:
+            os.makedirs(outdir, exist_ok=True)
+            save_manifest(outdir, manifest)
+    elapsed = time.perf_counter() - start
+
+    done = len(jobs) - failed
+    print(f"{len(paths)} files, {done} highlighted as "
+          f"{', '.join(formats)}, {len(paths) - len(jobs)} unchanged"
+          + (f", {failed} failed" if failed else ""))
+    print(f"  scan:  {(scanned - start) * 1000:8.1f} ms")
+    print(f"  total: {elapsed * 1000:8.1f} ms with {workers} "
+          f"worker{'s' if workers != 1 else ''}")
+    if done:
+        work = elapsed - (scanned - start)
+        print(f"  {chars / 1024 / work:,.0f} KiB/s, {lines / work:,.0f} "
+              f"lines/s, {tokens / work:,.0f} tokens/s, "
+              f"{done / work:,.1f} files/s")
+        print(f"  {busy / work:.2f} workers busy on average")
+    if failed or missing:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
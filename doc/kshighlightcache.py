@@ -0,0 +1,254 @@
+#
+# Keeps the highlighted HTML of every Kerboscript code block in an
+# on-disk cache, so a build only has to run the lexer and the pygments
+# formatter on snippets that actually changed since the last build.
+#
+# Entries are keyed by a hash of the snippet text, the lexer (a hash of
+# kslexer.py and its generated word and name tables, so any edit to
+# them, to the grammar the tables come from or to the documented names
+# invalidates the cache),
+# the pygments version, the pygments style and the highlight options.
+# The cache is a small SQLite file, which lets the writer processes of a
+# parallel (-j N) build share it safely.  Looking a block up only reads
+# it: the hit and miss counts and the times entries were last used are
+# kept in memory and written in one transaction at the end of the build
+# (by a writer process, at the end of each page).  When it grows past
+# ks_highlight_cache_size bytes the least recently used entries are
+# dropped at the end of the build.
+#
+# Settings in conf.py:
+#
+#     ks_highlight_cache       path of the cache file, relative to the
+#                              doctrees dir (default: ks_highlight.sqlite);
+#                              '' turns caching off.
+#     ks_highlight_cache_size  size cap in bytes (default: 16 MiB).
+#
+# Only builders that keep a PygmentsBridge on builder.highlighter (the
+# html family: html, dirhtml, singlehtml, epub, ...) use the cache.
+#
+
+import hashlib
+import os
+import sqlite3
+import time
+import uuid
+
+import pygments
+from sphinx.highlighting import lexers
+from sphinx.util import logging
+
+import kslexer
+
+logger = logging.getLogger(__name__)
+
+
+class HighlightCache(object):
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Tags this build's rows in the stats table, which the writer
+        # processes of a parallel build add their counts to.
+        self.build_id = uuid.uuid4().hex
+        self.main_pid = os.getpid()
+        self._conn = None
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        # The hits, misses and last use times not written to the file
+        # yet.  A lookup only reads; these are written in one go.
+        self._hits = 0
+        self._misses = 0
+        self._used = {}
+
+    def _check_process(self):
+        # A forked writer process starts out with a copy of its parent's
+        # connection and unwritten counts.  A SQLite connection must not
+        # be used across a fork, and the counts are the parent's to
+        # write, so it drops both.
+        if self._pid is not None and self._pid != os.getpid():
+            self._conn = None
+            self._pid = None
+            self._reset()
+
+    def _connection(self):
+        self._check_process()
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=60,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS snippets ('
+                         ' key TEXT PRIMARY KEY,'
+                         ' html TEXT NOT NULL,'
+                         ' size INTEGER NOT NULL,'
+                         ' last_used REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats ('
+                         ' build_id TEXT PRIMARY KEY,'
+                         ' hits INTEGER NOT NULL DEFAULT 0,'
+                         ' misses INTEGER NOT NULL DEFAULT 0)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT html FROM snippets WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._used[key] = time.time()
+        return row[0]
+
+    def put(self, key, html):
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO snippets VALUES (?, ?, ?, ?)',
+                     (key, html, len(html.encode('utf-8')), time.time()))
+
+    def flush(self):
+        # Writes the counts and last use times kept since the last
+        # flush, in one transaction.  The main process does so when the
+        # build is done; a writer process of a parallel build after each
+        # page, as it is gone before then.
+        self._check_process()
+        if not (self._hits or self._misses or self._used):
+            return
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany('UPDATE snippets SET last_used = ?'
+                             ' WHERE key = ?',
+                             [(used, key) for key, used in self._used.items()])
+            conn.execute('INSERT OR IGNORE INTO stats (build_id) VALUES (?)',
+                         (self.build_id,))
+            conn.execute('UPDATE stats SET hits = hits + ?,'
+                         ' misses = misses + ? WHERE build_id = ?',
+                         (self._hits, self._misses, self.build_id))
+        self._reset()
+
+    def finish(self):
+        # Called once, in the main process, when the build is done.
+        # Returns (hits, misses, entries, bytes, evicted).
+        self.flush()
+        conn = self._connection()
+        row = conn.execute('SELECT hits, misses FROM stats'
+                           ' WHERE build_id = ?', (self.build_id,)).fetchone()
+        hits, misses = row if row is not None else (0, 0)
+        # Only this build's: other builds may share the file
+        # (ksversions.py).
+        conn.execute('DELETE FROM stats WHERE build_id = ?',
+                     (self.build_id,))
+
+        evicted = 0
+        total, = conn.execute('SELECT COALESCE(SUM(size), 0)'
+                              ' FROM snippets').fetchone()
+        if total > self.max_bytes:
+            rows = conn.execute('SELECT key, size FROM snippets'
+                                ' ORDER BY last_used').fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            conn.executemany('DELETE FROM snippets WHERE key = ?', doomed)
+            evicted = len(doomed)
+        entries, = conn.execute('SELECT COUNT(*) FROM snippets').fetchone()
+        conn.close()
+        self._conn = None
+        return hits, misses, entries, total, evicted
+
+
+class CachingHighlighter(object):
+    #
+    # Stands in for the builder's PygmentsBridge.  Kerboscript blocks go
+    # through the cache; everything else, and every other attribute,
+    # is handed straight to the wrapped bridge.
+    #
+
+    def __init__(self, bridge, cache):
+        self._bridge = bridge
+        self._cache = cache
+        style = bridge.formatter_args.get('style')
+        # Without kslexer.fingerprint(), which changes if the build
+        # switches the lexer to other documented names after this.
+        self._prefix = '\0'.join((
+            pygments.__version__,
+            bridge.dest,
+            getattr(style, '__module__', ''),
+            getattr(style, '__name__', str(style)),
+        ))
+
+    def __getattr__(self, name):
+        return getattr(self._bridge, name)
+
+    def highlight_block(self, source, lang, opts=None, force=False,
+                        location=None, **kwargs):
+        if not isinstance(lexers.get(lang), kslexer.KerboscriptLexer):
+            return self._bridge.highlight_block(source, lang, opts, force,
+                                                location, **kwargs)
+        if not isinstance(source, str):
+            source = source.decode()
+        key = hashlib.sha256('\0'.join((
+            kslexer.fingerprint(),
+            self._prefix,
+            lang,
+            repr(sorted((opts or {}).items())),
+            repr(force),
+            repr(sorted(kwargs.items())),
+            source,
+        )).encode('utf-8')).hexdigest()
+
+        html = self._cache.get(key)
+        if html is None:
+            html = self._bridge.highlight_block(source, lang, opts, force,
+                                                location, **kwargs)
+            self._cache.put(key, html)
+        return html
+
+
+def builder_inited(app):
+    path = app.config.ks_highlight_cache
+    bridge = getattr(app.builder, 'highlighter', None)
+    if not path or bridge is None:
+        return
+    path = os.path.join(app.doctreedir, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cache = HighlightCache(path, app.config.ks_highlight_cache_size)
+    app.builder.highlighter = CachingHighlighter(bridge, cache)
+
+
+def page_written(app, pagename, templatename, context, doctree):
+    highlighter = getattr(app.builder, 'highlighter', None)
+    if isinstance(highlighter, CachingHighlighter) and \
+            os.getpid() != highlighter._cache.main_pid:
+        highlighter._cache.flush()
+
+
+def build_finished(app, exception):
+    highlighter = getattr(app.builder, 'highlighter', None)
+    if not isinstance(highlighter, CachingHighlighter):
+        return
+    hits, misses, entries, size, evicted = highlighter._cache.finish()
+    lookups = hits + misses
+    rate = 100.0 * hits / lookups if lookups else 0.0
+    logger.info('kerboscript highlight cache: %d hits, %d misses '
+                '(%.1f%% hit rate); %d entries, %.1f KiB on disk, '
+                '%d evicted', hits, misses, rate, entries, size / 1024.0,
+                evicted)
+
+
+def setup(app):
+    app.add_config_value('ks_highlight_cache', 'ks_highlight.sqlite', '')
+    app.add_config_value('ks_highlight_cache_size', 16 * 1024 * 1024, '')
+    app.connect('builder-inited', builder_inited)
+    app.connect('html-page-context', page_written)
+    app.connect('build-finished', build_finished)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
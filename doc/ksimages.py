@@ -0,0 +1,452 @@
+#
+# Shrinks the PNG and JPEG images of the html output.  Screenshots in
+# source/_images make up most of the manual's weight, and Sphinx copies
+# them as they are, both for the image and figure directives (to
+# _images/) and through html_static_path (to _static/).
+#
+# After reading, every raster image that a page uses or that a static
+# path holds is run through a pool of worker processes, which writes:
+#
+#     - the image recompressed (losslessly for PNG), if that is smaller;
+#     - copies scaled down to each of ks_images_widths narrower than it;
+#     - WebP versions of all of those, if ks_images_webp is on and every
+#       one of them is smaller than its PNG or JPEG.
+#
+# Results go to a cache (by default under the doctrees directory), named
+# after a hash of the image's content and of the settings, so an image
+# is only processed again when it or the settings change (or its entry
+# was evicted to keep the cache under ks_images_cache_size).  At the
+# end of the build the recompressed images replace the ones Sphinx
+# copied, the scaled copies are put next to them in _images/, and the
+# pages' <img> tags get a srcset listing them, inside a <picture> with a
+# WebP <source> when there are WebP versions.  The bytes saved on all
+# of the build's images are logged.
+#
+# Processing every image from scratch takes longer than the rest of the
+# build, so it is off unless turned on.  A build that starts without the
+# cache, such as a clean CI checkout, should keep ks_images_cache
+# somewhere that outlives the build directory.
+#
+# Settings in conf.py:
+#
+#     ks_images_optimize  turn all of this on or off (default: False).
+#     ks_images_cache     the cache directory, relative to the doctrees
+#                         directory (default: ks_images).
+#     ks_images_cache_size  size cap of the cache in bytes (default:
+#                         256 MiB); beyond it, the least recently used
+#                         entries are dropped.
+#     ks_images_widths    widths in pixels of the scaled copies
+#                         (default: [480, 960, 1440]).
+#     ks_images_webp      also write WebP versions (default: True).
+#     ks_images_quality   JPEG and WebP quality (default: 80).
+#     ks_images_sizes     the sizes attribute of the srcset images
+#                         (default: fits the theme's 800px column).
+#     ks_images_workers   worker processes (default: one per CPU).
+#
+# Needs Pillow; without it the images are copied as they are and a
+# message says so.  Only the html, dirhtml and singlehtml builders are
+# affected.
+#
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import time
+
+from docutils import nodes
+from sphinx.util import logging
+
+try:
+    from PIL import Image
+    import PIL
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when what optimize_image() writes changes.
+PIPELINE_VERSION = 1
+RASTER = ('.png', '.jpg', '.jpeg')
+BUILDERS = ('html', 'dirhtml', 'singlehtml')
+# Seconds within which a cache entry counts as in use by another build.
+RECENT = 3600
+
+# Source path -> (cache directory, its meta.json) of every image of this
+# build, and [(source path, path in _static)] of those that a static path
+# copies.  Filled in after reading; the writer processes of a parallel
+# build inherit them.
+_images = {}
+_static_files = []
+
+
+def _settings(config):
+    return {
+        'version': PIPELINE_VERSION,
+        'pillow': PIL.__version__,
+        'widths': sorted(set(int(w) for w in config.ks_images_widths)),
+        'webp': bool(config.ks_images_webp),
+        'quality': int(config.ks_images_quality),
+    }
+
+
+def _cache_key(path, settings_hash):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(settings_hash.encode('ascii'))
+    return digest.hexdigest()
+
+
+def _save(image, path, fmt, quality):
+    if fmt == 'PNG':
+        image.save(path, 'PNG', optimize=True)
+    elif fmt == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(path, 'JPEG', quality=quality, optimize=True,
+                   progressive=True)
+    else:
+        image.save(path, 'WEBP', quality=quality, method=4)
+    return os.path.getsize(path)
+
+
+def optimize_image(job):
+    #
+    # Writes the versions of one image to the cache directory outdir,
+    # with a meta.json describing them.  Runs in the worker processes.
+    # Returns (source path, error).
+    #
+    src, outdir, settings = job
+    tmpdir = '%s.tmp%d' % (outdir, os.getpid())
+    try:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        os.makedirs(tmpdir)
+        with Image.open(src) as image:
+            image.load()
+            fmt = 'JPEG' if image.format == 'JPEG' else 'PNG'
+            ext = '.jpg' if fmt == 'JPEG' else '.png'
+            width, height = image.size
+            original = os.path.getsize(src)
+            # Resampling and WebP want true colour.
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = image.mode in ('LA', 'PA') or \
+                    'transparency' in image.info
+                rgb = image.convert('RGBA' if has_alpha else 'RGB')
+            else:
+                rgb = image
+
+            full = _save(image, os.path.join(tmpdir, 'full' + ext), fmt,
+                         settings['quality'])
+            if full >= original:
+                shutil.copyfile(src, os.path.join(tmpdir, 'full' + ext))
+                full = original
+            # [width, height, file, bytes], full size last.
+            versions = []
+            for w in settings['widths']:
+                if w >= width:
+                    break
+                h = max(1, round(height * w / width))
+                name = 'w%d%s' % (w, ext)
+                scaled = rgb.resize((w, h), Image.LANCZOS)
+                versions.append([w, h, name, _save(
+                    scaled, os.path.join(tmpdir, name), fmt,
+                    settings['quality'])])
+            versions.append([width, height, 'full' + ext, full])
+
+            webp = []
+            if settings['webp']:
+                for w, h, name, size in versions:
+                    webp_name = os.path.splitext(name)[0] + '.webp'
+                    scaled = rgb if w == width else rgb.resize(
+                        (w, h), Image.LANCZOS)
+                    webp_size = _save(scaled, os.path.join(tmpdir, webp_name),
+                                      'WEBP', settings['quality'])
+                    webp.append([w, h, webp_name, webp_size])
+                    if webp_size >= size:
+                        webp = []
+                        break
+            for name in os.listdir(tmpdir):
+                if name not in [v[2] for v in versions + webp]:
+                    os.remove(os.path.join(tmpdir, name))
+
+        with open(os.path.join(tmpdir, 'meta.json'), 'w') as f:
+            json.dump({'ext': ext, 'original': original,
+                       'versions': versions, 'webp': webp}, f)
+        try:
+            os.replace(tmpdir, outdir)
+        except OSError:
+            # Another build got there first; its result is the same.
+            shutil.rmtree(tmpdir, ignore_errors=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return src, str(e)
+    return src, None
+
+
+def _sources(app):
+    # {source path: [path in _static, ...]} of the images to do.
+    sources = {}
+    for rel in app.env.images:
+        path = os.path.normpath(os.path.join(app.srcdir, rel))
+        if path.lower().endswith(RASTER) and os.path.isfile(path):
+            sources.setdefault(path, [])
+    static = os.path.join(app.outdir, '_static')
+    for entry in app.config.html_static_path:
+        root = os.path.join(app.confdir, entry)
+        if not os.path.isdir(root):
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.lower().endswith(RASTER):
+                    continue
+                path = os.path.join(dirpath, filename)
+                sources.setdefault(os.path.normpath(path), []).append(
+                    os.path.join(static, os.path.relpath(path, root)))
+    return sources
+
+
+def process_images(app, env):
+    _images.clear()
+    del _static_files[:]
+    if not app.config.ks_images_optimize or app.builder.name not in BUILDERS:
+        return
+    if Image is None:
+        logger.info('ks images: Pillow is not installed, images are '
+                    'copied unoptimized')
+        return
+    settings = _settings(app.config)
+    settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True)
+                                   .encode('utf-8')).hexdigest()
+    cache = os.path.join(app.doctreedir, app.config.ks_images_cache)
+
+    jobs = []
+    used = set()
+    for path, static_paths in sorted(_sources(app).items()):
+        try:
+            key = _cache_key(path, settings_hash)
+        except OSError:
+            continue
+        outdir = os.path.join(cache, key[:2], key)
+        used.add(outdir)
+        _images[path] = outdir
+        for static_path in static_paths:
+            _static_files.append((path, static_path))
+        if not os.path.exists(os.path.join(outdir, 'meta.json')):
+            jobs.append((path, outdir, settings))
+
+    workers = app.config.ks_images_workers or os.cpu_count() or 1
+    failed = 0
+    if jobs:
+        if workers <= 1 or len(jobs) < 2:
+            results = map(optimize_image, jobs)
+            executor = None
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(workers)
+            results = executor.map(optimize_image, jobs)
+        try:
+            for path, error in results:
+                if error is not None:
+                    logger.warning('cannot optimize image %s: %s',
+                                   os.path.relpath(path, app.srcdir), error,
+                                   type='ks', subtype='image')
+                    failed += 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    for path, outdir in list(_images.items()):
+        meta = os.path.join(outdir, 'meta.json')
+        try:
+            with open(meta) as f:
+                _images[path] = (outdir, json.load(f))
+            # The entry's last use, for evict().
+            os.utime(meta)
+        except (OSError, ValueError):
+            del _images[path]
+    evicted = evict(cache, app.config.ks_images_cache_size, used)
+    logger.info('ks images: %d images, %d optimized now with %d worker%s, '
+                '%d from the cache%s%s', len(_images), len(jobs) - failed,
+                workers, '' if workers == 1 else 's',
+                len(_images) - len(jobs) + failed,
+                ', %d failed' % failed if failed else '',
+                ', %d old entries evicted' % evicted if evicted else '')
+
+
+def evict(cache, max_bytes, used):
+    #
+    # Drops the least recently used entries of the cache until it fits in
+    # max_bytes, and returns how many.  The cache may be shared by the
+    # builds of several branches or versions, so what this build doesn't
+    # use isn't simply deleted, and nothing used in the last RECENT
+    # seconds goes, as another build may still be copying from it.  An
+    # entry's last use is the mtime of its meta.json.  Unfinished entries
+    # left by a build that was killed are removed once they are as old.
+    #
+    if not os.path.isdir(cache):
+        return 0
+    now = time.time()
+    entries = []
+    total = 0
+    for prefix in os.listdir(cache):
+        for name in os.listdir(os.path.join(cache, prefix)):
+            outdir = os.path.join(cache, prefix, name)
+            try:
+                if '.tmp' in name:
+                    if os.path.getmtime(outdir) < now - RECENT:
+                        shutil.rmtree(outdir, ignore_errors=True)
+                    continue
+                last_used = os.path.getmtime(os.path.join(outdir,
+                                                          'meta.json'))
+                size = sum(entry.stat().st_size
+                           for entry in os.scandir(outdir))
+            except OSError:
+                continue
+            entries.append((last_used, size, outdir))
+            total += size
+    evicted = 0
+    for last_used, size, outdir in sorted(entries):
+        if total <= max_bytes or last_used >= now - RECENT:
+            break
+        if outdir in used:
+            continue
+        shutil.rmtree(outdir, ignore_errors=True)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def _version_uri(uri, name):
+    #
+    # URI of a version of the image at uri, by its name in the cache:
+    # full.png is uri itself, w480.png uri with -480w added to its stem,
+    # and a WebP version that with .webp appended.
+    #
+    base, ext = posixpath.splitext(uri)
+    stem, kind = name.split('.', 1)
+    if stem != 'full':
+        uri = '%s-%sw%s' % (base, stem[1:], ext)
+    return uri + '.webp' if kind == 'webp' else uri
+
+
+def _srcset(uri, versions):
+    return ', '.join('%s %dw' % (_version_uri(uri, name), w)
+                     for w, h, name, size in versions)
+
+
+def visit_image(self, node):
+    olduri = node['uri']
+    start = len(self.body)
+    type(self).visit_image(self, node)
+    if olduri not in self.builder.images:
+        return
+    entry = _images.get(os.path.normpath(os.path.join(self.builder.srcdir,
+                                                      olduri)))
+    if entry is None:
+        return
+    meta = entry[1]
+    if len(meta['versions']) < 2 and not meta['webp']:
+        return
+    uri = node['uri']
+    sizes = self.config.ks_images_sizes
+    for i in range(start, len(self.body)):
+        tag = self.body[i]
+        if not tag.startswith('<img '):
+            continue
+        if len(meta['versions']) > 1:
+            tag = tag.replace('<img ', '<img srcset="%s" sizes="%s" ' % (
+                _srcset(uri, meta['versions']), sizes), 1)
+        if meta['webp']:
+            end = tag.rstrip('\n')
+            tag = ('<picture><source type="image/webp" srcset="%s" '
+                   'sizes="%s" />%s</picture>%s' % (
+                       _srcset(uri, meta['webp']), sizes, end,
+                       tag[len(end):]))
+        self.body[i] = tag
+        break
+
+
+def depart_image(self, node):
+    type(self).depart_image(self, node)
+
+
+def _install(src, dest):
+    # Copies src to dest unless it is already there; returns whether it
+    # had to.  The copy keeps the cached file's mtime, so a file of the
+    # same size and mtime is that file.  (Another version of the image
+    # may well have the same size, and the original Sphinx copied has
+    # the source's mtime.)
+    try:
+        have, want = os.stat(dest), os.stat(src)
+        if have.st_size == want.st_size and \
+                have.st_mtime_ns == want.st_mtime_ns:
+            return False
+    except OSError:
+        pass
+    shutil.copy2(src, dest)
+    return True
+
+
+def install_images(app, exception):
+    if exception is not None or not _images:
+        return
+    images_dir = os.path.join(app.outdir, app.builder.imagedir)
+    for rel, dest in app.builder.images.items():
+        path = os.path.normpath(os.path.join(app.srcdir, rel))
+        if path not in _images:
+            continue
+        outdir, meta = _images[path]
+        for w, h, name, size in meta['versions'] + meta['webp']:
+            target = os.path.join(images_dir, _version_uri(dest, name))
+            _install(os.path.join(outdir, name), target)
+    for path, target in _static_files:
+        if path not in _images or not os.path.exists(target):
+            continue
+        outdir, meta = _images[path]
+        full = meta['versions'][-1]
+        _install(os.path.join(outdir, full[2]), target)
+
+    # Of all of the build's images, not only those of the pages written
+    # now, so the numbers are the same for every build of the same
+    # sources.
+    before = after = 0
+    extra = extra_files = 0
+    for outdir, meta in _images.values():
+        before += meta['original']
+        after += meta['versions'][-1][3]
+        for w, h, name, size in meta['versions'][:-1] + meta['webp']:
+            extra += size
+            extra_files += 1
+    if before:
+        logger.info('ks images: %.1f MiB of images written as %.1f MiB, '
+                    '%.1f MiB (%.0f%%) saved; %d scaled and WebP versions, '
+                    '%.1f MiB', before / 1048576.0, after / 1048576.0,
+                    (before - after) / 1048576.0,
+                    100.0 * (before - after) / before, extra_files,
+                    extra / 1048576.0)
+
+
+def setup(app):
+    app.add_config_value('ks_images_optimize', False, '')
+    app.add_config_value('ks_images_cache', 'ks_images', '')
+    app.add_config_value('ks_images_cache_size', 256 * 1024 * 1024, '')
+    app.add_config_value('ks_images_widths', [480, 960, 1440], '')
+    app.add_config_value('ks_images_webp', True, '')
+    app.add_config_value('ks_images_quality', 80, '')
+    app.add_config_value('ks_images_sizes',
+                         '(max-width: 860px) 100vw, 800px', '')
+    app.add_config_value('ks_images_workers', 0, '')
+    # Registered for the html format, which dirhtml and singlehtml fall
+    # back on too; other builders of the format find _images empty.
+    app.add_node(nodes.image, override=True,
+                 html=(visit_image, depart_image))
+    app.connect('env-updated', process_images)
+    app.connect('build-finished', install_images)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
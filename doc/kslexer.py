@@ -0,0 +1,498 @@
+#
+# The Kerboscript lexer used for syntax-highlighting code sections in the
+# documentation.
+#
+# This module only needs pygments, not Sphinx, so tools outside the docs
+# build (syntax highlighters, token counters, linters) can import it
+# cheaply.  KerboscriptLexer.py is the Sphinx extension that registers it.
+#
+# Which words are keywords, operators, declarations and builtins is not
+# kept here but in kslexer_tables.py, which kslexgen.py generates from the
+# compiler's grammar (src/kOS.Safe/Compilation/KS/kRISC.tpg).  When that
+# grammar is present and has changed since the tables were generated,
+# fresh tables are built from it in memory on import (with a warning to
+# regenerate the file), so the highlighting can't drift from the
+# language again.
+#
+# Names are told apart the same way: the structures, functions and bound
+# variables the manual documents are in kslexer_names.py, which the docs
+# build renders for itself (see KerboscriptLexer.py), and any other name
+# is a user's variable.  Both tables are merged into one, so classifying a
+# word is still a single dict lookup.
+#
+# Besides the pygments lexer there are two ways to lex without holding
+# on to or re-lexing a whole text: tokenize() streams the tokens of a
+# text that arrives in chunks, and IncrementalLexer keeps the tokens of
+# a text that is being edited up to date.
+#
+
+import bisect
+import hashlib
+import logging
+import os
+import re
+
+from pygments.lexer import Lexer
+from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
+    Number, Punctuation, Error
+
+__all__ = ['KerboscriptLexer', 'IncrementalLexer', 'tokenize', 'fingerprint',
+           'use_names', 'names_digest', 'name_anchor']
+
+
+def _load_tables():
+    #
+    # Returns the kslexer_tables module, or, if the grammar it was
+    # generated from has changed since, a fresh one built in memory from
+    # the current grammar.  Checking costs one hash of the grammar file;
+    # kslexgen is only imported when the tables really are stale.  The
+    # checked-in file is left alone: regenerating it is for whoever
+    # changed the grammar, with kslexgen.py.
+    #
+    import kslexer_tables
+    grammar = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'src', 'kOS.Safe', 'Compilation', 'KS',
+        'kRISC.tpg')
+    try:
+        with open(grammar, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        # Not in a full checkout; the checked-in tables will do.
+        return kslexer_tables
+    if digest == kslexer_tables.GRAMMAR_SHA256:
+        return kslexer_tables
+    import types
+    import kslexgen
+    logging.getLogger(__name__).warning(
+        'kslexer_tables.py is out of date with %s; using tables built '
+        'from it instead.  Run "python kslexgen.py" to regenerate it.',
+        os.path.relpath(grammar))
+    with open(grammar, encoding='utf-8') as f:
+        source = kslexgen.render(f.read())
+    fresh = types.ModuleType('kslexer_tables')
+    exec(compile(source, kslexer_tables.__file__, 'exec'), fresh.__dict__)
+    return fresh
+
+_tables = _load_tables()
+
+# The word lists, in lower case.
+OPERATOR_WORDS = _tables.OPERATOR_WORDS
+KEYWORDS = _tables.KEYWORDS
+DECLARATION_WORDS = _tables.DECLARATION_WORDS
+BUILTIN_WORDS = _tables.BUILTIN_WORDS
+
+import kslexer_names as _names
+
+
+class KerboscriptLexer(Lexer):
+    #
+    # Produces exactly the same tokens as the rule-list based
+    # KerboscriptRegexLexer it replaced, which benchmarks/ksregexlexer.py
+    # keeps as the reference it is checked against, but much faster:
+    #
+    # - All of the rules are folded into a single regex, one group per
+    #   rule.  Python's alternation takes the first alternative that
+    #   matches, which is the same tie-break rule RegexLexer uses.  A final catch-all group stands in for
+    #   RegexLexer's one-char Error fallback, so every position matches
+    #   something and the whole text can be walked with one finditer().
+    #
+    # - The eight rules that start with a letter (operator words,
+    #   keywords, declarations, builtins, documented names and plain
+    #   names) become one word group.  The matched word is then classified with a single
+    #   hash lookup in the generated WORD_TOKENS table, instead
+    #   of by trying a 50-way alternation first.
+    #
+    name = 'Kerboscript'
+    aliases = ['kerboscript']
+    filenames = ['*.ks']
+
+    flags = re.MULTILINE | re.DOTALL | re.IGNORECASE
+
+    # None of these groups may match an empty string, or finditer()
+    # would skip ahead instead of reporting an Error token.  The word
+    # group has no \b at its end: backtracking into a long run of word
+    # chars to look for one would make lexing quadratic, so _lex()
+    # checks the char after the word instead.
+    #
+    # The groups are not in the same order as the RegexLexer rules: they
+    # are sorted by how common they are, which matters because the regex
+    # engine tries them one after the other.  That is only safe between
+    # groups that can't start with the same character, so the three
+    # pairs that can keep their original relative order: comment before
+    # operator ('/'), punctuation before float ('.'), float before int.
+    _token_re = re.compile(r'''
+        ( [\t\s\r\n]+ )                                         # 1
+      | ( [a-z_][a-z_\d]* )                                     # 2
+      | ( [()\[\]\.,:\{\}@] )                                   # 3
+      | ( //[^\r\n]*[\r\n]? )                                   # 4
+      | ( [*/+|?<>=\#^\-] )                                     # 5
+      | ( "[^"]*" )                                             # 6
+      | ( \b(?:\d+\.\d*|\.\d+|\d+)[eE][+-]?\d+\b )              # 7
+      | ( \b\d+\b )                                             # 8
+      | ( "[^\r\n]* )                                          # 9
+      | ( . )                                                   # 10
+    ''', flags | re.VERBOSE)
+
+    # Token type per group number above.  The word group and the
+    # unterminated string map to None and are handled separately.
+    _group_tokens = (
+        None,
+        Text,
+        None,
+        Punctuation,
+        Comment.Single,
+        Operator,
+        String,
+        Number.Float,
+        Number.Float,  # markup ints just like floats
+        None,
+        Error,
+    )
+
+    def get_tokens_unprocessed(self, text):
+        return _lex(text, 0)
+
+
+def _lex(text, pos):
+    #
+    # The body of KerboscriptLexer.get_tokens_unprocessed, lexing text
+    # from pos on.  The chars before pos are only looked at to decide
+    # whether pos is on a word boundary, which lets tokenize() keep one
+    # char of context in front of the part it still has to lex.
+    #
+    group_tokens = KerboscriptLexer._group_tokens
+    word_tokens = _WORD_TOKENS
+    variable = Name.Variable
+    name_types = _NAME_TYPES
+    # Every char is covered by exactly one match, so the position of
+    # each token is just the running total of the lengths before it.
+    for m in KerboscriptLexer._token_re.finditer(text, pos):
+        value = m.group()
+        tokentype = group_tokens[m.lastindex]
+        if tokentype is None:
+            if value[0] == '"':
+                # Unterminated string: flag the quote, and the rest of its
+                # line is the string.
+                yield pos, Error, '"'
+                if len(value) > 1:
+                    yield pos + 1, String, value[1:]
+                pos += len(value)
+                continue
+            after = text[pos + len(value):pos + len(value) + 1]
+            before = text[pos - 1] if pos else ' '
+            if after.isalnum() or after == '_':
+                # Glued onto a word char [a-z_\d] doesn't cover (such as
+                # an accented letter), so there is no \b anywhere in the
+                # run for any word rule to end on.
+                for i, c in enumerate(value):
+                    yield pos + i, Error, c
+                pos += len(value)
+                continue
+            if not (before.isalnum() or before == '_'):
+                tokentype = word_tokens.get(_fold(value), variable)
+                if tokentype in name_types and before == ':':
+                    tokentype = variable
+            else:
+                yield from _unanchored_word_tokens(pos, value)
+                pos += len(value)
+                continue
+        yield pos, tokentype, value
+        pos += len(value)
+
+
+def tokenize(chunks):
+    #
+    # Streaming form of KerboscriptLexer().get_tokens_unprocessed(text):
+    # takes the text as an iterable of str chunks (an open file, a list
+    # of lines, a generator reading a socket, ...) and yields the same
+    # (index, tokentype, value) tuples that lexing ''.join(chunks) in one
+    # go would, without ever holding the whole text in memory.  Note this
+    # skips the newline normalization pygments' get_tokens() does first.
+    #
+    # A token is only yielded once no later input can change it.  For
+    # every rule that holds as soon as the token ends before the last
+    # newline seen so far, because no rule looks past a newline except
+    # the whitespace and string ones, and those end before it too (a
+    # word looks at one char past its end, which is then still in the
+    # buffer).  The
+    # exception is a '"' with no closing quote anywhere in the buffer:
+    # whether it starts a string depends on input not read yet, so
+    # nothing from there on is yielded until another '"' turns up (or
+    # the input ends).
+    #
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    buf = ''      # text not yet yielded, after one char of context
+    start = 0     # where that text starts in buf: 0 at first, then 1
+    offset = 0    # position of buf[0] in the whole text
+    pending = []  # chunks read since buf was last lexed
+    waiting_for = '\n'
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Collected in a list and joined once, so a very long line
+        # arriving in many small chunks isn't copied over and over.
+        pending.append(chunk)
+        if waiting_for not in chunk:
+            continue
+        buf += ''.join(pending)
+        pending = []
+        last_newline = buf.rfind('\n')
+        held = None
+        for pos, tokentype, value in _lex(buf, start):
+            if tokentype is Error and value == '"':
+                held = pos
+                break
+            if pos + len(value) > last_newline:
+                held = pos
+                break
+            yield offset + pos, tokentype, value
+        if held is None:
+            held = len(buf)
+        waiting_for = '"' if buf.startswith('"', held) and \
+            buf.find('"', held + 1) < 0 else '\n'
+        # Keep one char before the held-back text for the \b checks.
+        if held > 0:
+            offset += held - 1
+            buf = buf[held - 1:]
+            start = 1
+    buf += ''.join(pending)
+    for pos, tokentype, value in _lex(buf, start):
+        yield offset + pos, tokentype, value
+
+
+class IncrementalLexer(object):
+    #
+    # Keeps the tokens of a text up to date while it is being edited, for
+    # editors and live previews: edit() re-lexes only around the change
+    # and says which tokens it replaced, instead of re-lexing the whole
+    # text on every keystroke.  The tokens are always exactly those of
+    # KerboscriptLexer().get_tokens_unprocessed(text) (so, like
+    # tokenize(), without pygments' newline normalization).
+    #
+    # The state kept per line is which token covers the start of the
+    # line, since a whitespace run or a string can start on an earlier
+    # line.  An edit is re-lexed from the token covering the start of
+    # the line before the edited char, as nothing before that can look
+    # far enough ahead to be affected, and stops as soon as a new token
+    # starts where an old one did, past the edit: from there on the
+    # lexer is back in the same state on the same text.  The one thing
+    # that looks further ahead is a quote left unterminated because no
+    # other quote follows it anywhere; inserting a quote restarts from it.
+    #
+
+    def __init__(self, text=''):
+        self._text = ''
+        self._starts = [0]     # position where each line starts
+        self._tokens = [[]]    # (column, tokentype, value) per line, for
+                               # the tokens starting on that line
+        self._cover = [0]      # how many lines back the token covering
+                               # the line's start starts
+        self._open_quote = None
+        self.edit(0, 0, text)
+
+    @property
+    def text(self):
+        return self._text
+
+    def tokens(self):
+        # All (index, tokentype, value) tuples, as get_tokens_unprocessed
+        # would yield them.
+        for start, line in zip(self._starts, self._tokens):
+            for col, tokentype, value in line:
+                yield start + col, tokentype, value
+
+    def line_tokens(self, lineno):
+        # The (index, tokentype, value) tuples of the tokens starting on
+        # line lineno (counted from 0).
+        start = self._starts[lineno]
+        return [(start + col, tokentype, value)
+                for col, tokentype, value in self._tokens[lineno]]
+
+    def _line_of(self, pos):
+        return bisect.bisect_right(self._starts, pos) - 1
+
+    def _starts_token(self, pos):
+        line = self._line_of(pos)
+        tokens = self._tokens[line]
+        col = pos - self._starts[line]
+        i = bisect.bisect_left(tokens, (col,))
+        return i < len(tokens) and tokens[i][0] == col
+
+    def edit(self, start, end, text):
+        #
+        # Replaces self.text[start:end] with text.  Returns
+        # (restart, old_stop, new_stop, tokens): the old tokens covering
+        # [restart, old_stop) have been replaced by tokens, which cover
+        # [restart, new_stop) of the new text.  All tokens after them
+        # are unchanged, only moved by new_stop - old_stop.
+        #
+        old = self._text
+        if not 0 <= start <= end <= len(old):
+            raise ValueError('edit range %d:%d out of 0:%d'
+                             % (start, end, len(old)))
+        new = old[:start] + text + old[end:]
+        delta = len(text) - (end - start)
+        edit_end = start + len(text)
+        starts = self._starts
+        tokens = self._tokens
+
+        line = self._line_of(max(start - 1, 0))
+        first = line - self._cover[line]
+        if self._cover[line]:
+            restart = starts[first] + tokens[first][-1][0]
+        else:
+            restart = starts[line]
+        if '"' in text and self._open_quote is not None and \
+                self._open_quote < restart:
+            restart = self._open_quote
+            first = self._line_of(restart)
+
+        relexed = []
+        old_stop = len(old)
+        # The rest of the line after an unterminated quote is one match
+        # with the quote, however it is split into tokens, so the lexer
+        # is only back in step after both, in the old and new tokens.
+        old_quoted = -1 if self._open_quote is None else \
+            self._open_quote + 1 + delta
+        quoted = False
+        for pos, tokentype, value in _lex(new, restart):
+            if pos > edit_end and not quoted and pos != old_quoted and \
+                    self._starts_token(pos - delta):
+                old_stop = pos - delta
+                break
+            relexed.append((pos, tokentype, value))
+            quoted = tokentype is Error and value == '"'
+        new_stop = old_stop + delta
+        last = self._line_of(old_stop)
+
+        # The new lines from first on, replacing old lines first..last.
+        new_starts = [starts[first]]
+        newline = new.find('\n', starts[first], new_stop)
+        while newline >= 0:
+            new_starts.append(newline + 1)
+            newline = new.find('\n', newline + 1, new_stop)
+        col = restart - starts[first]
+        kept = [token for token in tokens[first] if token[0] < col]
+        tail = [(starts[last] + col + delta, tokentype, value)
+                for col, tokentype, value in tokens[last]
+                if starts[last] + col >= old_stop]
+        new_tokens = [kept]
+        new_cover = [self._cover[first]]
+        owner = first if kept else first - self._cover[first]
+        line_start = new_starts[0]
+        for pos, tokentype, value in relexed + tail:
+            while len(new_tokens) < len(new_starts) and \
+                    new_starts[len(new_tokens)] <= pos:
+                line_start = new_starts[len(new_tokens)]
+                new_cover.append(0 if line_start == pos
+                                 else first + len(new_tokens) - owner)
+                new_tokens.append([])
+            new_tokens[-1].append((pos - line_start, tokentype, value))
+            owner = first + len(new_tokens) - 1
+        while len(new_tokens) < len(new_starts):
+            # Lines after the last token, at the end of the text.
+            new_cover.append(first + len(new_tokens) - owner)
+            new_tokens.append([])
+
+        self._text = new
+        if delta:
+            starts[last + 1:] = [s + delta for s in starts[last + 1:]]
+        starts[first:last + 1] = new_starts
+        tokens[first:last + 1] = new_tokens
+        self._cover[first:last + 1] = new_cover
+
+        open_quote = self._open_quote
+        self._open_quote = None
+        for pos, tokentype, value in relexed:
+            if tokentype is Error and value == '"':
+                self._open_quote = pos
+        if open_quote is not None and self._open_quote is None:
+            if open_quote < restart:
+                self._open_quote = open_quote
+            elif open_quote >= old_stop:
+                self._open_quote = open_quote + delta
+        return restart, old_stop, new_stop, relexed
+
+
+def fingerprint():
+    # A short hash that changes whenever the tokens could: with any edit
+    # to this file or to the word tables (or the grammar behind them),
+    # or with other documented names.  For caches of lexed or
+    # highlighted code.
+    global _source_digest
+    if _source_digest is None:
+        with open(__file__, 'rb') as f:
+            _source_digest = hashlib.sha256(f.read()).digest()
+    digest = hashlib.sha256(_source_digest)
+    digest.update(_tables.GRAMMAR_SHA256.encode('ascii'))
+    digest.update(_names.NAMES_SHA256.encode('ascii'))
+    return digest.hexdigest()[:16]
+
+_source_digest = None
+
+
+def use_names(names):
+    #
+    # Makes KerboscriptLexer (and with it tokenize() and
+    # IncrementalLexer) classify names by names, a module or namespace
+    # with NAMES_SHA256, NAME_TOKENS and NAME_ANCHORS as kslexer_names.py
+    # has them.  The docs build calls this when the names it documents
+    # differ from the ones in kslexer_names.py.
+    #
+    global _names, _WORD_TOKENS
+    word_tokens = dict(names.NAME_TOKENS)
+    word_tokens.update(_tables.WORD_TOKENS)
+    _names = names
+    _WORD_TOKENS = word_tokens
+
+
+def names_digest():
+    # NAMES_SHA256 of the documented names in use.
+    return _names.NAMES_SHA256
+
+
+def name_anchor(word):
+    # (docname, anchor) of where the name word is documented, or None.
+    return _names.NAME_ANCHORS.get(_fold(word))
+
+
+def _fold(word):
+    # With re.IGNORECASE, [a-z] also matches four non-ASCII letters.
+    # Mapping them back lets a plain str.lower() do the word lookups.
+    if word.isascii():
+        return word.lower()
+    return word.translate(_IGNORECASE_FOLD).lower()
+
+_IGNORECASE_FOLD = {
+    0x130: 'i', 0x131: 'i', 0x17f: 's', 0x212a: 'k',
+}
+
+# Token type of every special word that starts on a \b, so a word needs
+# only one lookup.  Anything not in here is a Name.Variable.  Grammar
+# words win over documented names (PRINT is a keyword, even though the
+# manual documents a PRINT function too), like the rule order in
+# KerboscriptRegexLexer.
+_WORD_TOKENS = None
+use_names(_names)
+
+# The token types of documented names, which a suffix doesn't get.
+_NAME_TYPES = frozenset((Name.Class, Name.Function, Name.Variable.Global))
+
+def _unanchored_word_tokens(pos, word):
+    #
+    # A word glued onto a preceding word character (e.g. the "xset" in
+    # "1xset", after the "1" failed every rule).  Only the keyword rule
+    # lacks a leading \b, so RegexLexer emits one Error per char until
+    # the rest of the word is a keyword.
+    #
+    folded = _fold(word)
+    # Only the last few chars can be a keyword; don't slice the rest.
+    shortest = len(word) - _LONGEST_KEYWORD
+    for i in range(len(word)):
+        if i >= shortest and folded[i:] in KEYWORDS:
+            yield pos + i, Keyword, word[i:]
+            return
+        yield pos + i, Error, word[i]
+
+_LONGEST_KEYWORD = max(len(word) for word in KEYWORDS)
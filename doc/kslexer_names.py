@@ -0,0 +1,498 @@
+#
+# GENERATED by the docs build (KerboscriptLexer.py) from the
+# ks:global, ks:function and ks:structure objects documented in
+# source/.  Do not edit by hand; "python kslexgen.py --names"
+# copies the last build's table here.
+#
+
+from pygments.token import Name
+
+NAMES_SHA256 = '744a4ffe3749fd97dccb502cb3cb296ad0c7139bf56e5c5df5c5f83c1e39fdd5'
+
+NAME_TOKENS = {
+    'abort': Name.Variable.Global,
+    'abs': Name.Function,
+    'add': Name.Variable.Global,
+    'addalarm': Name.Function,
+    'aggregateresource': Name.Class,
+    'airspeed': Name.Variable.Global,
+    'allnodes': Name.Variable.Global,
+    'allwaypoints': Name.Function,
+    'alt': Name.Class,
+    'altitude': Name.Variable.Global,
+    'angleaxis': Name.Function,
+    'angularmomentum': Name.Variable.Global,
+    'angularvel': Name.Variable.Global,
+    'angularvelocity': Name.Variable.Global,
+    'apoapsis': Name.Variable.Global,
+    'arccos': Name.Function,
+    'arcsin': Name.Function,
+    'arctan': Name.Function,
+    'arctan2': Name.Function,
+    'at': Name.Function,
+    'atmosphere': Name.Class,
+    'bays': Name.Variable.Global,
+    'black': Name.Variable.Global,
+    'blue': Name.Variable.Global,
+    'body': Name.Variable.Global,
+    'bodyatmosphere': Name.Function,
+    'bodyexists': Name.Function,
+    'boolean': Name.Class,
+    'bounds': Name.Class,
+    'box': Name.Class,
+    'brakes': Name.Variable.Global,
+    'button': Name.Class,
+    'career': Name.Class,
+    'ceiling': Name.Function,
+    'char': Name.Function,
+    'chutes': Name.Variable.Global,
+    'chutessafe': Name.Variable.Global,
+    'clearguis': Name.Function,
+    'clearscreen': Name.Variable.Global,
+    'clearvecdraws': Name.Function,
+    'config': Name.Class,
+    'connection': Name.Class,
+    'consumedresource': Name.Class,
+    'consumedresourcercs': Name.Class,
+    'control': Name.Class,
+    'controlconnection': Name.Variable.Global,
+    'core': Name.Class,
+    'cos': Name.Function,
+    'crafttemplate': Name.Class,
+    'createorbit': Name.Function,
+    'crewmember': Name.Class,
+    'cyan': Name.Variable.Global,
+    'decoupler': Name.Class,
+    'deletealarm': Name.Function,
+    'deltav': Name.Class,
+    'deploydrills': Name.Variable.Global,
+    'direction': Name.Class,
+    'dockingport': Name.Class,
+    'donothing': Name.Variable.Global,
+    'drills': Name.Variable.Global,
+    'droppriority': Name.Function,
+    'element': Name.Class,
+    'engine': Name.Class,
+    'enumerable': Name.Class,
+    'facing': Name.Variable.Global,
+    'filecontent': Name.Class,
+    'floor': Name.Function,
+    'fuelcells': Name.Variable.Global,
+    'gear': Name.Variable.Global,
+    'geocoordinates': Name.Class,
+    'geoposition': Name.Variable.Global,
+    'getvoice': Name.Function,
+    'gimbal': Name.Class,
+    'green': Name.Variable.Global,
+    'groundspeed': Name.Variable.Global,
+    'gui': Name.Function,
+    'hasnode': Name.Variable.Global,
+    'hastarget': Name.Variable.Global,
+    'heading': Name.Variable.Global,
+    'highlight': Name.Function,
+    'homeconnection': Name.Variable.Global,
+    'hsv': Name.Function,
+    'hsva': Name.Function,
+    'hudtext': Name.Variable.Global,
+    'intakes': Name.Variable.Global,
+    'iraddon': Name.Class,
+    'ircontrolgroup': Name.Class,
+    'irservo': Name.Class,
+    'isru': Name.Variable.Global,
+    'iterator': Name.Class,
+    'kacaddon': Name.Class,
+    'kacalarm': Name.Class,
+    'kosdelegate': Name.Class,
+    'kosprocessor': Name.Class,
+    'kuniverse': Name.Class,
+    'label': Name.Class,
+    'ladders': Name.Variable.Global,
+    'latitude': Name.Variable.Global,
+    'latlng': Name.Function,
+    'launchclamp': Name.Class,
+    'legs': Name.Variable.Global,
+    'lexicon': Name.Class,
+    'lights': Name.Variable.Global,
+    'list': Name.Class,
+    'listalarms': Name.Function,
+    'ln': Name.Function,
+    'loaddistance': Name.Class,
+    'log10': Name.Function,
+    'longitude': Name.Variable.Global,
+    'lookdirup': Name.Function,
+    'magenta': Name.Variable.Global,
+    'maneuvernode': Name.Class,
+    'mapview': Name.Variable.Global,
+    'mass': Name.Variable.Global,
+    'max': Name.Function,
+    'maxthrust': Name.Variable.Global,
+    'message': Name.Class,
+    'messagequeue': Name.Class,
+    'min': Name.Function,
+    'mod': Name.Function,
+    'nextnode': Name.Variable.Global,
+    'node': Name.Function,
+    'nodelegate': Name.Class,
+    'north': Name.Variable.Global,
+    'note': Name.Function,
+    'obt': Name.Variable.Global,
+    'orbit': Name.Class,
+    'orbitable': Name.Class,
+    'orbitablevelocity': Name.Class,
+    'orbitat': Name.Function,
+    'orbiteta': Name.Class,
+    'panels': Name.Variable.Global,
+    'part': Name.Class,
+    'partmodule': Name.Class,
+    'path': Name.Class,
+    'periapsis': Name.Variable.Global,
+    'pidloop': Name.Class,
+    'popupmenu': Name.Class,
+    'positionat': Name.Function,
+    'print': Name.Variable.Global,
+    'processor': Name.Function,
+    'prograde': Name.Variable.Global,
+    'purple': Name.Variable.Global,
+    'q': Name.Function,
+    'queue': Name.Class,
+    'r': Name.Function,
+    'radiators': Name.Variable.Global,
+    'random': Name.Function,
+    'randomseed': Name.Function,
+    'range': Name.Class,
+    'rcs': Name.Variable.Global,
+    'reboot': Name.Variable.Global,
+    'red': Name.Variable.Global,
+    'remove': Name.Variable.Global,
+    'resource': Name.Class,
+    'resourcetransfer': Name.Class,
+    'retrograde': Name.Variable.Global,
+    'rgb': Name.Function,
+    'rgba': Name.Function,
+    'rotatefromto': Name.Function,
+    'round': Name.Function,
+    'rtaddon': Name.Class,
+    'runoncepath': Name.Function,
+    'runpath': Name.Function,
+    'sas': Name.Variable.Global,
+    'scalar': Name.Class,
+    'sciencecontainermodule': Name.Class,
+    'sciencedata': Name.Class,
+    'scienceexperimentmodule': Name.Class,
+    'scrollbox': Name.Class,
+    'sensor': Name.Class,
+    'sensors': Name.Variable.Global,
+    'separator': Name.Class,
+    'ship': Name.Variable.Global,
+    'shipname': Name.Variable.Global,
+    'shutdown': Name.Variable.Global,
+    'sin': Name.Function,
+    'situationloaddistance': Name.Class,
+    'skin': Name.Class,
+    'slidenote': Name.Function,
+    'slider': Name.Class,
+    'spacing': Name.Class,
+    'sqrt': Name.Function,
+    'srfprograde': Name.Variable.Global,
+    'srfretrograde': Name.Variable.Global,
+    'stack': Name.Class,
+    'stage': Name.Variable.Global,
+    'status': Name.Variable.Global,
+    'steeringmanager': Name.Class,
+    'stopallvoices': Name.Function,
+    'string': Name.Class,
+    'structure': Name.Class,
+    'style': Name.Class,
+    'stylerectoffset': Name.Class,
+    'stylestate': Name.Class,
+    'surfacespeed': Name.Variable.Global,
+    'tan': Name.Function,
+    'target': Name.Variable.Global,
+    'terminal': Name.Class,
+    'terminalinput': Name.Class,
+    'textfield': Name.Class,
+    'time': Name.Variable.Global,
+    'timespan': Name.Function,
+    'timestamp': Name.Function,
+    'timewarp': Name.Class,
+    'tipdisplay': Name.Class,
+    'traddon': Name.Class,
+    'unchar': Name.Function,
+    'uniqueset': Name.Class,
+    'up': Name.Variable.Global,
+    'v': Name.Function,
+    'vang': Name.Function,
+    'vcrs': Name.Function,
+    'vdot': Name.Function,
+    'vecdraw': Name.Variable.Global,
+    'vecdrawargs': Name.Variable.Global,
+    'vector': Name.Class,
+    'vectorangle': Name.Function,
+    'vectorcrossproduct': Name.Function,
+    'vectordotproduct': Name.Function,
+    'vectorexclude': Name.Function,
+    'velocity': Name.Variable.Global,
+    'velocityat': Name.Function,
+    'versioninfo': Name.Class,
+    'verticalspeed': Name.Variable.Global,
+    'vessel': Name.Class,
+    'vesselsensors': Name.Class,
+    'voice': Name.Class,
+    'volume': Name.Class,
+    'volumedirectory': Name.Class,
+    'volumefile': Name.Class,
+    'volumeitem': Name.Class,
+    'vxcl': Name.Function,
+    'warp': Name.Variable.Global,
+    'warpmode': Name.Variable.Global,
+    'warpto': Name.Function,
+    'waypoint': Name.Function,
+    'wheelsteeringpid': Name.Variable.Global,
+    'white': Name.Variable.Global,
+    'widget': Name.Class,
+    'yellow': Name.Variable.Global,
+}
+
+NAME_ANCHORS = {
+    'abort': ('commands/flight/systems', 'global:ABORT'),
+    'abs': ('math/basic', 'function:ABS'),
+    'add': ('structures/vessels/node', 'global:ADD'),
+    'addalarm': ('addons/KAC', 'function:ADDALARM'),
+    'aggregateresource': ('structures/vessels/aggregateresource', 'structure:AGGREGATERESOURCE'),
+    'airspeed': ('bindings', 'global:AIRSPEED'),
+    'allnodes': ('structures/vessels/node', 'global:ALLNODES'),
+    'allwaypoints': ('structures/waypoint', 'function:ALLWAYPOINTS'),
+    'alt': ('structures/vessels/alt', 'structure:ALT'),
+    'altitude': ('bindings', 'global:ALTITUDE'),
+    'angleaxis': ('math/direction', 'function:ANGLEAXIS'),
+    'angularmomentum': ('bindings', 'global:ANGULARMOMENTUM'),
+    'angularvel': ('bindings', 'global:ANGULARVEL'),
+    'angularvelocity': ('bindings', 'global:ANGULARVELOCITY'),
+    'apoapsis': ('bindings', 'global:APOAPSIS'),
+    'arccos': ('math/basic', 'function:ARCCOS'),
+    'arcsin': ('math/basic', 'function:ARCSIN'),
+    'arctan': ('math/basic', 'function:ARCTAN'),
+    'arctan2': ('math/basic', 'function:ARCTAN2'),
+    'at': ('commands/terminalgui', 'function:AT'),
+    'atmosphere': ('structures/celestial_bodies/atmosphere', 'structure:ATMOSPHERE'),
+    'bays': ('commands/flight/systems', 'global:BAYS'),
+    'black': ('structures/misc/colors', 'global:BLACK'),
+    'blue': ('structures/misc/colors', 'global:BLUE'),
+    'body': ('bindings', 'global:BODY'),
+    'bodyatmosphere': ('structures/celestial_bodies/atmosphere', 'function:BODYATMOSPHERE'),
+    'bodyexists': ('structures/celestial_bodies/body', 'function:BODYEXISTS'),
+    'boolean': ('structures/misc/boolean', 'structure:BOOLEAN'),
+    'bounds': ('structures/vessels/bounds', 'structure:BOUNDS'),
+    'box': ('structures/gui_widgets/box', 'structure:BOX'),
+    'brakes': ('commands/flight/systems', 'global:BRAKES'),
+    'button': ('structures/gui_widgets/button', 'structure:BUTTON'),
+    'career': ('general/career_limits', 'structure:CAREER'),
+    'ceiling': ('math/basic', 'function:CEILING'),
+    'char': ('math/basic', 'function:CHAR'),
+    'chutes': ('commands/flight/systems', 'global:CHUTES'),
+    'chutessafe': ('commands/flight/systems', 'global:CHUTESSAFE'),
+    'clearguis': ('structures/gui', 'function:CLEARGUIS'),
+    'clearscreen': ('commands/terminalgui', 'global:CLEARSCREEN'),
+    'clearvecdraws': ('structures/misc/vecdraw', 'function:CLEARVECDRAWS'),
+    'config': ('structures/misc/config', 'structure:CONFIG'),
+    'connection': ('structures/communication/connection', 'structure:CONNECTION'),
+    'consumedresource': ('structures/vessels/consumedresource', 'structure:CONSUMEDRESOURCE'),
+    'consumedresourcercs': ('structures/vessels/consumedresourcercs', 'structure:CONSUMEDRESOURCERCS'),
+    'control': ('commands/flight/pilot', 'structure:CONTROL'),
+    'controlconnection': ('commands/communication', 'global:CONTROLCONNECTION'),
+    'core': ('structures/vessels/core', 'structure:CORE'),
+    'cos': ('math/basic', 'function:COS'),
+    'crafttemplate': ('structures/vessels/crafttemplate', 'structure:CRAFTTEMPLATE'),
+    'createorbit': ('structures/orbits/orbit', 'function:CREATEORBIT'),
+    'crewmember': ('structures/vessels/crewmember', 'structure:CREWMEMBER'),
+    'cyan': ('structures/misc/colors', 'global:CYAN'),
+    'decoupler': ('structures/vessels/decoupler', 'structure:DECOUPLER'),
+    'deletealarm': ('addons/KAC', 'function:DELETEALARM'),
+    'deltav': ('structures/vessels/deltav', 'structure:DELTAV'),
+    'deploydrills': ('commands/flight/systems', 'global:DEPLOYDRILLS'),
+    'direction': ('math/direction', 'structure:DIRECTION'),
+    'dockingport': ('structures/vessels/dockingport', 'structure:DOCKINGPORT'),
+    'donothing': ('structures/misc/kosdelegate', 'global:DONOTHING'),
+    'drills': ('commands/flight/systems', 'global:DRILLS'),
+    'droppriority': ('general/cpu_hardware', 'function:DROPPRIORITY'),
+    'element': ('structures/vessels/element', 'structure:ELEMENT'),
+    'engine': ('structures/vessels/engine', 'structure:ENGINE'),
+    'enumerable': ('structures/collections/enumerable', 'structure:ENUMERABLE'),
+    'facing': ('bindings', 'global:FACING'),
+    'filecontent': ('structures/volumes_and_files/filecontent', 'structure:FILECONTENT'),
+    'floor': ('math/basic', 'function:FLOOR'),
+    'fuelcells': ('commands/flight/systems', 'global:FUELCELLS'),
+    'gear': ('commands/flight/systems', 'global:GEAR'),
+    'geocoordinates': ('math/geocoordinates', 'structure:GEOCOORDINATES'),
+    'geoposition': ('bindings', 'global:GEOPOSITION'),
+    'getvoice': ('structures/misc/voice', 'function:GETVOICE'),
+    'gimbal': ('structures/vessels/gimbal', 'structure:GIMBAL'),
+    'green': ('structures/misc/colors', 'global:GREEN'),
+    'groundspeed': ('bindings', 'global:GROUNDSPEED'),
+    'gui': ('structures/gui', 'function:GUI'),
+    'hasnode': ('structures/vessels/node', 'global:HASNODE'),
+    'hastarget': ('bindings', 'global:HASTARGET'),
+    'heading': ('bindings', 'global:HEADING'),
+    'highlight': ('structures/misc/highlight', 'function:HIGHLIGHT'),
+    'homeconnection': ('commands/communication', 'global:HOMECONNECTION'),
+    'hsv': ('structures/misc/colors', 'function:HSV'),
+    'hsva': ('structures/misc/colors', 'function:HSVA'),
+    'hudtext': ('commands/terminalgui', 'global:HUDTEXT'),
+    'intakes': ('commands/flight/systems', 'global:INTAKES'),
+    'iraddon': ('addons/IR', 'structure:IRADDON'),
+    'ircontrolgroup': ('addons/IR', 'structure:IRCONTROLGROUP'),
+    'irservo': ('addons/IR', 'structure:IRSERVO'),
+    'isru': ('commands/flight/systems', 'global:ISRU'),
+    'iterator': ('structures/collections/iterator', 'structure:ITERATOR'),
+    'kacaddon': ('addons/KAC', 'structure:KACADDON'),
+    'kacalarm': ('addons/KAC', 'structure:KACALARM'),
+    'kosdelegate': ('structures/misc/kosdelegate', 'structure:KOSDELEGATE'),
+    'kosprocessor': ('structures/vessels/kosprocessor', 'structure:KOSPROCESSOR'),
+    'kuniverse': ('structures/misc/kuniverse', 'structure:KUNIVERSE'),
+    'label': ('structures/gui_widgets/label', 'structure:LABEL'),
+    'ladders': ('commands/flight/systems', 'global:LADDERS'),
+    'latitude': ('bindings', 'global:LATITUDE'),
+    'latlng': ('math/geocoordinates', 'function:LATLNG'),
+    'launchclamp': ('structures/vessels/launchclamp', 'structure:LAUNCHCLAMP'),
+    'legs': ('commands/flight/systems', 'global:LEGS'),
+    'lexicon': ('structures/collections/lexicon', 'structure:LEXICON'),
+    'lights': ('commands/flight/systems', 'global:LIGHTS'),
+    'list': ('structures/collections/list', 'structure:LIST'),
+    'listalarms': ('addons/KAC', 'function:LISTALARMS'),
+    'ln': ('math/basic', 'function:LN'),
+    'loaddistance': ('structures/misc/loaddistance', 'structure:LOADDISTANCE'),
+    'log10': ('math/basic', 'function:LOG10'),
+    'longitude': ('bindings', 'global:LONGITUDE'),
+    'lookdirup': ('math/direction', 'function:LOOKDIRUP'),
+    'magenta': ('structures/misc/colors', 'global:MAGENTA'),
+    'maneuvernode': ('structures/vessels/node', 'structure:MANEUVERNODE'),
+    'mapview': ('commands/terminalgui', 'global:MAPVIEW'),
+    'mass': ('bindings', 'global:MASS'),
+    'max': ('math/basic', 'function:MAX'),
+    'maxthrust': ('bindings', 'global:MAXTHRUST'),
+    'message': ('structures/communication/message', 'structure:MESSAGE'),
+    'messagequeue': ('structures/communication/message_queue', 'structure:MESSAGEQUEUE'),
+    'min': ('math/basic', 'function:MIN'),
+    'mod': ('math/basic', 'function:MOD'),
+    'nextnode': ('structures/vessels/node', 'global:NEXTNODE'),
+    'node': ('structures/vessels/node', 'function:NODE'),
+    'nodelegate': ('structures/misc/kosdelegate', 'structure:NODELEGATE'),
+    'north': ('bindings', 'global:NORTH'),
+    'note': ('structures/misc/note', 'function:NOTE'),
+    'obt': ('bindings', 'global:OBT'),
+    'orbit': ('structures/orbits/orbit', 'structure:ORBIT'),
+    'orbitable': ('structures/orbits/orbitable', 'structure:ORBITABLE'),
+    'orbitablevelocity': ('structures/orbits/orbitablevelocity', 'structure:ORBITABLEVELOCITY'),
+    'orbitat': ('commands/prediction', 'function:ORBITAT'),
+    'orbiteta': ('structures/orbits/eta', 'structure:ORBITETA'),
+    'panels': ('commands/flight/systems', 'global:PANELS'),
+    'part': ('structures/vessels/part', 'structure:PART'),
+    'partmodule': ('structures/vessels/partmodule', 'structure:PARTMODULE'),
+    'path': ('structures/volumes_and_files/path', 'structure:PATH'),
+    'periapsis': ('bindings', 'global:PERIAPSIS'),
+    'pidloop': ('structures/misc/pidloop', 'structure:PIDLOOP'),
+    'popupmenu': ('structures/gui_widgets/popupmenu', 'structure:POPUPMENU'),
+    'positionat': ('commands/prediction', 'function:POSITIONAT'),
+    'print': ('commands/terminalgui', 'global:PRINT'),
+    'processor': ('commands/communication', 'function:PROCESSOR'),
+    'prograde': ('bindings', 'global:PROGRADE'),
+    'purple': ('structures/misc/colors', 'global:PURPLE'),
+    'q': ('math/direction', 'function:Q'),
+    'queue': ('structures/collections/queue', 'structure:QUEUE'),
+    'r': ('math/direction', 'function:R'),
+    'radiators': ('commands/flight/systems', 'global:RADIATORS'),
+    'random': ('math/basic', 'function:RANDOM'),
+    'randomseed': ('math/basic', 'function:RANDOMSEED'),
+    'range': ('structures/collections/range', 'structure:RANGE'),
+    'rcs': ('commands/flight/systems', 'global:RCS'),
+    'reboot': ('commands/terminalgui', 'global:REBOOT'),
+    'red': ('structures/misc/colors', 'global:RED'),
+    'remove': ('structures/vessels/node', 'global:REMOVE'),
+    'resource': ('structures/vessels/resource', 'structure:RESOURCE'),
+    'resourcetransfer': ('structures/misc/resource_transfer', 'structure:RESOURCETRANSFER'),
+    'retrograde': ('bindings', 'global:RETROGRADE'),
+    'rgb': ('structures/misc/colors', 'function:RGB'),
+    'rgba': ('structures/misc/colors', 'function:RGBA'),
+    'rotatefromto': ('math/direction', 'function:ROTATEFROMTO'),
+    'round': ('math/basic', 'function:ROUND'),
+    'rtaddon': ('addons/RemoteTech', 'structure:RTADDON'),
+    'runoncepath': ('commands/runprogram', 'function:RUNONCEPATH'),
+    'runpath': ('commands/runprogram', 'function:RUNPATH'),
+    'sas': ('commands/flight/systems', 'global:SAS'),
+    'scalar': ('math/scalar', 'structure:SCALAR'),
+    'sciencecontainermodule': ('structures/vessels/sciencecontainermodule', 'structure:SCIENCECONTAINERMODULE'),
+    'sciencedata': ('structures/vessels/sciencedatavalue', 'structure:SCIENCEDATA'),
+    'scienceexperimentmodule': ('structures/vessels/scienceexperiment', 'structure:SCIENCEEXPERIMENTMODULE'),
+    'scrollbox': ('structures/gui_widgets/scrollbox', 'structure:SCROLLBOX'),
+    'sensor': ('structures/vessels/sensor', 'structure:SENSOR'),
+    'sensors': ('bindings', 'global:SENSORS'),
+    'separator': ('structures/vessels/separator', 'structure:SEPARATOR'),
+    'ship': ('bindings', 'global:SHIP'),
+    'shipname': ('bindings', 'global:SHIPNAME'),
+    'shutdown': ('commands/terminalgui', 'global:SHUTDOWN'),
+    'sin': ('math/basic', 'function:SIN'),
+    'situationloaddistance': ('structures/misc/loaddistance', 'structure:SITUATIONLOADDISTANCE'),
+    'skin': ('structures/gui_widgets/skin', 'structure:SKIN'),
+    'slidenote': ('structures/misc/note', 'function:SLIDENOTE'),
+    'slider': ('structures/gui_widgets/slider', 'structure:SLIDER'),
+    'spacing': ('structures/gui_widgets/spacing', 'structure:SPACING'),
+    'sqrt': ('math/basic', 'function:SQRT'),
+    'srfprograde': ('bindings', 'global:SRFPROGRADE'),
+    'srfretrograde': ('bindings', 'global:SRFRETROGRADE'),
+    'stack': ('structures/collections/stack', 'structure:STACK'),
+    'stage': ('structures/vessels/stage', 'global:STAGE'),
+    'status': ('bindings', 'global:STATUS'),
+    'steeringmanager': ('structures/misc/steeringmanager', 'structure:STEERINGMANAGER'),
+    'stopallvoices': ('structures/misc/voice', 'function:STOPALLVOICES'),
+    'string': ('structures/misc/string', 'structure:STRING'),
+    'structure': ('structures/reflection/structure', 'structure:STRUCTURE'),
+    'style': ('structures/gui_widgets/style', 'structure:STYLE'),
+    'stylerectoffset': ('structures/gui_widgets/stylerecoffset', 'structure:STYLERECTOFFSET'),
+    'stylestate': ('structures/gui_widgets/stylestate', 'structure:STYLESTATE'),
+    'surfacespeed': ('bindings', 'global:SURFACESPEED'),
+    'tan': ('math/basic', 'function:TAN'),
+    'target': ('commands/flight/systems', 'global:TARGET'),
+    'terminal': ('structures/misc/terminal', 'structure:TERMINAL'),
+    'terminalinput': ('structures/misc/terminalinput', 'structure:TERMINALINPUT'),
+    'textfield': ('structures/gui_widgets/textfield', 'structure:TEXTFIELD'),
+    'time': ('structures/misc/time', 'global:TIME'),
+    'timespan': ('structures/misc/time', 'function:TIMESPAN'),
+    'timestamp': ('structures/misc/time', 'function:TIMESTAMP'),
+    'timewarp': ('structures/misc/timewarp', 'structure:TIMEWARP'),
+    'tipdisplay': ('structures/gui_widgets/tipdisplay', 'structure:TIPDISPLAY'),
+    'traddon': ('addons/Trajectories', 'structure:TRADDON'),
+    'unchar': ('math/basic', 'function:UNCHAR'),
+    'uniqueset': ('structures/collections/uniqueset', 'structure:UNIQUESET'),
+    'up': ('bindings', 'global:UP'),
+    'v': ('math/vector', 'function:V'),
+    'vang': ('math/vector', 'function:VANG'),
+    'vcrs': ('math/vector', 'function:VCRS'),
+    'vdot': ('math/vector', 'function:VDOT'),
+    'vecdraw': ('commands/terminalgui', 'global:VECDRAW'),
+    'vecdrawargs': ('commands/terminalgui', 'global:VECDRAWARGS'),
+    'vector': ('math/vector', 'structure:VECTOR'),
+    'vectorangle': ('math/vector', 'function:VECTORANGLE'),
+    'vectorcrossproduct': ('math/vector', 'function:VECTORCROSSPRODUCT'),
+    'vectordotproduct': ('math/vector', 'function:VECTORDOTPRODUCT'),
+    'vectorexclude': ('math/vector', 'function:VECTOREXCLUDE'),
+    'velocity': ('bindings', 'global:VELOCITY'),
+    'velocityat': ('commands/prediction', 'function:VELOCITYAT'),
+    'versioninfo': ('structures/misc/versioninfo', 'structure:VERSIONINFO'),
+    'verticalspeed': ('bindings', 'global:VERTICALSPEED'),
+    'vessel': ('structures/vessels/vessel', 'structure:VESSEL'),
+    'vesselsensors': ('structures/vessels/vesselsensors', 'structure:VESSELSENSORS'),
+    'voice': ('structures/misc/voice', 'structure:VOICE'),
+    'volume': ('structures/volumes_and_files/volume', 'structure:VOLUME'),
+    'volumedirectory': ('structures/volumes_and_files/volumedirectory', 'structure:VOLUMEDIRECTORY'),
+    'volumefile': ('structures/volumes_and_files/volumefile', 'structure:VOLUMEFILE'),
+    'volumeitem': ('structures/volumes_and_files/volumeitem', 'structure:VOLUMEITEM'),
+    'vxcl': ('math/vector', 'function:VXCL'),
+    'warp': ('structures/misc/timewarp', 'global:WARP'),
+    'warpmode': ('structures/misc/timewarp', 'global:WARPMODE'),
+    'warpto': ('structures/misc/timewarp', 'function:WARPTO'),
+    'waypoint': ('structures/waypoint', 'function:WAYPOINT'),
+    'wheelsteeringpid': ('commands/flight/cooked', 'global:WHEELSTEERINGPID'),
+    'white': ('structures/misc/colors', 'global:WHITE'),
+    'widget': ('structures/gui_widgets/widget', 'structure:WIDGET'),
+    'yellow': ('structures/misc/colors', 'global:YELLOW'),
+}
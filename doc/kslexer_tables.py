@@ -0,0 +1,93 @@
+#
+# GENERATED by kslexgen.py from src/kOS.Safe/Compilation/KS/kRISC.tpg.
+# Do not edit by hand; run kslexgen.py again whenever the grammar
+# changes.
+#
+
+from pygments.token import Keyword, Name, Operator
+
+GRAMMAR_SHA256 = '2d40a4037661204ec1cb2ccbb48acb5534da733005d9ac002a57a59d95549509'
+
+OPERATOR_WORDS = frozenset((
+    'all', 'and', 'in', 'is', 'not', 'or', 'to',
+))
+
+KEYWORDS = frozenset((
+    'add', 'at', 'break', 'choose', 'clearscreen', 'clobberbuiltins',
+    'compile', 'copy', 'defined', 'delete', 'do', 'edit', 'else', 'file',
+    'for', 'from', 'if', 'lazyglobal', 'list', 'lock', 'log', 'once',
+    'preserve', 'print', 'reboot', 'remove', 'rename', 'return', 'run',
+    'runoncepath', 'runpath', 'set', 'shutdown', 'stage', 'step', 'switch',
+    'then', 'toggle', 'unlock', 'unset', 'until', 'volume', 'wait', 'when',
+))
+
+DECLARATION_WORDS = frozenset((
+    'declare', 'function', 'global', 'local', 'parameter',
+))
+
+BUILTIN_WORDS = frozenset((
+    'false', 'off', 'on', 'true',
+))
+
+WORD_TOKENS = {
+    'add': Keyword,
+    'all': Operator.Word,
+    'and': Operator.Word,
+    'at': Keyword,
+    'break': Keyword,
+    'choose': Keyword,
+    'clearscreen': Keyword,
+    'clobberbuiltins': Keyword,
+    'compile': Keyword,
+    'copy': Keyword,
+    'declare': Keyword.Declaration,
+    'defined': Keyword,
+    'delete': Keyword,
+    'do': Keyword,
+    'edit': Keyword,
+    'else': Keyword,
+    'false': Name.Builtin,
+    'file': Keyword,
+    'for': Keyword,
+    'from': Keyword,
+    'function': Keyword.Declaration,
+    'global': Keyword.Declaration,
+    'if': Keyword,
+    'in': Operator.Word,
+    'is': Operator.Word,
+    'lazyglobal': Keyword,
+    'list': Keyword,
+    'local': Keyword.Declaration,
+    'lock': Keyword,
+    'log': Keyword,
+    'not': Operator.Word,
+    'off': Name.Builtin,
+    'on': Name.Builtin,
+    'once': Keyword,
+    'or': Operator.Word,
+    'parameter': Keyword.Declaration,
+    'preserve': Keyword,
+    'print': Keyword,
+    'reboot': Keyword,
+    'remove': Keyword,
+    'rename': Keyword,
+    'return': Keyword,
+    'run': Keyword,
+    'runoncepath': Keyword,
+    'runpath': Keyword,
+    'set': Keyword,
+    'shutdown': Keyword,
+    'stage': Keyword,
+    'step': Keyword,
+    'switch': Keyword,
+    'then': Keyword,
+    'to': Operator.Word,
+    'toggle': Keyword,
+    'true': Name.Builtin,
+    'unlock': Keyword,
+    'unset': Keyword,
+    'until': Keyword,
+    'volume': Keyword,
+    'wait': Keyword,
+    'when': Keyword,
+}
@@ -0,0 +1,309 @@
+#
+# Generates kslexer_tables.py, the word tables kslexer.py highlights
+# Kerboscript with, from the terminal definitions in the compiler's own
+# TinyPG grammar, src/kOS.Safe/Compilation/KS/kRISC.tpg.  That way the
+# docs highlight exactly the keywords the compiler knows about.
+#
+# Whoever changes the grammar regenerates the checked-in file (or, with
+# --check, just verifies it is up to date):
+#
+#     python kslexgen.py [--check]
+#
+# Until then kslexer.py notices on import that the grammar's hash differs
+# from the one recorded in kslexer_tables.py, and uses tables rendered
+# from the grammar in memory, with a warning; it never writes the file.
+#
+# It also renders kslexer_names.py, the table of the structures,
+# functions and bound variables the manual documents, which the lexer
+# tells apart from user names.  Those come from the docs rather than the
+# grammar, so it is the docs build (KerboscriptLexer.py) that renders
+# them, into its doctrees directory.  The checked-in copy, which the
+# lexer falls back on outside the build, is updated from the last build
+# with:
+#
+#     python kslexgen.py --names [build/doctrees]
+#
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+DOC_DIR = os.path.dirname(os.path.abspath(__file__))
+GRAMMAR_PATH = os.path.join(os.path.dirname(DOC_DIR), 'src', 'kOS.Safe',
+                            'Compilation', 'KS', 'kRISC.tpg')
+TABLES_PATH = os.path.join(DOC_DIR, 'kslexer_tables.py')
+NAMES_FILE = 'kslexer_names.py'
+NAMES_PATH = os.path.join(DOC_DIR, NAMES_FILE)
+
+# A terminal line looks like:   SET          -> @"set\b";
+_terminal_re = re.compile(r'^\s*(?P<name>[A-Z_]+)\s*->\s*@"(?P<regex>.*)";')
+# A regex that is nothing but one or more literal words, e.g. "set\b" or
+# "true\b|\bfalse\b".
+_word_re = re.compile(r'^(?:\\b)?([a-z]+)\\b$')
+
+# Which pygments category the words of a terminal go in.  Any other
+# terminal whose regex is a plain word is a Keyword.
+OPERATOR_TERMINALS = ('NOT', 'AND', 'OR', 'TO', 'IS', 'ALL', 'IN')
+DECLARATION_TERMINALS = ('DECLARE', 'LOCAL', 'GLOBAL', 'PARAMETER',
+                         'FUNCTION')
+BUILTIN_TERMINALS = ('TRUEFALSE', 'ON', 'OFF')
+
+
+def grammar_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def read_terminals(text):
+    #
+    # Returns [(NAME, regex)] for every terminal in the grammar, in order.
+    # Terminals come before the '// Rules' line.
+    #
+    terminals = []
+    for line in text.splitlines():
+        if line.strip().startswith('// Rules'):
+            break
+        m = _terminal_re.match(line)
+        if m is not None:
+            terminals.append((m.group('name'), m.group('regex')))
+    return terminals
+
+
+def terminal_words(regex):
+    # The literal words a terminal's regex matches, or None if it matches
+    # anything other than literal words.
+    words = []
+    for alternative in regex.split('|'):
+        m = _word_re.match(alternative)
+        if m is None:
+            return None
+        words.append(m.group(1))
+    return words
+
+
+def classify(terminals):
+    #
+    # Sorts the word terminals into the four word lists kslexer uses.
+    # Returns a dict of list name -> sorted list of words.
+    #
+    tables = {
+        'OPERATOR_WORDS': set(),
+        'KEYWORDS': set(),
+        'DECLARATION_WORDS': set(),
+        'BUILTIN_WORDS': set(),
+    }
+    for name, regex in terminals:
+        words = terminal_words(regex)
+        if words is None:
+            continue
+        if name in OPERATOR_TERMINALS:
+            table = 'OPERATOR_WORDS'
+        elif name in DECLARATION_TERMINALS:
+            table = 'DECLARATION_WORDS'
+        elif name in BUILTIN_TERMINALS:
+            table = 'BUILTIN_WORDS'
+        else:
+            table = 'KEYWORDS'
+        tables[table].update(words)
+    return dict((table, sorted(words)) for table, words in tables.items())
+
+
+def _format_words(name, words):
+    lines = ['%s = frozenset((' % name]
+    line = '   '
+    for word in words:
+        item = ' %r,' % word
+        if len(line) + len(item) > 76:
+            lines.append(line)
+            line = '   '
+        line += item
+    lines.append(line)
+    lines.append('))')
+    return '\n'.join(lines)
+
+
+def render(text):
+    #
+    # Source of kslexer_tables.py for the given grammar text.  Besides the
+    # four word lists it holds WORD_TOKENS, the word -> token type table
+    # KerboscriptLexer looks every word up in, precomputed here so that
+    # importing the module does no work beyond loading its bytecode.
+    #
+    tables = classify(read_terminals(text))
+    order = (('OPERATOR_WORDS', 'Operator.Word'),
+             ('KEYWORDS', 'Keyword'),
+             ('DECLARATION_WORDS', 'Keyword.Declaration'),
+             ('BUILTIN_WORDS', 'Name.Builtin'))
+    word_tokens = {}
+    # Earlier lists win when a word is in more than one, the same as the
+    # rule order in KerboscriptRegexLexer (benchmarks/ksregexlexer.py).
+    for table, token in reversed(order):
+        for word in tables[table]:
+            word_tokens[word] = token
+
+    out = [
+        '#',
+        '# GENERATED by kslexgen.py from src/kOS.Safe/Compilation/KS/kRISC.tpg.',
+        '# Do not edit by hand; run kslexgen.py again whenever the grammar',
+        '# changes.',
+        '#',
+        '',
+        'from pygments.token import Keyword, Name, Operator',
+        '',
+        'GRAMMAR_SHA256 = %r' % grammar_hash(text),
+        '',
+    ]
+    for table, token in order:
+        out.append(_format_words(table, tables[table]))
+        out.append('')
+    out.append('WORD_TOKENS = {')
+    for word in sorted(word_tokens):
+        out.append('    %r: %s,' % (word, word_tokens[word]))
+    out.append('}')
+    out.append('')
+    return '\n'.join(out)
+
+
+def generate(grammar_path=GRAMMAR_PATH, tables_path=TABLES_PATH):
+    #
+    # Regenerates tables_path from grammar_path.  Returns the new source,
+    # or None if the file was already up to date.
+    #
+    with open(grammar_path, encoding='utf-8') as f:
+        text = f.read()
+    source = render(text)
+    try:
+        with open(tables_path, encoding='utf-8') as f:
+            if f.read() == source:
+                return None
+    except OSError:
+        pass
+    write_file(tables_path, source)
+    return source
+
+
+def write_file(path, source):
+    # Writes source to path through a temporary file next to it, so
+    # an interrupted write never leaves a truncated module behind.
+    tmp = '%s.tmp%d' % (path, os.getpid())
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(source)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# The token type of a documented name, by the ks object type documenting
+# it.  A name documented as more than one of them gets the first one here
+# (TIME is a bound variable as well as a function, BODY a function as
+# well as a structure).
+NAME_OBJTYPES = (('global', 'Name.Variable.Global'),
+                 ('function', 'Name.Function'),
+                 ('structure', 'Name.Class'))
+
+# Only names the lexer's word rule matches as a whole are of use; the
+# domain also has entries such as "CONSTANT:PI" and "AG1 ... AG10".
+_name_re = re.compile(r'^[a-z_][a-z_\d]*$')
+
+
+def render_names(objects):
+    #
+    # Source of kslexer_names.py for objects, an iterable of (objtype,
+    # NAME, docname, anchor) for the documented ks objects.  NAME_TOKENS
+    # maps each usable name, in lower case, to its token type, and
+    # NAME_ANCHORS to the (docname, anchor) it is documented at.
+    # NAMES_SHA256 is a hash of both, so a build can tell if its own
+    # table differs from the one the lexer loaded.
+    #
+    rank = dict((objtype, i) for i, (objtype, token)
+                in enumerate(NAME_OBJTYPES))
+    chosen = {}
+    for objtype, name, docname, anchor in objects:
+        word = name.lower()
+        if objtype not in rank or not _name_re.match(word):
+            continue
+        key = (rank[objtype], docname, anchor)
+        if word not in chosen or key < chosen[word]:
+            chosen[word] = key
+    tokens = []
+    anchors = []
+    for word in sorted(chosen):
+        index, docname, anchor = chosen[word]
+        tokens.append('    %r: %s,' % (word, NAME_OBJTYPES[index][1]))
+        anchors.append('    %r: (%r, %r),' % (word, docname, anchor))
+    body = '\n'.join(['NAME_TOKENS = {'] + tokens + ['}', '',
+                      'NAME_ANCHORS = {'] + anchors + ['}', ''])
+    return '\n'.join([
+        '#',
+        '# GENERATED by the docs build (KerboscriptLexer.py) from the',
+        '# ks:global, ks:function and ks:structure objects documented in',
+        '# source/.  Do not edit by hand; "python kslexgen.py --names"',
+        '# copies the last build\'s table here.',
+        '#',
+        '',
+        'from pygments.token import Name',
+        '',
+        'NAMES_SHA256 = %r' % grammar_hash(body),
+        '',
+        body,
+    ])
+
+
+def update_names(doctreedir, names_path=NAMES_PATH):
+    #
+    # Replaces names_path with the names table the last build into
+    # doctreedir rendered.  Returns whether it changed.
+    #
+    with open(os.path.join(doctreedir, NAMES_FILE), encoding='utf-8') as f:
+        source = f.read()
+    try:
+        with open(names_path, encoding='utf-8') as f:
+            if f.read() == source:
+                return False
+    except OSError:
+        pass
+    write_file(names_path, source)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate kslexer_tables.py from kRISC.tpg.")
+    parser.add_argument('--check', action='store_true',
+                        help="only report whether the file is up to date")
+    parser.add_argument('--names', nargs='?', metavar='DOCTREEDIR',
+                        const=os.path.join('build', 'doctrees'),
+                        help="instead, update kslexer_names.py from the "
+                             "last build into DOCTREEDIR "
+                             "(default: build/doctrees)")
+    args = parser.parse_args()
+    if args.names is not None:
+        try:
+            changed = update_names(args.names)
+        except OSError as e:
+            print(f'no names table from a build: {e}')
+            sys.exit(1)
+        print('kslexer_names.py updated' if changed
+              else 'kslexer_names.py was already up to date')
+    elif args.check:
+        with open(GRAMMAR_PATH, encoding='utf-8') as f:
+            source = render(f.read())
+        with open(TABLES_PATH, encoding='utf-8') as f:
+            if f.read() != source:
+                print('kslexer_tables.py is out of date; run kslexgen.py')
+                sys.exit(1)
+        print('kslexer_tables.py is up to date')
+    elif generate() is None:
+        print('kslexer_tables.py was already up to date')
+    else:
+        print('kslexer_tables.py regenerated')
+
+
+if __name__ == '__main__':
+    main()
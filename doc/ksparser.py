@@ -0,0 +1,527 @@
+#
+# A Kerboscript syntax checker, driven by the same TinyPG grammar the kOS
+# compiler is generated from: src/kOS.Safe/Compilation/KS/kRISC.tpg.
+#
+# The grammar is read when this module is imported and every rule is
+# turned into a small Python closure, so there is no generated parser to
+# keep in sync: a change to the grammar is picked up by the next build.
+# The closures do what TinyPG's generated C# parser does, including its
+# quirks, so a snippet is accepted here exactly when kOS would parse it:
+#
+# - The scanner is context sensitive.  At each point it only tries the
+#   terminals the parser can accept there (plus whitespace and comments),
+#   takes the longest match, and on a tie the one defined first in the
+#   grammar.  So "set" is a SET where a statement may start, but the
+#   IDENTIFIER "set" after a colon.
+#
+# - Once a token has been looked at, it is kept until it is consumed,
+#   even if the parser then asks for a different set of terminals
+#   (unless nothing matched at all).
+#
+# - Choices, ?, * and + decide with one token of lookahead, taking the
+#   first alternative whose FIRST set holds it.
+#
+# Only the first syntax error is reported, since everything TinyPG
+# reports after it tends to be fallout from the first one.
+#
+# Like kslexer, this module only needs the standard library, not Sphinx.
+# kssyntaxcheck.py is the Sphinx extension that checks the manual's code
+# blocks with it.
+#
+
+import bisect
+import re
+try:
+    from re import _parser as _sre_parse, _constants as _sre
+except ImportError:
+    try:
+        import sre_parse as _sre_parse, sre_constants as _sre
+    except ImportError:
+        _sre_parse = _sre = None
+
+import kslexgen
+
+__all__ = ['KerboscriptSyntaxError', 'parse', 'check']
+
+
+class KerboscriptSyntaxError(ValueError):
+
+    def __init__(self, message, line, column):
+        # All three go to args, so the error survives pickling on its
+        # way back from a worker process.
+        super(KerboscriptSyntaxError, self).__init__(message, line, column)
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        return '%d:%d: %s' % (self.line, self.column, self.message)
+
+
+# .NET regex constructs used by the grammar's terminals, and their Python
+# equivalents.  \p{C} (control, format, ... chars) is only approximated,
+# by the ones that can plausibly turn up in a script.
+_DOTNET_REGEX = (
+    (r'[_\p{L}]', r'[^\W\d]'),
+    (r'\p{C}', '[\\x00-\\x1f\\x7f-\\x9f\\xad\\u200b-\\u200f\\u2060-\\u2064'
+               '\\ufeff]'),
+)
+
+# Terminals the scanner skips wherever it is.
+_SKIPPED = ('WHITESPACE', 'COMMENTLINE')
+
+
+def _python_regex(regex):
+    # The terminals are C# verbatim strings, which double their quotes.
+    regex = regex.replace('""', '"')
+    for dotnet, python in _DOTNET_REGEX:
+        regex = regex.replace(dotnet, python)
+    if r'\p{' in regex:
+        raise ValueError('unsupported regex construct in %r' % regex)
+    return regex
+
+
+def _first_char_test(regex):
+    #
+    # Returns a function telling whether a match of regex can start with
+    # a given char (or None if it may match an empty string, and so has
+    # to be tried everywhere).  It errs on the side of yes for anything
+    # it doesn't understand, so it can only save work, never change the
+    # outcome of a match.
+    #
+    if _sre_parse is None:
+        return None
+    tests, nullable = _first_tests(_sre_parse.parse(regex))
+    if tests is None or nullable:
+        return None
+    if len(tests) == 1:
+        return tests[0]
+    return lambda c: any(test(c) for test in tests)
+
+def _first_tests(items):
+    # (list of char tests, nullable) for a parsed regex, with None for
+    # the list if the first char could be anything.
+    tests = []
+    for op, arg in items:
+        if op is _sre.LITERAL:
+            tests.append(lambda c, ch=chr(arg): c == ch)
+            return tests, False
+        elif op is _sre.IN:
+            tests.append(_in_test(arg))
+            return tests, False
+        elif op in (_sre.AT, _sre.ASSERT, _sre.ASSERT_NOT):
+            # Zero width; ignoring the condition only admits more chars.
+            continue
+        elif op is _sre.SUBPATTERN:
+            sub, nullable = _first_tests(arg[-1])
+        elif op is _sre.BRANCH:
+            sub, nullable = [], False
+            for alternative in arg[1]:
+                more, more_nullable = _first_tests(alternative)
+                if more is None:
+                    return None, False
+                sub += more
+                nullable = nullable or more_nullable
+        elif op in (_sre.MAX_REPEAT, _sre.MIN_REPEAT):
+            sub, nullable = _first_tests(arg[2])
+            nullable = nullable or arg[0] == 0
+        else:
+            return None, False
+        if sub is None:
+            return None, False
+        tests += sub
+        if not nullable:
+            return tests, False
+    return tests, True
+
+def _in_test(items):
+    # Char test for a [...] set.
+    negate = False
+    parts = []
+    for op, arg in items:
+        if op is _sre.NEGATE:
+            negate = True
+        elif op is _sre.LITERAL:
+            parts.append(lambda c, ch=chr(arg): c == ch)
+        elif op is _sre.RANGE:
+            parts.append(lambda c, lo=chr(arg[0]), hi=chr(arg[1]):
+                         lo <= c <= hi)
+        elif op is _sre.CATEGORY and arg in _CATEGORY_TESTS:
+            parts.append(_CATEGORY_TESTS[arg])
+        else:
+            return lambda c: True
+    if negate:
+        return lambda c: not any(part(c) for part in parts)
+    return lambda c: any(part(c) for part in parts)
+
+if _sre_parse is not None:
+    _CATEGORY_TESTS = {
+        _sre.CATEGORY_DIGIT: str.isdecimal,
+        _sre.CATEGORY_NOT_DIGIT: lambda c: not c.isdecimal(),
+        _sre.CATEGORY_SPACE: str.isspace,
+        _sre.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+        _sre.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+        _sre.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == '_'),
+    }
+
+
+class Grammar(object):
+    #
+    # The terminals and rules of a .tpg file.  A rule is a tree of tuples:
+    #
+    #     ('terminal', NAME)      ('nonterminal', name)
+    #     ('concat', [rule...])   ('choice', [rule...])
+    #     ('?', rule)             ('*', rule)             ('+', rule)
+    #
+
+    _rule_token_re = re.compile(r'\s+|//[^\n]*|(->|[|()*+?;]|\w+)')
+
+    def __init__(self, text):
+        self.terminals = kslexgen.read_terminals(text)
+        self.index = dict((name, i) for i, (name, regex)
+                          in enumerate(self.terminals))
+        self.rules = {}
+        self.start = None
+        rules = text[text.index('// Rules'):]
+        self._tokens = [m.group(1) for m in self._rule_token_re.finditer(rules)
+                        if m.group(1) is not None]
+        self._pos = 0
+        while self._pos < len(self._tokens):
+            name = self._next()
+            self._expect('->')
+            self.rules[name] = self._choice()
+            self._expect(';')
+            if self.start is None:
+                self.start = name
+        del self._tokens
+        self.first = {}
+        self._compute_first()
+
+    def _next(self):
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def _peek(self):
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+        return None
+
+    def _expect(self, token):
+        found = self._next()
+        if found != token:
+            raise ValueError('grammar: expected %r, found %r' % (token, found))
+
+    def _choice(self):
+        alternatives = [self._concat()]
+        while self._peek() == '|':
+            self._next()
+            alternatives.append(self._concat())
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return ('choice', alternatives)
+
+    def _concat(self):
+        items = []
+        while self._peek() not in ('|', ')', ';', None):
+            items.append(self._postfix())
+        if len(items) == 1:
+            return items[0]
+        return ('concat', items)
+
+    def _postfix(self):
+        token = self._next()
+        if token == '(':
+            item = self._choice()
+            self._expect(')')
+        elif token in self.index:
+            item = ('terminal', token)
+        else:
+            item = ('nonterminal', token)
+        while self._peek() in ('?', '*', '+'):
+            item = (self._next(), item)
+        return item
+
+    def _compute_first(self):
+        #
+        # FIRST set and nullability of every rule, iterated to a fixed
+        # point since the rules refer to each other.
+        #
+        self.nullable = dict((name, False) for name in self.rules)
+        for name in self.rules:
+            self.first[name] = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, rule in self.rules.items():
+                first, nullable = self.first_of(rule)
+                if not first <= self.first[name] or \
+                        nullable != self.nullable[name]:
+                    self.first[name] |= first
+                    self.nullable[name] = nullable
+                    changed = True
+
+    def first_of(self, rule):
+        # (FIRST set, nullable) of any rule tree, from the current
+        # per-rule sets.
+        kind, arg = rule
+        if kind == 'terminal':
+            return set([arg]), False
+        if kind == 'nonterminal':
+            return set(self.first[arg]), self.nullable[arg]
+        if kind == 'concat':
+            first = set()
+            for item in arg:
+                item_first, nullable = self.first_of(item)
+                first |= item_first
+                if not nullable:
+                    return first, False
+            return first, True
+        if kind == 'choice':
+            first = set()
+            nullable = False
+            for item in arg:
+                item_first, item_nullable = self.first_of(item)
+                first |= item_first
+                nullable = nullable or item_nullable
+            return first, nullable
+        first, nullable = self.first_of(arg)
+        return first, nullable or kind in ('?', '*')
+
+
+class _Expected(object):
+    #
+    # A set of terminals the parser expects at some point, plus the
+    # skipped ones, as the (index, match) pairs the scanner tries, sorted
+    # by index.  For speed, only the terminals that can start with the
+    # char at hand are tried; that list is worked out once per char.
+    #
+    __slots__ = ('terminals', 'by_char')
+
+    def __init__(self, terminals):
+        # terminals: (index, match, first_char_test) triples.
+        self.terminals = terminals
+        self.by_char = {}
+
+    def for_char(self, c):
+        tries = tuple((index, match) for index, match, test
+                      in self.terminals if test is None or test(c))
+        self.by_char[c] = tries
+        return tries
+
+
+class _Scanner(object):
+    #
+    # TinyPG's scanner.  A token is a (type, start, end) tuple, where type
+    # is the terminal's index in the grammar, or -1 if nothing matched.
+    #
+
+    def __init__(self, parser, text):
+        self.text = text
+        lower = text.lower()
+        if len(lower) != len(text):
+            # A few chars (e.g. U+0130) lower-case to two; leave those be
+            # so positions in both strings stay the same.
+            lower = ''.join(c if len(c.lower()) != 1 else c.lower()
+                            for c in text)
+        self.lower = lower
+        self.pos = 0
+        self.lookahead_token = None
+        self.skipped = parser.skipped
+
+    def lookahead(self, expected):
+        token = self.lookahead_token
+        if token is not None:
+            return token
+        lower = self.lower
+        pos = self.pos
+        skipped = self.skipped
+        while True:
+            c = lower[pos:pos + 1]
+            tries = expected.by_char.get(c)
+            if tries is None:
+                tries = expected.for_char(c)
+            best = -1
+            end = -1
+            for index, match in tries:
+                m = match(lower, pos)
+                if m is not None and m.end() > end:
+                    best = index
+                    end = m.end()
+            if best not in skipped:
+                break
+            pos = end
+        if best < 0:
+            # Not kept: the next lookahead may be expecting something
+            # else that does match.
+            return (best, pos, pos)
+        token = self.lookahead_token = (best, pos, end)
+        return token
+
+    def scan(self, expected):
+        token = self.lookahead(expected)
+        self.lookahead_token = None
+        self.pos = token[2]
+        return token
+
+
+class Parser(object):
+    #
+    # Compiles a Grammar into one closure per rule.  A Parser can be used
+    # for any number of texts, one at a time.
+    #
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.names = [name for name, regex in grammar.terminals]
+        self._terminals = []
+        for name, regex in grammar.terminals:
+            regex = _python_regex(regex)
+            self._terminals.append((re.compile(regex).match,
+                                    _first_char_test(regex)))
+        self.skipped = frozenset(grammar.index[name] for name in _SKIPPED)
+        self._candidate_cache = {}
+        self._rules = {}
+        for name, rule in grammar.rules.items():
+            self._rules[name] = self._compile(rule)
+        self._start = self._rules[grammar.start]
+        self._scanner = None
+
+    def _candidates(self, names):
+        # The _Expected for a set of expected terminals, shared between
+        # all decision points expecting the same set.
+        indexes = frozenset(self.grammar.index[name] for name in names) | \
+            self.skipped
+        candidates = self._candidate_cache.get(indexes)
+        if candidates is None:
+            candidates = _Expected(tuple((i,) + self._terminals[i]
+                                         for i in sorted(indexes)))
+            self._candidate_cache[indexes] = candidates
+        return candidates
+
+    def _compile(self, rule):
+        kind, arg = rule
+        grammar = self.grammar
+
+        if kind == 'terminal':
+            candidates = self._candidates([arg])
+            wanted = grammar.index[arg]
+            expected = [arg]
+
+            def terminal():
+                token = self._scanner.scan(candidates)
+                if token[0] != wanted:
+                    self._error(token, expected)
+            return terminal
+
+        if kind == 'nonterminal':
+            rules = self._rules
+
+            def nonterminal():
+                rules[arg]()
+            return nonterminal
+
+        if kind == 'concat':
+            items = tuple(self._compile(item) for item in arg)
+
+            def concat():
+                for item in items:
+                    item()
+            return concat
+
+        first = grammar.first_of(rule)[0]
+        candidates = self._candidates(first)
+        starts = frozenset(grammar.index[name] for name in first)
+
+        if kind == 'choice':
+            # Ordered like TinyPG's error message: by alternative, then
+            # by the order of the terminals in the grammar.
+            expected = []
+            dispatch = {}
+            for item in arg:
+                item_first = grammar.first_of(item)[0]
+                compiled = self._compile(item)
+                for name in sorted(item_first, key=grammar.index.get):
+                    if grammar.index[name] not in dispatch:
+                        dispatch[grammar.index[name]] = compiled
+                        expected.append(name)
+
+            def choice():
+                token = self._scanner.lookahead(candidates)
+                item = dispatch.get(token[0])
+                if item is None:
+                    self._error(token, expected)
+                item()
+            return choice
+
+        item = self._compile(arg)
+        if kind == '?':
+            def optional():
+                if self._scanner.lookahead(candidates)[0] in starts:
+                    item()
+            return optional
+
+        if kind == '*':
+            def zero_or_more():
+                while self._scanner.lookahead(candidates)[0] in starts:
+                    item()
+            return zero_or_more
+
+        def one_or_more():
+            item()
+            while self._scanner.lookahead(candidates)[0] in starts:
+                item()
+        return one_or_more
+
+    def _error(self, token, expected):
+        index, start, end = token
+        text = self._scanner.text
+        if index < 0:
+            found = text[start:start + 1] or 'EOF'
+        else:
+            found = text[start:end]
+        if len(expected) == 1:
+            wanted = expected[0]
+        else:
+            wanted = ', '.join(expected[:-1]) + ', or ' + expected[-1]
+        message = "Unexpected token '%s' found. Expected %s." % (
+            found.replace('\n', ''), wanted)
+        line = bisect.bisect_right(self._newlines, start)
+        column = start - (self._newlines[line - 1] if line else -1)
+        raise KerboscriptSyntaxError(message, line + 1, column)
+
+    def parse(self, text):
+        # Raises KerboscriptSyntaxError at the first syntax error.
+        self._scanner = _Scanner(self, text)
+        self._newlines = [m.start() for m in re.finditer('\n', text)]
+        try:
+            self._start()
+        finally:
+            self._scanner = None
+
+
+_parser = None
+
+def _get_parser():
+    global _parser
+    if _parser is None:
+        with open(kslexgen.GRAMMAR_PATH, encoding='utf-8') as f:
+            _parser = Parser(Grammar(f.read()))
+    return _parser
+
+def parse(text):
+    #
+    # Parses a Kerboscript program, raising KerboscriptSyntaxError at the
+    # first syntax error.  The grammar is read on first use, so this
+    # needs a checkout that includes src/.
+    #
+    _get_parser().parse(text)
+
+def check(text):
+    # Like parse(), but returns the KerboscriptSyntaxError (or None)
+    # instead of raising it.
+    try:
+        parse(text)
+    except KerboscriptSyntaxError as e:
+        return e
+    return None
@@ -0,0 +1,460 @@
+#
+# Opt-in profiling of the docs build, to find out where its time goes:
+# which Sphinx phase, which extension's event handlers, which ks
+# directives, how much reference resolving and code highlighting, and
+# which documents are the slowest.
+#
+# It is off unless turned on, in conf.py:
+#
+#     ks_profile      file name, relative to the output directory, to write
+#                     the JSON report to, e.g. 'ks-profile.json'
+#                     (default: '', off).
+#     ks_profile_top  how many of the slowest documents to list at the
+#                     end of the build (default: 15).
+#
+# or for a single build, without touching conf.py, with the KS_PROFILE
+# environment variable: KS_PROFILE=1 writes ks-profile.json, any other
+# value is taken as the file name.
+#
+# The report has, all times in seconds:
+#
+#     phases      wall time of read, consistency (pickling the
+#                 environment and the consistency check), write, finish
+#                 and build-finished.
+#     extensions  {module: {event: [calls, seconds]}} for every event
+#                 handler, which is how mathjax and the theme show up.
+#     directives  {class: [count, seconds]} for the ks directives, not
+#                 counting directives nested in them.
+#     xrefs       [count, seconds] for ks references resolved, and for
+#                 the whole reference resolving pass of every domain.
+#     highlight   {language: [count, seconds]} for code blocks.
+#     documents   {docname: {read, resolve, write, total, and the part of
+#                 that spent in directives, xrefs and highlight}}.
+#
+# In a parallel (-j N) build the worker processes append what they
+# measured to a spool file next to the report, which is merged in at the
+# end.  The patching needed to measure all this is only done when
+# profiling is on, so a normal build pays nothing for it.
+#
+# benchmarks/profile_build.py compares a profiled build against the
+# checked-in baseline, benchmarks/profile_baseline.json.
+#
+
+import functools
+import json
+import os
+import time
+
+import sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.events import EventListener
+from sphinx.transforms.post_transforms import ReferencesResolver
+from sphinx.util import logging
+
+import ksdomain
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the report changes.
+PROFILE_FORMAT = 1
+
+DOC_FIELDS = ('read', 'resolve', 'write', 'directives', 'xrefs',
+              'highlight')
+
+
+class Profile(object):
+    #
+    # What one process measured.  Counters are [count, seconds] lists;
+    # in a worker process they are written to the spool and reset after
+    # every document, so the main process can add them up.
+    #
+
+    def __init__(self, spool):
+        self.spool = spool
+        self.main_pid = self._pid = os.getpid()
+        self.phases = {}
+        self.reset()
+        self.docname = None
+        # Stack of [seconds spent in nested directives] for the ks
+        # directives being run, so each only counts its own time.
+        self._directive_stack = []
+
+    def reset(self):
+        self.extensions = {}
+        self.directives = {}
+        self.xrefs = {}
+        self.highlight = {}
+        self.documents = {}
+
+    def check_process(self):
+        # A forked worker starts out with a copy of everything its parent
+        # had counted so far; drop that, or flush() would count it again.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self.reset()
+            self._directive_stack = []
+
+    def add(self, table, key, seconds, count=1):
+        counter = table.get(key)
+        if counter is None:
+            counter = table[key] = [0, 0.0]
+        counter[0] += count
+        counter[1] += seconds
+
+    def add_doc(self, field, seconds, docname=None):
+        docname = docname or self.docname
+        if docname is None:
+            return
+        doc = self.documents.get(docname)
+        if doc is None:
+            doc = self.documents[docname] = dict.fromkeys(DOC_FIELDS, 0.0)
+        doc[field] += seconds
+
+    def flush(self):
+        # Worker processes hand their numbers to the main one through the
+        # spool: one short append per document, so processes don't
+        # interleave their lines.
+        if os.getpid() == self.main_pid:
+            return
+        record = {
+            'extensions': self.extensions,
+            'directives': self.directives,
+            'xrefs': self.xrefs,
+            'highlight': self.highlight,
+            'documents': self.documents,
+        }
+        with open(self.spool, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self.reset()
+
+    def merge_spool(self):
+        try:
+            f = open(self.spool, encoding='utf-8')
+        except OSError:
+            return
+        with f:
+            for line in f:
+                record = json.loads(line)
+                for name in ('directives', 'xrefs', 'highlight'):
+                    for key, (count, seconds) in record[name].items():
+                        self.add(getattr(self, name), key, seconds, count)
+                for module, events in record['extensions'].items():
+                    table = self.extensions.setdefault(module, {})
+                    for event, (count, seconds) in events.items():
+                        self.add(table, event, seconds, count)
+                for docname, fields in record['documents'].items():
+                    for field, seconds in fields.items():
+                        self.add_doc(field, seconds, docname)
+        os.remove(self.spool)
+
+    def report(self, app):
+        documents = {}
+        for docname, doc in self.documents.items():
+            doc = dict((field, round(seconds, 6))
+                       for field, seconds in doc.items())
+            doc['total'] = round(doc['read'] + doc['resolve'] + doc['write'],
+                                 6)
+            documents[docname] = doc
+
+        def counters(table):
+            return dict((key, [count, round(seconds, 6)])
+                        for key, (count, seconds) in sorted(table.items()))
+
+        return {
+            'format': PROFILE_FORMAT,
+            'sphinx': sphinx.__version__,
+            'builder': app.builder.name,
+            'parallel': app.parallel,
+            'phases': dict((phase, round(seconds, 6))
+                           for phase, seconds in self.phases.items()),
+            'extensions': dict((module, counters(events)) for module, events
+                               in sorted(self.extensions.items())),
+            'directives': counters(self.directives),
+            'xrefs': counters(self.xrefs),
+            'highlight': counters(self.highlight),
+            'documents': dict(sorted(documents.items())),
+        }
+
+
+# The profile of this build, or None when profiling is off.
+_profile = None
+
+
+def _report_name(app):
+    value = os.environ.get('KS_PROFILE', '')
+    if value == '1':
+        return app.config.ks_profile or 'ks-profile.json'
+    if value and value != '0':
+        return value
+    return app.config.ks_profile
+
+
+def _timed_phase(profile, phase, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profile.phases[phase] = profile.phases.get(phase, 0.0) + \
+                time.perf_counter() - start
+            profile.phase_end = time.perf_counter()
+    return wrapper
+
+
+def _timed_doc(profile, field, method):
+    # For builder.read_doc and builder.write_doc: times the document
+    # and makes it the current one for everything timed inside.
+    @functools.wraps(method)
+    def wrapper(docname, *args, **kwargs):
+        profile.check_process()
+        profile.docname = docname
+        start = time.perf_counter()
+        try:
+            return method(docname, *args, **kwargs)
+        finally:
+            profile.add_doc(field, time.perf_counter() - start, docname)
+            profile.docname = None
+            profile.flush()
+    return wrapper
+
+
+def _timed_listener(profile, module, event, handler):
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            profile.add(profile.extensions.setdefault(module, {}), event,
+                        time.perf_counter() - start)
+    return wrapper
+
+
+class ProfilingHighlighter(object):
+    # Wraps the builder's highlighter (or the highlight cache in front
+    # of it) to time every code block, cache hits included.
+
+    def __init__(self, highlighter, profile):
+        self._highlighter = highlighter
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._highlighter, name)
+
+    def highlight_block(self, source, lang, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._highlighter.highlight_block(source, lang, *args,
+                                                     **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            self._profile.add(self._profile.highlight, lang or 'default',
+                              seconds)
+            self._profile.add_doc('highlight', seconds)
+
+
+def _patch_classes():
+    #
+    # Class-level patches, for what can't be reached through the app:
+    # the ks directives, the ks domain's resolvers, reference resolving,
+    # and the environment's get_and_resolve_doctree (patched on the class
+    # since the environment itself gets pickled).  All of them look up
+    # _profile when called, and do nothing extra while it is None.
+    #
+    if getattr(_patch_classes, 'done', False):
+        return
+    _patch_classes.done = True
+
+    def directive_run(cls, run):
+        @functools.wraps(run)
+        def wrapper(self):
+            profile = _profile
+            if profile is None:
+                return run(self)
+            stack = profile._directive_stack
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return run(self)
+            finally:
+                seconds = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += seconds
+                profile.add(profile.directives, cls.__name__,
+                            seconds - nested)
+                if not stack:
+                    profile.add_doc('directives', seconds)
+        return wrapper
+
+    # Each class gets a wrapper of its own, even where run() is the one
+    # they all inherit from KOSObject, so they are counted apart.
+    for cls in ksdomain.KOSDomain.directives.values():
+        cls.run = directive_run(cls, cls.run)
+
+    def timed_xref(key, method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profile = _profile
+            if profile is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                profile.add(profile.xrefs, key, seconds)
+                # The 'all' pass includes the ks resolvers; only it counts
+                # towards the document's time.
+                if key == 'all':
+                    profile.add_doc('xrefs', seconds)
+        return wrapper
+
+    domain = ksdomain.KOSDomain
+    domain.resolve_xref = timed_xref('ks', domain.resolve_xref)
+    domain.resolve_any_xref = timed_xref('ks-any', domain.resolve_any_xref)
+    ReferencesResolver.run = timed_xref('all', ReferencesResolver.run)
+
+    resolve = BuildEnvironment.get_and_resolve_doctree
+
+    @functools.wraps(resolve)
+    def get_and_resolve_doctree(self, docname, *args, **kwargs):
+        profile = _profile
+        if profile is None:
+            return resolve(self, docname, *args, **kwargs)
+        profile.docname = docname
+        start = time.perf_counter()
+        try:
+            return resolve(self, docname, *args, **kwargs)
+        finally:
+            profile.add_doc('resolve', time.perf_counter() - start, docname)
+            profile.docname = None
+    BuildEnvironment.get_and_resolve_doctree = get_and_resolve_doctree
+
+
+def start_profiling(app):
+    global _profile
+    name = _report_name(app)
+    if not name:
+        _profile = None
+        return
+    path = os.path.join(app.outdir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    spool = path + '.spool'
+    if os.path.exists(spool):
+        os.remove(spool)
+    profile = _profile = Profile(spool)
+    profile.path = path
+    profile.start = profile.phase_end = time.perf_counter()
+
+    builder = app.builder
+    builder.read = _timed_phase(profile, 'read', builder.read)
+    builder.write = _timed_phase(profile, 'write', builder.write)
+    builder.finish = _timed_phase(profile, 'finish', builder.finish)
+    builder.read_doc = _timed_doc(profile, 'read', builder.read_doc)
+    builder.write_doc = _timed_doc(profile, 'write', builder.write_doc)
+    # Whatever happens between the end of reading and the start of
+    # writing: pickling the environment and the consistency check.
+    write = builder.write
+
+    @functools.wraps(write)
+    def write_after_consistency(*args, **kwargs):
+        profile.phases['consistency'] = profile.phases.get(
+            'consistency', 0.0) + time.perf_counter() - profile.phase_end
+        return write(*args, **kwargs)
+    builder.write = write_after_consistency
+
+    listeners = app.events.listeners
+    for event in list(listeners):
+        listeners[event] = [
+            EventListener(listener.id, _timed_listener(
+                profile, getattr(listener.handler, '__module__', None) or '?',
+                event, listener.handler), listener.priority)
+            for listener in listeners[event]]
+    _patch_classes()
+
+
+def wrap_highlighter(app):
+    # Runs after every other builder-inited handler, so a highlight
+    # cache installed by kshighlightcache is timed as well.
+    highlighter = getattr(app.builder, 'highlighter', None)
+    if _profile is not None and highlighter is not None:
+        app.builder.highlighter = ProfilingHighlighter(highlighter, _profile)
+
+
+def write_report(app, exception):
+    global _profile
+    profile = _profile
+    if profile is None:
+        return
+    _profile = None
+    profile.phases['build-finished'] = time.perf_counter() - \
+        profile.phase_end
+    profile.phases['total'] = time.perf_counter() - profile.start
+    profile.merge_spool()
+    report = profile.report(app)
+    if exception is not None:
+        report['exception'] = repr(exception)
+    with open(profile.path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    log_summary(report, app.config.ks_profile_top)
+    logger.info('build profile written to %s', profile.path)
+
+
+def top_documents(report, top):
+    return sorted(report['documents'].items(),
+                  key=lambda item: -item[1]['total'])[:top]
+
+
+def log_summary(report, top):
+    phases = report['phases']
+    logger.info('')
+    logger.info('build profile: %s', ', '.join(
+        '%s %.2f s' % (phase, seconds) for phase, seconds in phases.items()))
+    extensions = sorted(
+        ((module, sum(seconds for count, seconds in events.values()))
+         for module, events in report['extensions'].items()),
+        key=lambda item: -item[1])
+    if extensions:
+        logger.info('  event handlers: %s', ', '.join(
+            '%s %.2f s' % (module, seconds)
+            for module, seconds in extensions[:8]))
+    directives = report['directives']
+    if directives:
+        logger.info('  ks directives: %s', ', '.join(
+            '%s %d in %.2f s' % (name, count, seconds)
+            for name, (count, seconds) in sorted(
+                directives.items(), key=lambda item: -item[1][1])))
+    for key, (count, seconds) in report['xrefs'].items():
+        logger.info('  xrefs (%s): %d in %.2f s', key, count, seconds)
+    for lang, (count, seconds) in report['highlight'].items():
+        logger.info('  highlight (%s): %d blocks in %.2f s', lang, count,
+                    seconds)
+    rows = top_documents(report, top)
+    if not rows:
+        return
+    width = max(len(docname) for docname, doc in rows)
+    logger.info('  %d slowest documents:', len(rows))
+    logger.info('  %s %8s %8s %8s %8s %8s %8s %8s', 'document'.ljust(width),
+                'total', 'read', 'resolve', 'write', 'direct.', 'xrefs',
+                'highl.')
+    for docname, doc in rows:
+        logger.info('  %s %8.3f %8.3f %8.3f %8.3f %8.3f %8.3f %8.3f',
+                    docname.ljust(width), doc['total'], doc['read'],
+                    doc['resolve'], doc['write'], doc['directives'],
+                    doc['xrefs'], doc['highlight'])
+
+
+def setup(app):
+    app.add_config_value('ks_profile', '', '')
+    app.add_config_value('ks_profile_top', 15, '')
+    # First of all builder-inited handlers, so the others get timed too.
+    app.connect('builder-inited', start_profiling, priority=0)
+    app.connect('builder-inited', wrap_highlighter, priority=900)
+    app.connect('build-finished', write_report, priority=999)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
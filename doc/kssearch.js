@@ -0,0 +1,261 @@
+/*
+ * Type-ahead lookup of ks objects for the search box, from the shards
+ * kssearch.py writes to _static/kssearch/.
+ *
+ * Nothing is loaded until the search box gets focus; then the manifest
+ * (index.js), and for each text typed only the shards it can match:
+ * "VESSEL:AL" needs suffixes-v, ":MASS" needs members-m, and "SHIP"
+ * needs structures-s, functions-s, globals-s, keywords-s and members-s.
+ * Shards are plain scripts calling KSSearch.addShard(), so this works
+ * from file:// as well as from a server.
+ */
+
+var KSSearch = (function () {
+    'use strict';
+
+    var FORMAT = 1;
+    var LIMIT = 30;
+    var RANK = {structure: 0, global: 1, 'function': 2, keyword: 3,
+                attribute: 4, method: 4};
+
+    var script = document.currentScript;
+    var root = script ? script.src.replace(/_static\/kssearch\.js(\?.*)?$/, '') : '';
+    var base = root + '_static/kssearch/';
+
+    var manifest = null;        // null: not loaded yet, false: unusable
+    var manifestWaiters = [];
+    var shards = {};            // key -> entries
+    var shardWaiters = {};      // key -> [callback, ...] while loading
+
+    function load(src, onerror) {
+        var tag = document.createElement('script');
+        tag.src = base + src;
+        tag.async = true;
+        tag.onerror = onerror;
+        document.head.appendChild(tag);
+    }
+
+    function withManifest(callback) {
+        if (manifest !== null) {
+            callback();
+            return;
+        }
+        manifestWaiters.push(callback);
+        if (manifestWaiters.length === 1) {
+            load('index.js', function () { setManifest(null); });
+        }
+    }
+
+    function setManifest(data) {
+        manifest = data && data.format === FORMAT ? data : false;
+        var waiters = manifestWaiters;
+        manifestWaiters = [];
+        waiters.forEach(function (callback) { callback(); });
+    }
+
+    function addShard(key, entries) {
+        shards[key] = entries;
+        var waiters = shardWaiters[key] || [];
+        delete shardWaiters[key];
+        waiters.forEach(function (callback) { callback(); });
+    }
+
+    function withShards(keys, callback) {
+        var missing = keys.filter(function (key) { return !(key in shards); });
+        var left = missing.length;
+        if (!left) {
+            callback();
+            return;
+        }
+        var done = function () {
+            if (--left === 0) {
+                callback();
+            }
+        };
+        missing.forEach(function (key) {
+            if (key in shardWaiters) {
+                shardWaiters[key].push(done);
+                return;
+            }
+            shardWaiters[key] = [done];
+            load(manifest.shards[key], function () { addShard(key, []); });
+        });
+    }
+
+    function prefix(name) {
+        var c = name.charAt(0).toLowerCase();
+        return /[a-z0-9]/.test(c) ? c : '_';
+    }
+
+    // What the text typed asks for: which shards, and how to match.
+    function parse(text) {
+        var query = text.trim().toUpperCase();
+        var colon = query.indexOf(':');
+        if (!query) {
+            return null;
+        }
+        if (colon > 0) {
+            return {keys: ['suffixes-' + prefix(query)], name: query};
+        }
+        if (colon === 0) {
+            var suffix = query.slice(1);
+            return suffix ? {keys: ['members-' + prefix(suffix)], suffix: suffix} : null;
+        }
+        var p = prefix(query);
+        return {keys: ['structures-' + p, 'functions-' + p, 'globals-' + p,
+                       'keywords-' + p, 'members-' + p],
+                name: query, suffix: query};
+    }
+
+    function search(text, callback) {
+        var query = parse(text);
+        if (!query) {
+            callback([]);
+            return;
+        }
+        withManifest(function () {
+            if (!manifest) {
+                callback([]);
+                return;
+            }
+            var keys = query.keys.filter(function (key) { return key in manifest.shards; });
+            withShards(keys, function () { callback(match(query, keys)); });
+        });
+    }
+
+    function match(query, keys) {
+        var found = {};
+        var results = [];
+        keys.forEach(function (key) {
+            var members = key.indexOf('members-') === 0;
+            shards[key].forEach(function (entry) {
+                var name = entry[0];
+                var suffix = name.slice(name.indexOf(':') + 1);
+                var exact;
+                if (members) {
+                    if (!query.suffix || suffix.indexOf(query.suffix) !== 0) {
+                        return;
+                    }
+                    exact = suffix === query.suffix;
+                } else {
+                    if (name.indexOf(query.name) !== 0) {
+                        return;
+                    }
+                    exact = name === query.name;
+                }
+                if (found[name]) {
+                    return;
+                }
+                found[name] = true;
+                var type = manifest.types[entry[1]];
+                results.push({
+                    name: name,
+                    type: type,
+                    url: root + manifest.docs[entry[2]] + '#' + type + ':' + (entry[4] || name),
+                    summary: entry[3],
+                    rank: [exact ? 0 : 1, RANK[type], name.length]
+                });
+            });
+        });
+        results.sort(function (a, b) {
+            for (var i = 0; i < a.rank.length; i++) {
+                if (a.rank[i] !== b.rank[i]) {
+                    return a.rank[i] - b.rank[i];
+                }
+            }
+            return a.name < b.name ? -1 : a.name > b.name ? 1 : 0;
+        });
+        return results.slice(0, LIMIT);
+    }
+
+    // The drop-down under a search box.
+    function attach(input) {
+        var list = document.createElement('ul');
+        var active = -1;
+        var asked = 0;
+        list.className = 'ks-search-results';
+        list.hidden = true;
+        input.setAttribute('autocomplete', 'off');
+        input.parentNode.insertBefore(list, input.nextSibling);
+        input.parentNode.classList.add('ks-search');
+
+        function highlight(index) {
+            var items = list.children;
+            if (active >= 0 && active < items.length) {
+                items[active].classList.remove('active');
+            }
+            active = index;
+            if (active >= 0) {
+                items[active].classList.add('active');
+                items[active].scrollIntoView({block: 'nearest'});
+            }
+        }
+
+        function show(results) {
+            list.textContent = '';
+            active = -1;
+            results.forEach(function (result) {
+                var item = document.createElement('li');
+                var link = document.createElement('a');
+                var name = document.createElement('code');
+                var type = document.createElement('span');
+                link.href = result.url;
+                name.textContent = result.name;
+                type.className = 'ks-search-type';
+                type.textContent = result.type;
+                link.appendChild(name);
+                link.appendChild(type);
+                if (result.summary) {
+                    var summary = document.createElement('span');
+                    summary.className = 'ks-search-summary';
+                    summary.textContent = result.summary;
+                    link.appendChild(summary);
+                }
+                item.appendChild(link);
+                list.appendChild(item);
+            });
+            list.hidden = !results.length;
+        }
+
+        input.addEventListener('focus', function () { withManifest(function () {}); });
+        input.addEventListener('input', function () {
+            var asking = ++asked;
+            search(input.value, function (results) {
+                // Only the answer to the latest text counts.
+                if (asking === asked) {
+                    show(results);
+                }
+            });
+        });
+        input.addEventListener('keydown', function (event) {
+            var count = list.hidden ? 0 : list.children.length;
+            if (event.key === 'ArrowDown' && count) {
+                highlight((active + 1) % count);
+            } else if (event.key === 'ArrowUp' && count) {
+                highlight((active + count - 1) % count);
+            } else if (event.key === 'Enter' && active >= 0) {
+                window.location.href = list.children[active].firstChild.href;
+            } else if (event.key === 'Escape') {
+                list.hidden = true;
+                return;
+            } else {
+                return;
+            }
+            event.preventDefault();
+        });
+        input.addEventListener('blur', function () { list.hidden = true; });
+        // Keep the focus in the box while a result is clicked.
+        list.addEventListener('mousedown', function (event) { event.preventDefault(); });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var inputs = document.querySelectorAll('form input[name="q"]');
+        Array.prototype.forEach.call(inputs, attach);
+    });
+
+    return {
+        setManifest: setManifest,
+        addShard: addShard,
+        search: search
+    };
+})();
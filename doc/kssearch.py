@@ -0,0 +1,194 @@
+#
+# A search index for the ks objects (structures, their suffixes,
+# functions, bound variables and keywords) that the browser loads a
+# small piece at a time, so looking up VESSEL: doesn't mean downloading
+# the whole of searchindex.js first.
+#
+# At the end of an html build the objects of the ks domain are written
+# to _static/kssearch/ as shards, one per kind of object and first
+# character of its name:
+#
+#     structures-v  VECTOR, VESSEL, VOLUME, ...
+#     suffixes-v    the suffixes of the structures starting with V,
+#                   inherited ones included (VESSEL:MASS, from
+#                   Orbitable).
+#     members-m     the same suffixes again, by the first character of
+#                   the suffix (VESSEL:MASS, PART:MASS, ...), for
+#                   searches that don't name the structure.
+#     functions-v, globals-s, keywords-l
+#
+# plus index.js, a manifest with the names of the shards, the page of
+# each document and the object types.  Shards are named after a hash of
+# their content, so a server may let browsers cache them for good, and
+# are .js files that hand their data to KSSearch.addShard(), which also
+# works for a copy of the manual opened straight from disk, where
+# fetch() of a local file is not allowed.
+#
+# kssearch.js, added to every page, turns the theme's search box into a
+# type-ahead list of matching objects.  It loads the manifest the first
+# time the box gets focus, and then only the shards the text typed
+# needs.  Pressing Enter without picking an object still does the full
+# text search.
+#
+# Settings in conf.py:
+#
+#     ks_search_index  write the shards and add the type-ahead to the
+#                      search box (default: True).
+#
+# benchmarks/search_index.py compares what a lookup has to download
+# with this index and with searchindex.js.
+#
+
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = 'kssearch'
+ASSETS = ('kssearch.js', 'kssearch.css')
+# Bump when the layout of the shards changes; kssearch.js checks it.
+INDEX_FORMAT = 1
+SUMMARY_LENGTH = 120
+
+# Shard kind of each object type.
+KINDS = {
+    'structure': 'structures',
+    'attribute': 'suffixes',
+    'method': 'suffixes',
+    'function': 'functions',
+    'global': 'globals',
+    'keyword': 'keywords',
+}
+
+_unsafe_re = re.compile(r'[^a-z0-9]')
+
+
+def shard_prefix(name):
+    # The shard a name goes in: its first character, folded to [a-z0-9_].
+    return _unsafe_re.sub('_', name[:1].lower()) or '_'
+
+
+def _summary(info):
+    summary = info.get('summary', '')
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH - 1].rstrip() + '…'
+    return summary
+
+
+def collect_shards(domain, doc_index, type_index):
+    #
+    # {shard: [entry, ...]} for all objects of domain.  An entry is
+    # [name, type, doc, summary], with type and doc indexes into the
+    # manifest's lists, and a fifth item, the name the object is
+    # documented under, for a suffix listed under a structure that
+    # inherits it.
+    #
+    shards = {}
+    for objtype, name, docname, info in domain.iter_objects():
+        entry = [name, type_index[objtype], doc_index[docname],
+                 _summary(info)]
+        kind = KINDS[objtype]
+        shards.setdefault('%s-%s' % (kind, shard_prefix(name)), []) \
+            .append(entry)
+        if kind == 'suffixes':
+            suffix = name.split(':', 1)[-1]
+            shards.setdefault('members-%s' % shard_prefix(suffix), []) \
+                .append(entry)
+    structures = [name for objtype, name, docname, info
+                  in domain.iter_objects() if objtype == 'structure']
+    for struct in structures:
+        for ancestor, suffixes in domain.inherited_suffixes(struct):
+            for objtype, suffix in suffixes:
+                real = '%s:%s' % (ancestor.upper(), suffix)
+                docname, info = domain.find_object(objtype, real)
+                if docname is None:
+                    continue
+                entry = [struct + ':' + suffix, type_index[objtype],
+                         doc_index[docname], _summary(info), real]
+                shards.setdefault('suffixes-%s' % shard_prefix(struct), []) \
+                    .append(entry)
+    for entries in shards.values():
+        entries.sort()
+    return shards
+
+
+def _script(call, *args):
+    return '%s(%s);\n' % (call, ','.join(
+        json.dumps(arg, separators=(',', ':'), ensure_ascii=False)
+        for arg in args))
+
+
+def write_index(app, exception):
+    if exception is not None or not app.config.ks_search_index or \
+            app.builder.format != 'html':
+        return
+    domain = app.env.get_domain('ks')
+    outdir = os.path.join(app.outdir, '_static', INDEX_DIR)
+    os.makedirs(outdir, exist_ok=True)
+
+    docnames = sorted(set(docname for objtype, name, docname, info
+                          in domain.iter_objects()))
+    doc_index = dict((docname, i) for i, docname in enumerate(docnames))
+    types = sorted(KINDS)
+    type_index = dict((objtype, i) for i, objtype in enumerate(types))
+    shards = collect_shards(domain, doc_index, type_index)
+
+    files = {}
+    for key, entries in sorted(shards.items()):
+        content = _script('KSSearch.addShard', key, entries)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+        filename = '%s.%s.js' % (key, digest)
+        files[key] = filename
+        path = os.path.join(outdir, filename)
+        # Content-addressed: an existing file is already right.
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+    manifest = {
+        'format': INDEX_FORMAT,
+        'types': types,
+        'docs': [app.builder.get_target_uri(docname) for docname in docnames],
+        'shards': files,
+    }
+    with open(os.path.join(outdir, 'index.js'), 'w', encoding='utf-8') as f:
+        f.write(_script('KSSearch.setManifest', manifest))
+    # Shards of earlier builds that nothing refers to any more.
+    keep = set(files.values()) | {'index.js'}
+    for filename in os.listdir(outdir):
+        if filename not in keep:
+            os.remove(os.path.join(outdir, filename))
+
+    logger.info('ks search index: %d objects in %d shards',
+                domain.object_count(), len(files))
+
+
+def add_assets(app):
+    if not app.config.ks_search_index or app.builder.format != 'html':
+        return
+    # Copied now rather than with the other static files at the end, so
+    # the pages written get the ?v= checksums that keep browsers from
+    # using a stale copy.
+    here = os.path.dirname(os.path.abspath(__file__))
+    static = os.path.join(app.outdir, '_static')
+    os.makedirs(static, exist_ok=True)
+    for asset in ASSETS:
+        shutil.copyfile(os.path.join(here, asset),
+                        os.path.join(static, asset))
+    app.add_js_file('kssearch.js')
+    app.add_css_file('kssearch.css')
+
+
+def setup(app):
+    app.add_config_value('ks_search_index', True, '')
+    app.connect('builder-inited', add_assets)
+    app.connect('build-finished', write_index)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
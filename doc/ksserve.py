@@ -0,0 +1,317 @@
+#
+# Serves the html manual locally and rebuilds it as its sources are
+# edited, reloading the pages open in a browser once they are rewritten:
+#
+#     python ksserve.py [--port 8000] [--host 127.0.0.1] [-j N]
+#                       [--outdir gh-pages] [--doctrees build/doctrees]
+#
+# (or `make serve`).  Sphinx is kept loaded in this one process, so a
+# rebuild doesn't pay for starting it and unpickling the environment
+# again; the first build is an ordinary incremental one into the same
+# directories as `make html`, so after a `make html` it has nothing to do.
+#
+# source/ is polled for changes.  A rebuild re-reads only the documents
+# that changed, and writes them plus the pages whose ks references point
+# into them (see KOSDomain.changed_references) or that show a suffix
+# table or inherited suffixes that changed.  Changes to conf.py or to
+# any of the extensions in this directory restart the process: after
+# ksdomain.py a fresh environment is read, as its data may have changed
+# shape, and after the others all pages are rewritten (e.g. to highlight
+# them again after KerboscriptLexer.py changed).
+#
+# Each html page served gets a small script that listens on an event
+# stream for the list of pages rewritten by every rebuild, and reloads
+# the page if it is one of them.  Needs nothing beyond Sphinx.
+#
+
+import argparse
+import functools
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+from sphinx.application import Sphinx
+
+DOC_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(DOC_DIR, 'source')
+EVENTS = '/_ksserve/events'
+# Seconds between looks at the sources.
+POLL = 0.1
+
+# Added to every html page served, before </body>.  "*" in the list of
+# pages stands for all of them, for changes to static files.
+RELOAD_SCRIPT = b'''<script>
+(function () {
+  var events = new EventSource('%s'), lost = false;
+  events.addEventListener('reload', function (event) {
+    var path = location.pathname.replace(/\\/$/, '/index.html');
+    var pages = JSON.parse(event.data);
+    for (var i = 0; i < pages.length; i++) {
+      if (pages[i] === '*' ||
+          path.slice(-pages[i].length - 1) === '/' + pages[i]) {
+        location.reload();
+        return;
+      }
+    }
+  });
+  // Back after a restart, which rebuilt who knows what.
+  events.onerror = function () { lost = true; };
+  events.onopen = function () { if (lost) location.reload(); };
+})();
+</script>
+''' % EVENTS.encode('ascii')
+
+
+class Reloads(object):
+    # The pages the latest rebuild wrote, for the event streams to pass on.
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.pages = []
+
+    def publish(self, pages):
+        with self.condition:
+            self.generation += 1
+            self.pages = pages
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        # (generation, pages) once there is a newer rebuild than
+        # generation, or the same generation after timeout seconds.
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.generation != generation, timeout)
+            return self.generation, self.pages
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    reloads = None
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].split('#', 1)[0]
+        if path == EVENTS:
+            self.send_events()
+        elif path.endswith('/') or path.endswith('.html'):
+            self.send_page()
+        else:
+            super(Handler, self).do_GET()
+
+    def end_headers(self):
+        # Pages are rewritten under the browser all the time.
+        self.send_header('Cache-Control', 'no-cache')
+        super(Handler, self).end_headers()
+
+    def send_page(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        end = body.rfind(b'</body>')
+        if end != -1:
+            body = body[:end] + RELOAD_SCRIPT + body[end:]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        generation = self.reloads.generation
+        try:
+            self.wfile.write(b'retry: 1000\n\n')
+            self.wfile.flush()
+            while True:
+                latest, pages = self.reloads.wait(generation, 15)
+                if latest == generation:
+                    # Finds out about browsers that went away.
+                    self.wfile.write(b': ping\n\n')
+                else:
+                    generation = latest
+                    self.wfile.write(b'event: reload\ndata: %s\n\n'
+                                     % json.dumps(pages).encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def snapshot(paths):
+    # {path: (mtime, size)} of the files in or under paths, leaving out
+    # hidden files and editors' backup and swap files.
+    found = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+                files.extend(os.path.join(dirpath, filename)
+                             for filename in filenames
+                             if not filename.startswith(('.', '#'))
+                             and not filename.endswith(('~', '.swp')))
+        else:
+            files = [path]
+        for filename in files:
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            found[filename] = (st.st_mtime_ns, st.st_size)
+    return found
+
+
+def extension_files():
+    # The modules loaded from this directory: ksdomain.py,
+    # KerboscriptLexer.py and what they import, and ksserve.py itself.
+    # Not kslexer_names.py, which the builds rewrite themselves.
+    files = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and path.endswith('.py') and \
+                os.path.dirname(os.path.abspath(path)) == DOC_DIR:
+            files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def restart(fresh):
+    argv = [arg for arg in sys.argv[1:] if arg not in ('--fresh', '--all')]
+    argv.append('--fresh' if fresh else '--all')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(sys.executable, [sys.executable, os.path.abspath(__file__)]
+             + argv)
+
+
+def note_written(app, written):
+    #
+    # Adds the uri of every page app writes to written.  With -j N only
+    # the first document is written in this process, the others in
+    # forked ones, so documents are taken from write_doc_serialized(),
+    # which the builder calls here for each of them; html-page-context
+    # is only for the pages that aren't documents (genindex, search),
+    # which are written here.
+    #
+    builder = app.builder
+    serialized = builder.write_doc_serialized
+
+    def write_doc_serialized(docname, doctree):
+        written.add(builder.get_target_uri(docname))
+        serialized(docname, doctree)
+
+    builder.write_doc_serialized = write_doc_serialized
+    app.connect('html-page-context',
+                lambda app, pagename, templatename, context, doctree:
+                written.add(builder.get_target_uri(pagename)))
+
+
+def build(app, written, **kwargs):
+    # Runs a build; returns the pages it wrote, or None if it failed.
+    written.clear()
+    try:
+        app.build(**kwargs)
+    except Exception as err:
+        print(f"ksserve: build failed: {err}", file=sys.stderr)
+        return None
+    return sorted(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the html manual, rebuilding and reloading it "
+        "as the sources change.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('-o', '--outdir',
+                        default=os.path.join(DOC_DIR, 'gh-pages'))
+    parser.add_argument('-d', '--doctrees',
+                        default=os.path.join(DOC_DIR, 'build', 'doctrees'))
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="processes for builds of many pages")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="show Sphinx's progress output")
+    parser.add_argument('--fresh', action='store_true',
+                        help="read all documents again first")
+    parser.add_argument('--all', action='store_true',
+                        help="write all pages again first")
+    args = parser.parse_args()
+
+    app = Sphinx(SOURCE_DIR, SOURCE_DIR, args.outdir, args.doctrees, 'html',
+                 status=sys.stdout if args.verbose else None,
+                 warning=sys.stderr, freshenv=args.fresh,
+                 parallel=args.jobs)
+    written = set()
+    note_written(app, written)
+    source_suffixes = tuple(app.config.source_suffix)
+    modules = extension_files()
+    watched = [SOURCE_DIR] + modules
+
+    start = time.perf_counter()
+    print("ksserve: building...")
+    pages = build(app, written, force_all=args.all or args.fresh)
+    if pages is not None:
+        print(f"ksserve: {len(pages)} pages written in "
+              f"{time.perf_counter() - start:.1f} s")
+
+    Handler.reloads = Reloads()
+    handler = functools.partial(Handler, directory=args.outdir)
+    server = http.server.ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"ksserve: serving {args.outdir} at "
+          f"http://{args.host}:{args.port}/, Ctrl-C to stop")
+
+    before = snapshot(watched)
+    try:
+        while True:
+            time.sleep(POLL)
+            after = snapshot(watched)
+            if after == before:
+                continue
+            # Let a save of several files at once finish.
+            while True:
+                time.sleep(POLL)
+                latest = snapshot(watched)
+                if latest == after:
+                    break
+                after = latest
+            changed = sorted(path for path in set(before) | set(after)
+                             if before.get(path) != after.get(path))
+            before = after
+            start = time.perf_counter()
+            names = [os.path.relpath(path, DOC_DIR) for path in changed]
+            if any(path in modules or path == os.path.join(SOURCE_DIR,
+                                                           'conf.py')
+                   for path in changed):
+                print(f"ksserve: {', '.join(names)} changed, restarting")
+                server.server_close()
+                restart(fresh=os.path.join(DOC_DIR, 'ksdomain.py')
+                        in changed)
+            pages = build(app, written)
+            if pages is None:
+                continue
+            if any(not path.endswith(source_suffixes) for path in changed):
+                # Images, static files: show them on every page.
+                pages.append('*')
+            Handler.reloads.publish(pages)
+            print(f"ksserve: {', '.join(names)}: "
+                  f"{len([p for p in pages if p != '*'])} pages written "
+                  f"in {time.perf_counter() - start:.2f} s")
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
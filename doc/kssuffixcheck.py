@@ -0,0 +1,546 @@
+#
+# Cross-checks the suffixes kOS registers in its C# sources against the
+# ones the manual documents, so the two don't drift apart unnoticed.
+#
+# The .cs files under src/ are scanned for
+#
+#     [KOSNomenclature("Vessel")]
+#     public partial class VesselTarget : Orbitable, ...
+#     ...
+#         AddSuffix("MASS", ...);
+#         AddSuffix(new[] { "OBT", "ORBIT" }, ...);
+#
+# giving, per C# class, its kerboscript names, its base classes and the
+# suffixes it registers (with their aliases), merged over the files of a
+# partial class.  These are compared with the ks:attribute and ks:method
+# entries of the ks domain (and ks:global ones like CONSTANT:PI):
+#
+#     undocumented  registered by a structure but documented neither for
+#                   it nor for any structure it derives from, in C# or
+#                   through :inherits:.
+#     obsolete      documented for a structure that registers no such
+#                   suffix, itself or through its base classes.
+#
+# Structures that register suffixes under names only known at run time
+# (AddSuffix(id, ...) in a loop) are left out of the obsolete check.
+# Test projects (directories ending in .Test) are skipped.
+#
+# Scanning is done per file, in a pool of worker processes, and the
+# results are cached in the doctrees directory by a hash of each file's
+# content, so a build where no .cs file changed only reads and hashes
+# them.  At the end of every build the counts are logged, and the full
+# report is written to ks_suffix_report in the output directory.
+#
+# Settings in conf.py:
+#
+#     ks_suffix_check     run the check (default: True).
+#     ks_suffix_source    the C# sources, relative to conf.py
+#                         (default: '../../src').
+#     ks_suffix_report    report file, relative to the output directory
+#                         (default: 'ks-suffixes.json'; '' for none).
+#     ks_suffix_warnings  also warn about every obsolete suffix, at the
+#                         line documenting it (default: False).
+#     ks_suffix_workers   worker processes (default: 0, one per CPU).
+#
+# Run as a script, it prints the report for the environment of an
+# earlier build without building anything:
+#
+#     python kssuffixcheck.py [--src ../src] [--doctrees build/doctrees]
+#                             [--json] [--no-cache]
+#
+
+import argparse
+import bisect
+import concurrent.futures
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import time
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'ks_suffixes.json'
+# Bump when what scan_source() returns changes, to drop cached results.
+SCAN_FORMAT = 1
+# Bump when the layout of the ks_suffix_report file changes.
+REPORT_FORMAT = 1
+
+_token_re = re.compile(r'''
+    (?P<comment> //[^\n]* | /\*.*?\*/ )
+  | @"(?:[^"]|"")*"
+  | "(?:\\.|[^"\\\n])*"
+  | '(?:\\.|[^'\\\n])*'
+''', re.S | re.X)
+_class_re = re.compile(r'\bclass\s+(\w+)\s*(?:<[^>{;]*>)?\s*(?::([^{;]*))?\{')
+_nomenclature_re = re.compile(r'\bKOSNomenclature\s*\(\s*"([^"]*)"')
+_add_re = re.compile(r'\bAdd(?:Global)?Suffix\s*(?:<\s*\w+\s*>)?\s*\(\s*')
+_namespace_re = re.compile(r'\bnamespace\s+([\w.]+)\s*([{;])')
+_using_re = re.compile(r'^\s*using\s+([\w.]+)\s*;', re.M)
+_definition_re = re.compile(r'\bvoid\s+Add(?:Global)?Suffix\b[^{;]*\{')
+_string_re = re.compile(r'"((?:\\.|[^"\\\n])*)"')
+_array_re = re.compile(r'new\s*(?:string\s*)?\[\s*\]\s*\{([^}]*)\}')
+_generic_re = re.compile(r'<[^<>]*>')
+
+
+def _strip_comments(text):
+    # text with its comments blanked out, keeping lines and offsets.
+    def blank(match):
+        if match.group('comment') is None:
+            return match.group(0)
+        return re.sub(r'[^\n]', ' ', match.group(0))
+    return _token_re.sub(blank, text)
+
+
+def _block_end(text, start):
+    # Offset just past the } that closes the { before start.
+    depth = 1
+    for match in re.finditer(r'[{}]', text[start:]):
+        depth += 1 if match.group(0) == '{' else -1
+        if depth == 0:
+            return start + match.end()
+    return len(text)
+
+
+def _bases(text):
+    # ['Orbitable', 'IKOSTargetable'] from ' Orbitable, IKOSTargetable '.
+    if not text:
+        return []
+    text = re.split(r'\bwhere\b', text)[0]
+    while _generic_re.search(text):
+        text = _generic_re.sub('', text)
+    return [base.strip() for base in text.split(',') if base.strip()]
+
+
+def scan_source(text):
+    #
+    # {class: {'names': [...], 'bases': [...], 'usings': [...],
+    # 'suffixes': [[[NAME, ALIAS, ...], line], ...], 'dynamic': [line,
+    # ...]}} for the C# source text.  Classes are named with their
+    # namespace (and outer classes), as kOS has a class Addon in several
+    # of them.  An AddSuffix call belongs to the innermost class whose
+    # body it is in.
+    #
+    text = _strip_comments(text)
+    newlines = [i for i, char in enumerate(text) if char == '\n']
+    line = lambda offset: bisect.bisect(newlines, offset) + 1
+    usings = _using_re.findall(text)
+    classes = {}
+
+    # (start, end, name) of namespace and class bodies, in order of
+    # their start, so the last one around an offset is the innermost.
+    scopes = []
+    for match in _namespace_re.finditer(text):
+        end = len(text) if match.group(2) == ';' \
+            else _block_end(text, match.end())
+        scopes.append((match.end(), end, match.group(1)))
+    declared = []
+    for match in _class_re.finditer(text):
+        declared.append(match)
+        scopes.append((match.end(), _block_end(text, match.end()),
+                       match.group(1)))
+    scopes.sort()
+
+    def qualified(offset, name=None):
+        around = [scope for start, end, scope in scopes
+                  if start <= offset < end]
+        return '.'.join(around + ([name] if name else []))
+
+    names = [(m.start(), m.group(1)) for m in _nomenclature_re.finditer(text)]
+    bodies = []  # (start, end, class), in order of their start
+    for match in declared:
+        name = qualified(match.start(), match.group(1))
+        entry = classes.setdefault(name, {'names': [], 'bases': [],
+                                          'usings': usings,
+                                          'suffixes': [], 'dynamic': []})
+        for base in _bases(match.group(2)):
+            if base not in entry['bases']:
+                entry['bases'].append(base)
+        # The [KOSNomenclature] attributes since the previous class.
+        while names and names[0][0] < match.start():
+            kos_name = names.pop(0)[1]
+            if kos_name not in entry['names']:
+                entry['names'].append(kos_name)
+        bodies.append((match.end(), _block_end(text, match.end()), name))
+    # Calls inside Structure's own AddSuffix() overloads are not
+    # registrations.
+    skip = [(m.start(), _block_end(text, m.end()))
+            for m in _definition_re.finditer(text)]
+    for match in _add_re.finditer(text):
+        if any(start <= match.start() < end for start, end in skip):
+            continue
+        around = [name for start, end, name in bodies
+                  if start <= match.start() < end]
+        if not around:
+            continue
+        entry = classes[around[-1]]
+        rest = text[match.end():match.end() + 2000]
+        found = None
+        string = _string_re.match(rest)
+        array = _array_re.match(rest)
+        if string is not None:
+            found = [string.group(1)]
+        elif array is not None:
+            items = [item.strip() for item in array.group(1).split(',')
+                     if item.strip()]
+            if all(_string_re.fullmatch(item) for item in items):
+                found = [item[1:-1] for item in items]
+        if found:
+            entry['suffixes'].append(
+                [[name.upper() for name in found], line(match.start())])
+        else:
+            entry['dynamic'].append(line(match.start()))
+    return classes
+
+
+def scan_file(path):
+    # (path, scan_source() of it, or None if it can't be read).
+    try:
+        with open(path, encoding='utf-8-sig', errors='replace') as f:
+            return path, scan_source(f.read())
+    except OSError:
+        return path, None
+
+
+def _cs_files(srcdir):
+    found = []
+    for dirpath, dirnames, filenames in os.walk(srcdir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.')
+                             and not d.endswith('.Test'))
+        found.extend(os.path.join(dirpath, filename)
+                     for filename in sorted(filenames)
+                     if filename.endswith('.cs'))
+    return found
+
+
+def scan_sources(srcdir, cache_path, workers):
+    #
+    # ({path relative to srcdir: scan_source() result}, files scanned
+    # now).  Files whose hash is in the cache at cache_path (if any) are
+    # not scanned again.
+    #
+    cache = {}
+    if cache_path:
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == SCAN_FORMAT:
+                cache = data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+    results = {}
+    digests = {}
+    jobs = []
+    for path in _cs_files(srcdir):
+        rel = os.path.relpath(path, srcdir).replace(os.sep, '/')
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            continue
+        digests[rel] = digest
+        if rel in cache and cache[rel][0] == digest:
+            results[rel] = cache[rel][1]
+        else:
+            jobs.append(path)
+
+    if jobs:
+        if workers <= 1 or len(jobs) < 8:
+            scanned = map(scan_file, jobs)
+            executor = None
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(workers)
+            scanned = executor.map(scan_file, jobs, chunksize=16)
+        try:
+            for path, classes in scanned:
+                if classes is not None:
+                    rel = os.path.relpath(path, srcdir).replace(os.sep, '/')
+                    results[rel] = classes
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    if cache_path and (jobs or set(cache) != set(results)):
+        files = dict((rel, [digests[rel], classes])
+                     for rel, classes in results.items())
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': SCAN_FORMAT, 'files': files}, f,
+                      sort_keys=True, separators=(',', ':'))
+    return results, len(jobs)
+
+
+def _resolve(classes, name, base):
+    #
+    # The class base, as written in the declaration of class name, stands
+    # for: looked up like C# does, in name's namespace and the ones
+    # around it, then in those of its file's using directives.  None if
+    # it isn't one of the classes found (an interface, or a class of
+    # Unity or KSP).
+    #
+    parts = name.split('.')[:-1]
+    candidates = ['.'.join(parts[:i] + [base])
+                  for i in range(len(parts), -1, -1)]
+    candidates += [using + '.' + base for using in classes[name]['usings']]
+    for candidate in candidates:
+        if candidate in classes and candidate != name:
+            return candidate
+    return None
+
+
+def merge_classes(results):
+    #
+    # The per-file results, merged by class, as partial classes spread
+    # their entries over several files, with the bases resolved to the
+    # classes they name.
+    #
+    classes = {}
+    for rel in sorted(results):
+        for name, entry in results[rel].items():
+            merged = classes.setdefault(name, {'names': [], 'bases': [],
+                                               'usings': [],
+                                               'suffixes': [],
+                                               'dynamic': []})
+            for key in ('names', 'bases', 'usings'):
+                for value in entry[key]:
+                    if value not in merged[key]:
+                        merged[key].append(value)
+            merged['suffixes'].extend((aliases, rel, line)
+                                      for aliases, line in entry['suffixes'])
+            merged['dynamic'].extend((rel, line)
+                                     for line in entry['dynamic'])
+    for name, entry in classes.items():
+        bases = [_resolve(classes, name, base) for base in entry['bases']]
+        entry['bases'] = [base for base in bases if base is not None]
+    return classes
+
+
+def _ancestors(classes, name):
+    # The C# base classes of name that were found, nearest first.
+    found = []
+    queue = list(classes[name]['bases'])
+    while queue:
+        base = queue.pop(0)
+        if base not in found and base != name:
+            found.append(base)
+            queue.extend(classes[base]['bases'])
+    return found
+
+
+def documented_suffixes(domain):
+    #
+    # (STRUCT -> {SUFFIX: (docname, line)} of what is documented for
+    # it, STRUCT -> set of SUFFIX it inherits through :inherits:, set
+    # of documented STRUCTs).
+    #
+    own = {}
+    structures = set()
+    for objtype, name, docname, entry in domain.iter_objects():
+        if objtype == 'structure':
+            structures.add(name)
+        elif ':' in name:
+            struct, suffix = name.rsplit(':', 1)
+            own.setdefault(struct, {})[suffix] = (docname, entry.line)
+    inherited = {}
+    for struct in structures:
+        for ancestor, suffixes in domain.inherited_suffixes(struct):
+            inherited.setdefault(struct, set()).update(
+                suffix for objtype, suffix in suffixes)
+    return own, inherited, structures
+
+
+def check(classes, domain):
+    #
+    # (report, totals): a dict per kerboscript structure named in the C#
+    # sources, and the counts for summarize().
+    #
+    own, inherited, structures = documented_suffixes(domain)
+
+    def documented(kos_names):
+        found = set()
+        for kos_name in kos_names:
+            found.update(own.get(kos_name, {}))
+            found.update(inherited.get(kos_name, ()))
+        return found
+
+    report = {}
+    for name in sorted(classes):
+        entry = classes[name]
+        if not entry['names']:
+            continue
+        ancestors = _ancestors(classes, name)
+        # Suffixes of base classes with no kerboscript name of their
+        # own are checked as this class's.
+        checked = [name]
+        for ancestor in ancestors:
+            if classes[ancestor]['names']:
+                break
+            checked.append(ancestor)
+        chain = [name] + ancestors
+        kos_names = [kos_name.upper() for cls in chain
+                     for kos_name in classes[cls]['names']]
+        known = documented(kos_names)
+        registered = set()
+        dynamic = []
+        for cls in chain:
+            for aliases, rel, line in classes[cls]['suffixes']:
+                registered.update(aliases)
+            dynamic.extend('%s:%d' % place for place in classes[cls]['dynamic'])
+        for kos_name in entry['names']:
+            struct = kos_name.upper()
+            result = report.setdefault(struct, {
+                'classes': [], 'registered': 0, 'undocumented': [],
+                'obsolete': [], 'dynamic': [],
+                'documented': struct in structures})
+            result['classes'].append(name)
+            for cls in checked:
+                for aliases, rel, line in classes[cls]['suffixes']:
+                    result['registered'] += 1
+                    if not known.intersection(aliases):
+                        result['undocumented'].append(
+                            [aliases[0], aliases[1:], '%s:%d' % (rel, line)])
+            result['dynamic'].extend(dynamic)
+            result['_registered'] = result.get('_registered', set()) \
+                | registered
+    for struct, result in report.items():
+        registered = result.pop('_registered')
+        if result['dynamic']:
+            continue
+        for suffix, (docname, line) in sorted(own.get(struct, {}).items()):
+            if suffix not in registered:
+                result['obsolete'].append([suffix, docname, line])
+    totals = {
+        'structures': len(report),
+        'registered': sum(len(entry['suffixes'])
+                          for entry in classes.values()),
+        'undocumented': sum(len(r['undocumented']) for r in report.values()),
+        'obsolete': sum(len(r['obsolete']) for r in report.values()),
+        'undocumented_structures': sorted(
+            struct for struct, r in report.items() if not r['documented']),
+        # Documented structures the sources don't name: mostly ones the
+        # manual knows by another name than kerboscript does.
+        'unknown_structures': sorted(structures - set(report)),
+    }
+    return report, totals
+
+
+def run_check(app, exception):
+    if exception is not None or not app.config.ks_suffix_check:
+        return
+    srcdir = os.path.normpath(os.path.join(app.confdir,
+                                           app.config.ks_suffix_source))
+    if not os.path.isdir(srcdir):
+        logger.verbose('ks suffixes: no C# sources at %s', srcdir)
+        return
+    start = time.perf_counter()
+    workers = app.config.ks_suffix_workers or os.cpu_count() or 1
+    results, scanned = scan_sources(
+        srcdir, os.path.join(app.doctreedir, CACHE_FILE), workers)
+    domain = app.env.get_domain('ks')
+    report, totals = check(merge_classes(results), domain)
+
+    if app.config.ks_suffix_warnings:
+        from ksdomain import report_diagnostic
+        for struct, result in sorted(report.items()):
+            for suffix, docname, line in result['obsolete']:
+                report_diagnostic(app.env, 'obsolete',
+                                  '%s:%s is documented, but kOS registers '
+                                  'no such suffix' % (struct, suffix),
+                                  docname, line, structure=struct,
+                                  suffix=suffix)
+    if app.config.ks_suffix_report:
+        path = os.path.join(app.outdir, app.config.ks_suffix_report)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'format': REPORT_FORMAT, 'totals': totals,
+                       'structures': report}, f, indent=1, sort_keys=True)
+    logger.info('ks suffixes: %d registered on %d structures, '
+                '%d undocumented, %d documented but not registered; '
+                '%d of %d files scanned in %.2f s',
+                totals['registered'], totals['structures'],
+                totals['undocumented'], totals['obsolete'], scanned,
+                len(results), time.perf_counter() - start)
+
+
+def print_report(report, totals):
+    for struct, result in sorted(report.items()):
+        if not (result['undocumented'] or result['obsolete']):
+            continue
+        print(f"{struct} ({', '.join(result['classes'])})"
+              + ("" if result['documented'] else ", not documented"))
+        for suffix, aliases, where in result['undocumented']:
+            alias = f" (also {', '.join(aliases)})" if aliases else ""
+            print(f"  undocumented  {suffix}{alias}  {where}")
+        for suffix, docname, line in result['obsolete']:
+            print(f"  obsolete      {suffix}  {docname}:{line}")
+    if totals['unknown_structures']:
+        print(f"documented, but not named in the C# sources: "
+              f"{', '.join(totals['unknown_structures'])}")
+    print(f"{totals['registered']} suffixes registered on "
+          f"{totals['structures']} structures: {totals['undocumented']} "
+          f"undocumented, {totals['obsolete']} documented but not "
+          f"registered")
+
+
+def main():
+    doc_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(
+        description="Compare the suffixes registered in kOS's C# sources "
+        "with the ones the manual documents.")
+    parser.add_argument('--src', default=os.path.join(doc_dir, '..', 'src'))
+    parser.add_argument('--doctrees',
+                        default=os.path.join(doc_dir, 'build', 'doctrees'),
+                        help="doctrees directory of a build "
+                        "(default: build/doctrees)")
+    parser.add_argument('--json', action='store_true',
+                        help="print the report as JSON")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="scan every file, ignoring the cache")
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    path = os.path.join(args.doctrees, 'environment.pickle')
+    if not os.path.exists(path):
+        print(f"no environment.pickle in {args.doctrees}; build first")
+        sys.exit(1)
+    sys.path.insert(0, doc_dir)
+    import ksdomain
+    with open(path, 'rb') as f:
+        env = pickle.load(f)
+    domain = ksdomain.KOSDomain(env)
+
+    start = time.perf_counter()
+    cache = None if args.no_cache else os.path.join(args.doctrees, CACHE_FILE)
+    results, scanned = scan_sources(os.path.normpath(args.src), cache,
+                                    args.jobs or os.cpu_count() or 1)
+    report, totals = check(merge_classes(results), domain)
+    seconds = time.perf_counter() - start
+    if args.json:
+        print(json.dumps({'format': REPORT_FORMAT, 'totals': totals,
+                          'structures': report}, indent=1, sort_keys=True))
+    else:
+        print_report(report, totals)
+        print(f"{scanned} of {len(results)} files scanned, "
+              f"{seconds:.2f} s in all")
+
+
+def setup(app):
+    app.add_config_value('ks_suffix_check', True, '')
+    app.add_config_value('ks_suffix_source', '../../src', '')
+    app.add_config_value('ks_suffix_report', 'ks-suffixes.json', '')
+    app.add_config_value('ks_suffix_warnings', False, '')
+    app.add_config_value('ks_suffix_workers', 0, '')
+    app.connect('build-finished', run_check)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
+
+
+if __name__ == '__main__':
+    main()
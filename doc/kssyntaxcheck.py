@@ -0,0 +1,203 @@
+#
+# Parses every Kerboscript code block in the manual with ksparser, so a
+# broken example turns up as a build warning instead of in a bug report
+# from someone who pasted it into KSP.  Every block that is highlighted
+# as Kerboscript is checked: a `.. code-block:: kerboscript`, and a ::
+# block or a code-block without a language, as highlight_language in
+# conf.py is kerboscript, unless a `.. highlight::` before it in its
+# document says otherwise.  A block that is no code at all (a file
+# listing, a table of values) should say so, with
+#
+#     .. code-block:: none
+#
+# or with a `.. highlight:: none` before it, so it is neither highlighted
+# nor checked.
+#
+# Blocks are collected while the documents are read and checked all at
+# once when reading is done, spread over a pool of worker processes.
+# Only the documents (re)read in this build are checked, so incremental
+# builds stay cheap.  Errors are reported as warnings of type 'ks' and
+# subtype 'syntax', at the .rst line the error is on, and can be
+# silenced with suppress_warnings = ['ks.syntax'].
+#
+# A block that is meant to be wrong (an example of what not to write,
+# or a fragment like "SET x TO <value>.") can be left out of the check
+# by giving it the ks-nocheck class:
+#
+#     .. code-block:: kerboscript
+#         :class: ks-nocheck
+#
+# Settings in conf.py:
+#
+#     ks_syntax_check          False turns the check off (default: True).
+#     ks_syntax_check_workers  number of worker processes (default: one
+#                              per CPU); 1 parses in the build process.
+#
+# The check needs the compiler's grammar, so it is skipped with a note
+# when the docs are built outside a full checkout of the repository.
+#
+
+import concurrent.futures
+import os
+
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.util import logging
+
+import ksdomain
+import kslexer
+import ksparser
+
+logger = logging.getLogger(__name__)
+
+NOCHECK_CLASS = 'ks-nocheck'
+
+
+def code_blocks(app, doctree):
+    #
+    # Yields (lineno, text) for every Kerboscript code block in doctree,
+    # lineno being the source line of the block's first line of code.
+    # The blocks counted are the ones Sphinx will highlight as
+    # Kerboscript.  This runs before Sphinx gives the blocks without a
+    # language of their own the one of the highlight directive before
+    # them, or highlight_language, so it does the same here, in document
+    # order.  A parsed-literal isn't highlighted at all.
+    #
+    aliases = kslexer.KerboscriptLexer.aliases
+    highlight = app.config.highlight_language
+    lines = {}
+    for node in doctree.findall(_is_block_or_highlight):
+        if isinstance(node, addnodes.highlightlang):
+            highlight = node['lang']
+            continue
+        if node.get('language', highlight) not in aliases:
+            continue
+        if NOCHECK_CLASS in node['classes'] or node.line is None:
+            continue
+        if node.rawsource != node.astext():
+            continue
+        text = node.astext()
+        yield _first_code_line(node, text, lines), text
+
+
+def _is_block_or_highlight(node):
+    return isinstance(node, (nodes.literal_block, addnodes.highlightlang))
+
+
+def _first_code_line(node, text, lines):
+    # For a :: block node.line is already the first line of code, but a
+    # code-block directive has the line of the directive itself, so look
+    # for the first line of code in the source from there on.
+    source = node.source
+    if source not in lines:
+        try:
+            with open(source, encoding='utf-8') as f:
+                lines[source] = f.read().splitlines()
+        except (OSError, TypeError):
+            lines[source] = []
+    first = text.lstrip('\n').split('\n', 1)[0].strip()
+    source_lines = lines[source]
+    for i in range(node.line - 1, min(node.line + 20, len(source_lines))):
+        if source_lines[i].strip() == first:
+            return i + 1
+    return node.line
+
+
+def check_snippets(snippets, workers=1):
+    #
+    # Parses each snippet text, and returns (index, error) for each one
+    # that has a syntax error.  With workers > 1 the texts are parsed in
+    # that many processes.
+    #
+    ksparser.parse('')  # load the grammar once, before any fork
+    if workers <= 1 or len(snippets) < 2 * workers:
+        return _check_batch(list(enumerate(snippets)))
+    batches = [[] for _ in range(workers)]
+    # Dealt out round robin, so one batch doesn't get all the long
+    # snippets of a single long page.
+    for i, text in enumerate(snippets):
+        batches[i % workers].append((i, text))
+    errors = []
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        for batch_errors in executor.map(_check_batch, batches):
+            errors.extend(batch_errors)
+    errors.sort(key=lambda item: item[0])
+    return errors
+
+
+def _check_batch(batch):
+    errors = []
+    for i, text in batch:
+        error = ksparser.check(text)
+        if error is not None:
+            errors.append((i, error))
+    return errors
+
+
+def collect_snippets(app, doctree):
+    if not app.config.ks_syntax_check:
+        return
+    env = app.env
+    if not hasattr(env, 'ks_syntax_snippets'):
+        env.ks_syntax_snippets = {}
+    env.ks_syntax_snippets[env.docname] = list(code_blocks(app, doctree))
+
+
+def purge_snippets(app, env, docname):
+    if hasattr(env, 'ks_syntax_snippets'):
+        env.ks_syntax_snippets.pop(docname, None)
+
+
+def merge_snippets(app, env, docnames, other):
+    if not hasattr(other, 'ks_syntax_snippets'):
+        return
+    if not hasattr(env, 'ks_syntax_snippets'):
+        env.ks_syntax_snippets = {}
+    for docname in docnames:
+        if docname in other.ks_syntax_snippets:
+            env.ks_syntax_snippets[docname] = \
+                other.ks_syntax_snippets[docname]
+
+
+def check_syntax(app, env):
+    # Only the documents read in this build are in ks_syntax_snippets;
+    # it is emptied again here so the next build starts afresh.
+    pending = getattr(env, 'ks_syntax_snippets', None)
+    env.ks_syntax_snippets = {}
+    if not pending:
+        return []
+    locations = []
+    snippets = []
+    for docname in sorted(pending):
+        for lineno, text in pending[docname]:
+            locations.append((docname, lineno))
+            snippets.append(text)
+
+    workers = app.config.ks_syntax_check_workers or os.cpu_count() or 1
+    try:
+        errors = check_snippets(snippets, workers)
+    except OSError as e:
+        logger.info('kerboscript syntax check skipped: %s', e)
+        return []
+    for i, error in errors:
+        docname, lineno = locations[i]
+        ksdomain.report_diagnostic(
+            env, 'syntax', 'kerboscript syntax error: ' + error.message,
+            docname, lineno + error.line - 1, column=error.column)
+    logger.verbose('kerboscript syntax check: %d code blocks, %d with '
+                   'errors', len(snippets), len(errors))
+    return []
+
+
+def setup(app):
+    app.add_config_value('ks_syntax_check', True, '')
+    app.add_config_value('ks_syntax_check_workers', 0, '')
+    app.connect('doctree-read', collect_snippets)
+    app.connect('env-purge-doc', purge_snippets)
+    app.connect('env-merge-info', merge_snippets)
+    app.connect('env-updated', check_syntax)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,57 @@
+/*
+ * Version switcher for the manuals ksversions.py builds side by side,
+ * each in a directory of its own next to versions.js.  That file is
+ * loaded once the page is, and hands the versions to
+ * KSVersions.setVersions(), which puts a menu of them above the search
+ * box; picking one opens the same page in that version.  A plain
+ * script, so this works from file:// as well as from a server.
+ */
+
+var KSVersions = (function () {
+    'use strict';
+
+    var script = document.currentScript;
+    // This version's directory, and the one above it with versions.js.
+    var root = script ? script.src.replace(/_static\/ksversions\.js(\?.*)?$/, '') : '';
+    var top = root.replace(/[^\/]*\/$/, '');
+    var current = decodeURIComponent(root.slice(top.length).replace(/\/$/, ''));
+
+    function setVersions(versions) {
+        var here = window.location.href;
+        var page = here.indexOf(root) === 0 ? here.slice(root.length) : '';
+        var select = document.createElement('select');
+        select.className = 'ks-versions';
+        select.setAttribute('aria-label', 'Version');
+        versions.forEach(function (version) {
+            var option = document.createElement('option');
+            option.value = version.name;
+            option.textContent = version.release && version.release !== version.name ?
+                version.name + ' (' + version.release + ')' : version.name;
+            option.selected = version.name === current;
+            select.appendChild(option);
+        });
+        select.addEventListener('change', function () {
+            window.location.href = top + encodeURIComponent(select.value) + '/' + page;
+        });
+        var search = document.querySelector('.wy-side-nav-search [role="search"]');
+        if (search) {
+            search.parentNode.insertBefore(select, search);
+        } else {
+            document.body.insertBefore(select, document.body.firstChild);
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        if (!root) {
+            return;
+        }
+        var tag = document.createElement('script');
+        tag.src = top + 'versions.js';
+        tag.async = true;
+        document.head.appendChild(tag);
+    });
+
+    return {
+        setVersions: setVersions
+    };
+})();
@@ -0,0 +1,428 @@
+#
+# Builds the html manual of several kOS releases side by side, each with
+# a menu to switch to the same page in the others:
+#
+#     python ksversions.py [-j N] [-o gh-pages/versions] REF[=NAME] ...
+#
+# (or `make versions VERSIONS="..."`).  Each REF is a git branch, tag or
+# commit; the manual of its doc/source, with the C# sources under src/
+# that kssuffixcheck reads, goes to NAME/ in the output directory (by
+# default the ref, with anything but letters, digits, '.' and '-' made
+# a '-').  There, versions.js lists them for the switcher and index.html
+# leads to the first.
+#
+# Only the content comes from the refs: every version is rendered with
+# conf.py and the extensions of this checkout, so all of them get the
+# same settings, highlighting and search.  The release each ref's own
+# conf.py gives is only shown in the switcher, and the pages leave the
+# version out of their titles; that way a page reads the same in every
+# version it is unchanged in.
+#
+# The versions are built in a pool of worker processes, each an
+# incremental Sphinx build in build/versions/NAME/ (the working
+# directory, -w).  A version built before is started from its own last
+# build; a new one from a copy of the environment, doctrees and pages
+# of the version already built whose files are most alike, by their git
+# blob ids.  Files whose blob matches that build's are given an old
+# mtime and the rest the current time, so Sphinx reads and writes again
+# only what differs (and the pages depending on it), and a build takes
+# time for how much a version differs, not for how many there are.
+# When none of the versions was built before, the first one is built
+# from scratch, then the others from it.
+#
+# The builds also share build/versions/cache/: the highlighted code
+# blocks (see kshighlightcache.py), and pages/, where every file of the
+# output is kept by the hash of its content.  The output directory is
+# made of hard links into it, so a page that is the same in several
+# versions is stored once (where hard links are not possible, the files
+# are copied).
+#
+# As a Sphinx extension, it adds the switcher to the pages when
+# ks_versions_switcher is set, which the builds here do.
+#
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+
+DOC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(DOC_DIR)
+CONF_PATH = os.path.join(DOC_DIR, 'source', 'conf.py')
+ASSETS = ('ksversions.js', 'ksversions.css')
+
+# What is taken from each ref, relative to the top of the repository.
+SOURCE = 'doc/source'
+CS_SOURCE = 'src'
+# Bump when the layout of a version's state.json changes, to build
+# every version from scratch again.
+STATE_FORMAT = 1
+# The mtime of files known to be as the last build saw them: any time
+# before that build will do.
+OLD_MTIME = 946684800
+
+_release_re = re.compile(r'''^release\s*=\s*u?['"]([^'"]*)['"]''', re.M)
+_unsafe_re = re.compile(r'[^A-Za-z0-9.-]+')
+
+
+def git(*args):
+    return subprocess.run(('git',) + args, cwd=REPO_DIR, check=True,
+                          stdout=subprocess.PIPE).stdout
+
+
+def _wanted(path):
+    # Whether a file of the repository is part of what a version builds
+    # from: doc/source, and the .cs files kssuffixcheck scans.
+    return path.startswith(SOURCE + '/') or \
+        (path.startswith(CS_SOURCE + '/') and path.endswith('.cs'))
+
+
+def resolve(spec):
+    # (name, ref, commit, release, {path: blob id}) for a REF[=NAME].
+    ref, _, name = spec.partition('=')
+    name = name or _unsafe_re.sub('-', ref).strip('-')
+    commit = git('rev-parse', '--verify', '--quiet',
+                 ref + '^{commit}').decode('ascii').strip()
+    blobs = {}
+    listing = git('ls-tree', '-r', '-z', commit, '--', SOURCE, CS_SOURCE)
+    for entry in listing.split(b'\0'):
+        if not entry:
+            continue
+        info, path = entry.split(b'\t', 1)
+        mode, kind, blob = info.split()
+        path = path.decode('utf-8')
+        if kind == b'blob' and _wanted(path):
+            blobs[path] = blob.decode('ascii')
+    m = _release_re.search(git('show', commit + ':' + SOURCE + '/conf.py')
+                           .decode('utf-8', 'replace'))
+    return name, ref, commit, m.group(1) if m else '', blobs
+
+
+def load_state(workdir, name):
+    try:
+        with open(os.path.join(workdir, name, 'state.json'),
+                  encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('format') != STATE_FORMAT:
+        return None
+    return state
+
+
+def differing(blobs, other):
+    # How many files one version has that the other has not, or not the
+    # same.
+    return sum(1 for path in set(blobs) | set(other)
+               if blobs.get(path) != other.get(path))
+
+
+def extract(commit, checkout):
+    # Writes the files _wanted() from commit under checkout, replacing
+    # whatever was there.
+    if os.path.isdir(checkout):
+        shutil.rmtree(checkout)
+    os.makedirs(checkout)
+    archive = subprocess.Popen(['git', 'archive', '--format=tar', commit,
+                                SOURCE, CS_SOURCE],
+                               cwd=REPO_DIR, stdout=subprocess.PIPE)
+    with tarfile.open(fileobj=archive.stdout, mode='r|') as tar:
+        for member in tar:
+            if member.isfile() and _wanted(member.name):
+                tar.extract(member, checkout, set_attrs=False)
+    if archive.wait():
+        raise subprocess.CalledProcessError(archive.returncode, 'git archive')
+
+
+def relocate(doctreedir, srcdir):
+    #
+    # Points the pickled environment in doctreedir, copied from another
+    # version's build, at srcdir.  Sphinx refuses an environment read
+    # from another source directory; apart from the directory itself
+    # only the dependencies of documents (images, included files) are
+    # kept as absolute paths.
+    #
+    import pickle
+    path = os.path.join(doctreedir, 'environment.pickle')
+    with open(path, 'rb') as f:
+        env = pickle.load(f)
+    old = str(env.srcdir)
+
+    def moved(value):
+        value = str(value)
+        if value == old or value.startswith(old + os.sep):
+            value = srcdir + value[len(old):]
+        return value
+
+    env.srcdir = type(env.srcdir)(srcdir)
+    env.project.srcdir = type(env.project.srcdir)(srcdir)
+    for docname, deps in env.dependencies.items():
+        env.dependencies[docname] = set(type(dep)(moved(dep))
+                                        for dep in deps)
+    with open(path, 'wb') as f:
+        pickle.dump(env, f, pickle.HIGHEST_PROTOCOL)
+
+
+def build_version(job):
+    #
+    # Runs in a worker process: prepares build/versions/NAME/ for the
+    # version in job and builds it.  Returns the numbers for the summary.
+    #
+    start = time.perf_counter()
+    name = job['name']
+    here = os.path.join(job['workdir'], name)
+    checkout = os.path.join(here, 'checkout')
+    srcdir = os.path.join(checkout, *SOURCE.split('/'))
+    doctreedir = os.path.join(here, 'doctrees')
+    outdir = os.path.join(here, 'html')
+    state_path = os.path.join(here, 'state.json')
+    if os.path.exists(state_path):
+        # Only a build that finishes leaves a state behind.
+        os.remove(state_path)
+
+    extract(job['commit'], checkout)
+    # Rendered with this checkout's settings, whatever the ref's were.
+    shutil.copyfile(CONF_PATH, os.path.join(srcdir, 'conf.py'))
+    seed = job['seed']
+    if seed is not None:
+        for path in (doctreedir, outdir):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+        seed_dir = os.path.join(job['workdir'], seed)
+        shutil.copytree(os.path.join(seed_dir, 'doctrees'), doctreedir)
+        shutil.copytree(os.path.join(seed_dir, 'html'), outdir)
+        relocate(doctreedir, srcdir)
+    known = job['known'] or {}
+    now = time.time()
+    for path, blob in job['blobs'].items():
+        mtime = OLD_MTIME if known.get(path) == blob or \
+            path == SOURCE + '/conf.py' else now
+        os.utime(os.path.join(checkout, *path.split('/')), (mtime, mtime))
+
+    from sphinx.application import Sphinx
+    read = []
+    written = []
+    with open(os.path.join(here, 'build.log'), 'w',
+              encoding='utf-8') as log:
+        app = Sphinx(srcdir, srcdir, outdir, doctreedir, 'html',
+                     status=log, warning=log, freshenv=not known,
+                     confoverrides={
+                         # The same for every version, see above.
+                         'version': '',
+                         'release': '',
+                         'html_title': 'kOS documentation',
+                         'ks_versions_switcher': True,
+                         'ks_highlight_cache': os.path.join(
+                             job['workdir'], 'cache', 'ks_highlight.sqlite'),
+                         # The versions are built in parallel already.
+                         'ks_suffix_workers': 1,
+                     })
+        app.connect('env-before-read-docs',
+                    lambda app, env, docnames: read.extend(docnames))
+        app.connect('html-page-context',
+                    lambda app, pagename, templatename, context, doctree:
+                    doctree is not None and written.append(pagename))
+        app.build()
+        warnings = app._warncount
+
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({'format': STATE_FORMAT, 'ref': job['ref'],
+                   'commit': job['commit'], 'release': job['release'],
+                   'blobs': job['blobs']}, f)
+    return {'name': name, 'seed': seed, 'read': len(read),
+            'written': len(written), 'warnings': warnings,
+            'seconds': time.perf_counter() - start}
+
+
+def publish(htmldir, target, store):
+    #
+    # Makes target a copy of htmldir made of hard links into store,
+    # where each file is kept under the hash of its content.  Returns
+    # (files, files new to the store).
+    #
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    files = added = 0
+    for dirpath, dirnames, filenames in os.walk(htmldir):
+        rel = os.path.relpath(dirpath, htmldir)
+        os.makedirs(os.path.join(target, rel), exist_ok=True)
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            digest = digest.hexdigest()
+            stored = os.path.join(store, digest[:2], digest[2:])
+            if not os.path.exists(stored):
+                os.makedirs(os.path.dirname(stored), exist_ok=True)
+                shutil.copyfile(path, stored + '.tmp')
+                os.replace(stored + '.tmp', stored)
+                added += 1
+            dest = os.path.join(target, rel, filename)
+            try:
+                os.link(stored, dest)
+            except OSError:
+                shutil.copyfile(stored, dest)
+            files += 1
+    return files, added
+
+
+def prune(store):
+    # Drops the files of store no output links to any more.  Returns how
+    # many were dropped.
+    dropped = 0
+    for dirpath, dirnames, filenames in os.walk(store):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.stat(path).st_nlink == 1:
+                os.remove(path)
+                dropped += 1
+    return dropped
+
+
+def write_index(outdir, versions):
+    # versions.js for the switcher, and an index.html leading to the
+    # first version.
+    entries = [{'name': name, 'ref': ref, 'release': release}
+               for name, ref, commit, release, blobs in versions]
+    with open(os.path.join(outdir, 'versions.js'), 'w',
+              encoding='utf-8') as f:
+        f.write('KSVersions.setVersions(%s);\n'
+                % json.dumps(entries, indent=1))
+    first = versions[0][0]
+    with open(os.path.join(outdir, 'index.html'), 'w',
+              encoding='utf-8') as f:
+        f.write('<!DOCTYPE html>\n<meta charset="utf-8">\n'
+                '<meta http-equiv="refresh" content="0; url=%s/">\n'
+                '<a href="%s/">kOS documentation</a>\n' % (first, first))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the manual of several git refs side by side, "
+        "with a version switcher.")
+    parser.add_argument('refs', nargs='+', metavar='REF[=NAME]',
+                        help="branch, tag or commit, and the directory "
+                        "to build it in")
+    parser.add_argument('-o', '--outdir',
+                        default=os.path.join(DOC_DIR, 'gh-pages',
+                                             'versions'))
+    parser.add_argument('-w', '--workdir',
+                        default=os.path.join(DOC_DIR, 'build', 'versions'),
+                        help="where the builds are kept between runs "
+                        "(default: build/versions)")
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    workdir = os.path.abspath(args.workdir)
+    outdir = os.path.abspath(args.outdir)
+
+    versions = []
+    for spec in args.refs:
+        try:
+            versions.append(resolve(spec))
+        except subprocess.CalledProcessError:
+            print(f"ksversions: {spec.partition('=')[0]} is not a commit "
+                  f"of this repository")
+            sys.exit(1)
+    names = [version[0] for version in versions]
+    if len(set(names)) != len(names) or not all(names):
+        print(f"ksversions: every version needs a name of its own: "
+              f"{', '.join(names)}")
+        sys.exit(1)
+
+    jobs = dict((name, {'name': name, 'ref': ref, 'commit': commit,
+                        'release': release, 'blobs': blobs,
+                        'workdir': workdir, 'seed': None, 'known': None})
+                for name, ref, commit, release, blobs in versions)
+    # Versions built before start from their own builds; if there are
+    # none, the first version is built from scratch.  The rest wait for
+    # those, to start from the most alike of them.
+    first = []
+    for name, job in jobs.items():
+        state = load_state(workdir, name)
+        if state is not None:
+            job['known'] = state['blobs']
+            first.append(name)
+    if not first:
+        first.append(names[0])
+    later = [name for name in names if name not in first]
+
+    os.makedirs(os.path.join(workdir, 'cache'), exist_ok=True)
+    os.makedirs(outdir, exist_ok=True)
+    store = os.path.join(workdir, 'cache', 'pages')
+    workers = args.jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    built = []
+    failed = []
+    print(f"{'version':<20}{'from':<20}{'read':>6}{'written':>9}"
+          f"{'warnings':>10}{'seconds':>9}")
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        for batch in (first, later):
+            for name in batch:
+                job = jobs[name]
+                if job['known'] is None and built:
+                    job['seed'] = min(built, key=lambda other: differing(
+                        job['blobs'], jobs[other]['blobs']))
+                    job['known'] = jobs[job['seed']]['blobs']
+            futures = dict((pool.submit(build_version, jobs[name]), name)
+                           for name in batch)
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as err:
+                    print(f"{name:<20}failed: {err}; see "
+                          f"{os.path.join(workdir, name, 'build.log')}")
+                    failed.append(name)
+                    continue
+                publish(os.path.join(workdir, name, 'html'),
+                        os.path.join(outdir, name), store)
+                built.append(name)
+                print(f"{name:<20}{result['seed'] or '':<20}"
+                      f"{result['read']:>6}{result['written']:>9}"
+                      f"{result['warnings']:>10}{result['seconds']:>9.1f}")
+
+    if failed:
+        print(f"ksversions: {', '.join(failed)} failed")
+        sys.exit(1)
+    write_index(outdir, versions)
+    dropped = prune(store)
+    print(f"{len(versions)} versions in {outdir} after "
+          f"{time.perf_counter() - start:.1f} s"
+          + (f"; {dropped} unused pages dropped from the cache"
+             if dropped else ""))
+
+
+def add_assets(app):
+    if not app.config.ks_versions_switcher or app.builder.format != 'html':
+        return
+    static = os.path.join(app.outdir, '_static')
+    os.makedirs(static, exist_ok=True)
+    for asset in ASSETS:
+        shutil.copyfile(os.path.join(DOC_DIR, asset),
+                        os.path.join(static, asset))
+    app.add_js_file('ksversions.js')
+    app.add_css_file('ksversions.css')
+
+
+def setup(app):
+    app.add_config_value('ks_versions_switcher', False, '')
+    app.connect('builder-inited', add_assets)
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
+
+
+if __name__ == '__main__':
+    main()
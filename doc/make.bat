@@ -6,6 +6,9 @@ if "%SPHINXBUILD%" == "" (
     set SPHINXBUILD=sphinx-build
 )
 set BUILDDIR=build
+if "%VERSIONS%" == "" (
+    set VERSIONS=HEAD
+)
 set ALLSPHINXOPTS=-d %BUILDDIR%/doctrees %SPHINXOPTS% source
 set I18NSPHINXOPTS=%SPHINXOPTS% source
 if NOT "%PAPER%" == "" (
@@ -19,6 +22,8 @@ if "%1" == "help" (
     :help
     echo.Please use `make ^<target^>` where ^<target^> is one of
     echo.  html       to make standalone HTML files
+    echo.  serve      to serve the HTML files, rebuilding them as sources change
+    echo.  versions   to make HTML files of several git refs, with a version switcher
     echo.  dirhtml    to make HTML files named index.html in directories
     echo.  singlehtml to make a single large HTML file
     echo.  pickle     to make pickle files
@@ -69,6 +74,20 @@ if "%1" == "html" (
     goto end
 )
 
+if "%1" == "serve" (
+    python ksserve.py -d %BUILDDIR%/doctrees -o gh-pages
+    if errorlevel 1 exit /b 1
+    goto end
+)
+
+if "%1" == "versions" (
+    python ksversions.py -w %BUILDDIR%/versions -o gh-pages/versions %VERSIONS%
+    if errorlevel 1 exit /b 1
+    echo.
+    echo.Build finished. The HTML pages are in gh-pages/versions.
+    goto end
+)
+
 if "%1" == "dirhtml" (
     %SPHINXBUILD% -b dirhtml %ALLSPHINXOPTS% %BUILDDIR%/dirhtml
     if errorlevel 1 exit /b 1
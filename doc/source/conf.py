@@ -33,8 +33,50 @@ extensions = [
     'sphinx.ext.mathjax',
     'ksdomain',
     'KerboscriptLexer',
+    'kshighlightcache',
+    'kssyntaxcheck',
+    'ksprofile',
+    'kssearch',
+    'ksimages',
+    'kssuffixcheck',
+    'ksversions',
 ]
 
+# Also write every ks domain diagnostic (duplicate descriptions,
+# unprefixed suffixes, unresolved references) to this JSON-lines file,
+# relative to the output directory.
+#ks_diagnostics_report = 'ks-diagnostics.jsonl'
+
+# Time the build (phases, event handlers, ks directives, references,
+# highlighting, per document) and write a report to this JSON file,
+# relative to the output directory.  KS_PROFILE=1 in the environment
+# does the same for a single build.
+#ks_profile = 'ks-profile.json'
+
+# Write the ks objects to small search index shards under
+# _static/kssearch/ and look them up as you type in the search box.
+#ks_search_index = True
+
+# Recompress the PNG and JPEG images and give the pages scaled-down and
+# WebP versions of them to pick from (needs Pillow).  The first build
+# does every image; the cache directory, relative to the doctrees
+# directory, makes later ones cheap, and can be put outside the build
+# directory to survive `make clean`.
+#ks_images_optimize = False
+#ks_images_cache = 'ks_images'
+#ks_images_cache_size = 256 * 1024 * 1024
+#ks_images_widths = [480, 960, 1440]
+#ks_images_webp = True
+
+# Compare the suffixes registered in the C# sources with the documented
+# ones, and write what is undocumented or obsolete to this JSON file,
+# relative to the output directory.
+#ks_suffix_source = '../../src'
+#ks_suffix_report = 'ks-suffixes.json'
+
+# Link the documented structures, functions and bound variables in
+# highlighted code to where they are documented.
+#ks_highlight_links = True
 
 primary_domain = 'ks'
 